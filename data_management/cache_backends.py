@@ -0,0 +1,268 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    compressed INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (accessed);
+CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires);
+CREATE TABLE IF NOT EXISTS cache_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_totals (id, entries, bytes) VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_entries_insert AFTER INSERT ON cache_entries BEGIN
+    UPDATE cache_totals SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_delete AFTER DELETE ON cache_entries BEGIN
+    UPDATE cache_totals SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_update AFTER UPDATE OF size ON cache_entries BEGIN
+    UPDATE cache_totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 1;
+END;
+"""
+
+
+class SQLiteCache(BaseCache):
+    """Cache backend stored in a local SQLite file shared by every process.
+
+    Unlike LocMemCache, all gunicorn workers on a node see the same entries.
+    Size is bounded by MAX_ENTRIES and MAX_BYTES (least recently used entries
+    are evicted first, expired ones before that) and values larger than
+    COMPRESS_MIN_LENGTH bytes are zlib-compressed.
+
+    OPTIONS:
+        MAX_ENTRIES          entry limit (default 300, as for other backends)
+        MAX_BYTES            limit on stored value bytes, 0 for none
+        CULL_FREQUENCY       evict 1/CULL_FREQUENCY of the entries when full
+        COMPRESS_MIN_LENGTH  compress pickled values at least this long, 0 disables
+        COMPRESS_LEVEL       zlib level (default 1, favouring speed)
+        ACCESS_RESOLUTION    seconds between LRU timestamp refreshes of a key
+        MMAP_SIZE            bytes of the file SQLite may memory-map for reads
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = str(location)
+        self._max_bytes = int(options.get('MAX_BYTES', 0))
+        self._compress_min_length = int(options.get('COMPRESS_MIN_LENGTH', 0))
+        self._compress_level = int(options.get('COMPRESS_LEVEL', 1))
+        self._access_resolution = float(options.get('ACCESS_RESOLUTION', 5.0))
+        self._mmap_size = int(options.get('MMAP_SIZE', 64 * 1024 * 1024))
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread and process; connections must not cross a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA mmap_size={self._mmap_size}')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _encode(self, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if self._compress_min_length and len(data) >= self._compress_min_length:
+            return zlib.compress(data, self._compress_level), 1
+        return data, 0
+
+    @staticmethod
+    def _decode(data, compressed):
+        if compressed:
+            data = zlib.decompress(data)
+        return pickle.loads(data)
+
+    def _expiry(self, timeout):
+        # Absolute expiry time, None for "never"
+        return self.get_backend_timeout(timeout)
+
+    def _write(self, conn, rows, replace=True):
+        # An upsert, not INSERT OR REPLACE: the rows REPLACE deletes do not fire
+        # cache_entries_delete, so overwrites would be counted as new entries.
+        # Updating in place lets cache_entries_update apply the size delta.
+        if replace:
+            conflict = ('ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                        'compressed = excluded.compressed, size = excluded.size, '
+                        'expires = excluded.expires, accessed = excluded.accessed')
+        else:
+            conflict = 'ON CONFLICT (key) DO NOTHING'
+        cursor = conn.executemany(
+            'INSERT INTO cache_entries (key, value, compressed, size, expires, accessed) '
+            f'VALUES (?, ?, ?, ?, ?, ?) {conflict}',
+            rows,
+        )
+        return cursor.rowcount
+
+    def _cull(self, conn):
+        entries, stored_bytes = conn.execute('SELECT entries, bytes FROM cache_totals').fetchone()
+        over_entries = entries > self._max_entries
+        over_bytes = self._max_bytes and stored_bytes > self._max_bytes
+        if not (over_entries or over_bytes):
+            return
+
+        conn.execute('DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        entries, stored_bytes = conn.execute('SELECT entries, bytes FROM cache_totals').fetchone()
+        if entries > self._max_entries:
+            # Same policy as the built-in backends: drop 1/CULL_FREQUENCY at once
+            count = entries // self._cull_frequency if self._cull_frequency else entries
+            count = max(count, entries - self._max_entries)
+            conn.execute(
+                'DELETE FROM cache_entries WHERE key IN '
+                '(SELECT key FROM cache_entries ORDER BY accessed LIMIT ?)', (count,)
+            )
+        if self._max_bytes:
+            # Evict least recently used entries until back under the byte budget
+            while True:
+                stored_bytes = conn.execute('SELECT bytes FROM cache_totals').fetchone()[0]
+                if stored_bytes <= self._max_bytes:
+                    break
+                conn.execute(
+                    'DELETE FROM cache_entries WHERE key IN '
+                    '(SELECT key FROM cache_entries ORDER BY accessed LIMIT 100)'
+                )
+
+    def _set_rows(self, items, timeout, replace=True):
+        expires = self._expiry(timeout)
+        now = time.time()
+        rows = []
+        for key, value in items:
+            data, compressed = self._encode(value)
+            rows.append((key, data, compressed, len(data), expires, now))
+
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if not replace:
+                # add() may reuse keys whose entry has expired
+                conn.executemany(
+                    'DELETE FROM cache_entries WHERE key = ? AND expires IS NOT NULL AND expires <= ?',
+                    [(row[0], now) for row in rows],
+                )
+            written = self._write(conn, rows, replace)
+            self._cull(conn)
+        return written
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._set_rows([(key, value)], timeout, replace=False) > 0
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._set_rows([(key, value)], timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [(self.make_and_validate_key(key, version=version), value) for key, value in data.items()]
+        if items:
+            self._set_rows(items, timeout)
+        return []
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._get_rows([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not key_map:
+            return {}
+        found = self._get_rows(list(key_map))
+        return {key_map[key]: value for key, value in found.items()}
+
+    def _get_rows(self, keys):
+        conn = self._connection()
+        now = time.time()
+        found = {}
+        expired = []
+        stale = []
+        # Stay well under SQLite's bound parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for key, data, compressed, expires, accessed in conn.execute(
+                f'SELECT key, value, compressed, expires, accessed FROM cache_entries WHERE key IN ({placeholders})',
+                chunk,
+            ):
+                if expires is not None and expires <= now:
+                    expired.append((key, now))
+                    continue
+                found[key] = self._decode(data, compressed)
+                if now - accessed > self._access_resolution:
+                    stale.append((now, key))
+
+        if expired or stale:
+            # LRU timestamps are refreshed at ACCESS_RESOLUTION granularity so
+            # most reads stay read-only
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany(
+                    'DELETE FROM cache_entries WHERE key = ? AND expires IS NOT NULL AND expires <= ?', expired
+                )
+                conn.executemany('UPDATE cache_entries SET accessed = ? WHERE key = ?', stale)
+        return found
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute(
+                'UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self._expiry(timeout), key, time.time()),
+            )
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        return self.delete_many([key], version=version) > 0
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if not keys:
+            return 0
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.executemany('DELETE FROM cache_entries WHERE key = ?', [(key,) for key in keys])
+        return cursor.rowcount
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM cache_entries')
+
+    def stats(self):
+        entries, stored_bytes = self._connection().execute(
+            'SELECT entries, bytes FROM cache_totals'
+        ).fetchone()
+        return {'entries': entries, 'bytes': stored_bytes}
+
+    def close(self, **kwargs):
+        # Connections are kept open per thread for the life of the process
+        pass
@@ -0,0 +1,71 @@
+import os
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from data_management.utils.erasure_coding import ReedSolomonEC
+
+
+class Command(BaseCommand):
+    help = "Measure Reed-Solomon encode/decode throughput (MB/s) for several k+m profiles and payload sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='4+2,8+3,10+4',
+                            help='Comma separated k+m profiles')
+        parser.add_argument('--sizes', default='1K,64K,1M,16M',
+                            help='Comma separated payload sizes (K/M suffixes allowed)')
+        parser.add_argument('--min-time', type=float, default=0.5,
+                            help='Minimum seconds to spend on each measurement')
+
+    def handle(self, *args, **options):
+        profiles = [tuple(int(x) for x in p.split('+')) for p in options['profiles'].split(',')]
+        sizes = [parse_size(s) for s in options['sizes'].split(',')]
+
+        self.stdout.write(f"{'profile':>8} {'payload':>10} {'encode MB/s':>12} {'decode MB/s':>12} {'degraded MB/s':>14}")
+        for k, m in profiles:
+            ec = ReedSolomonEC(k=k, m=m)
+            for size in sizes:
+                # No zero bytes so decode's padding strip doesn't shorten the payload
+                payload = (np.frombuffer(os.urandom(size), dtype=np.uint8) | 1).tobytes()
+                fragments = ec.encode(payload)
+
+                # Fast case: all data fragments present. Degraded: the first m
+                # data fragments are lost and parity has to be used.
+                degraded = fragments[m:]
+                assert ec.decode(list(degraded)) == payload, "round trip failed"
+
+                encode = measure(lambda: ec.encode(payload), options['min_time'])
+                decode = measure(lambda: ec.decode(list(fragments)), options['min_time'])
+                degraded_decode = measure(lambda: ec.decode(list(degraded)), options['min_time'])
+
+                mb = size / (1024 * 1024)
+                self.stdout.write(
+                    f"{f'{k}+{m}':>8} {format_size(size):>10} {mb / encode:>12.1f} "
+                    f"{mb / decode:>12.1f} {mb / degraded_decode:>14.1f}"
+                )
+
+
+def measure(fn, min_time):
+    # Mean seconds per call over at least min_time
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def parse_size(value):
+    value = value.strip().upper()
+    units = {'K': 1024, 'M': 1024 * 1024}
+    if value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def format_size(size):
+    for unit, factor in (('M', 1024 * 1024), ('K', 1024)):
+        if size >= factor:
+            return f"{size / factor:g}{unit}"
+    return f"{size}B"
@@ -0,0 +1,115 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from data_management.models import (
+    CachedData, DataFragment, Device, GlobalModel, PerformanceMetrics, RawData, ReadingRollup,
+)
+from data_management.utils.processing_queue import _claimable, queue_settings
+
+
+class Command(BaseCommand):
+    help = ("Load a large synthetic dataset, check with EXPLAIN that the hot lookups use their indexes "
+            "and time them. Everything runs in a transaction that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help='RawData rows to load (other tables are sized from this)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per query when timing')
+
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            start = time.perf_counter()
+            self.load(options['rows'], options['batch_size'])
+            self.stdout.write(f"Loaded fixture in {time.perf_counter() - start:.1f}s")
+            if connection.vendor in ('sqlite', 'postgresql'):
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            self.stdout.write(f"{'lookup':<28} {'index':<32} {'ms':>8}  ok")
+            for name, queryset, index in self.checks():
+                plan = queryset.explain()
+                # Without a name any index access counts (e.g. FK and unique indexes)
+                uses_index = index in plan if index else 'index' in plan.lower()
+                elapsed = self.measure(queryset, options['repeat'])
+                self.stdout.write(f"{name:<28} {index or '(any)':<32} {elapsed * 1000:8.2f}  "
+                                  f"{'yes' if uses_index else 'NO'}")
+                if not uses_index:
+                    failures.append(f"{name}:\n{plan}")
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError("Lookups not using their index:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("All hot lookups use their indexes"))
+
+    def load(self, rows, batch_size):
+        devices = list(Device.objects.all()[:3]) or [
+            Device.objects.create(name=f"Bench Sensor {i}", device_type='Temperature', location='Bench')
+            for i in range(3)
+        ]
+        reading = {'type': 'temperature', 'value': 21.5, 'timestamp': '2026-01-01T00:00:00', 'unit': '°C'}
+        for offset in range(0, rows, batch_size):
+            count = min(batch_size, rows - offset)
+            # About 1% of readings are still waiting for the processing queue
+            created = RawData.objects.bulk_create([
+                RawData(device=devices[i % len(devices)], data=reading, is_processed=(offset + i) % 100 != 0)
+                for i in range(count)
+            ])
+            CachedData.objects.bulk_create([
+                CachedData(raw_data=raw_data, cache_level=('FREQUENT', 'LESS_FREQUENT', 'RARE')[i % 3])
+                for i, raw_data in enumerate(created) if i % 4 == 0
+            ])
+            DataFragment.objects.bulk_create([
+                DataFragment(original_data=raw_data, fragment_id=f"F{j+1}", fragment_data=b'\0' * 8,
+                             storage_node=f"edge_node_{(i + j) % 6}", is_parity=j >= 4)
+                for i, raw_data in enumerate(created) if i % 10 == 0
+                for j in range(6)
+            ])
+            PerformanceMetrics.objects.bulk_create([
+                PerformanceMetrics(edge_processing_time=1.0, cloud_processing_time=2.0, data_transfer_size=1.0,
+                                   raw_storage_size=1.0, encoded_storage_size=1.5)
+                for _ in range(count // 10)
+            ])
+        GlobalModel.objects.bulk_create([GlobalModel(version=v, model_data=b'') for v in range(1, 101)])
+
+    def checks(self):
+        now = timezone.now()
+        config = queue_settings()
+        some_ids = list(RawData.objects.order_by('-id').values_list('id', flat=True)[:200])
+        device_id = Device.objects.values_list('id', flat=True).first()
+        return [
+            ('queue pending count', RawData.objects.filter(is_processed=False), 'rawdata_pending_idx'),
+            ('queue claim', _claimable(config, now).order_by('id').values_list('id', flat=True)[:200],
+             'rawdata_pending_idx'),
+            ('queue claimed rows', RawData.objects.filter(claim_token='0' * 32, is_processed=False),
+             'rawdata_claim_token_idx'),
+            ('latest per device', RawData.objects.filter(device_id=device_id).order_by('-timestamp', '-id')
+             .values_list('id', flat=True)[:50], 'rawdata_device_recent_idx'),
+            ('recent readings', RawData.objects.order_by('-timestamp')[:20], 'rawdata_recent_idx'),
+            ('cache downgrade', CachedData.objects.filter(
+                cache_level='FREQUENT', last_accessed__lt=now - timedelta(minutes=10)
+            ), 'cacheddata_level_accessed_idx'),
+            ('recovery data fragments', DataFragment.objects.filter(
+                original_data_id__in=some_ids, is_parity=False
+            ), None),
+            ('fragments on node', DataFragment.objects.filter(storage_node='edge_node_1')
+             .values_list('original_data_id', flat=True).distinct(), None),
+            ('latest global model', GlobalModel.objects.order_by('-version')[:1], 'globalmodel_version_idx'),
+            ('recent metrics', PerformanceMetrics.objects.order_by('-timestamp')[:100], 'perfmetrics_recent_idx'),
+            ('device history', ReadingRollup.objects.filter(
+                device_id=device_id, resolution='1h', bucket_start__gte=now - timedelta(days=30)
+            ), None),
+        ]
+
+    @staticmethod
+    def measure(queryset, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            best = min(best, time.perf_counter() - start)
+        return best
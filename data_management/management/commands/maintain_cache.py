@@ -0,0 +1,44 @@
+import signal
+import threading
+from django.core.management.base import BaseCommand
+from data_management.utils.cache_maintenance import run_maintenance
+from data_management.utils.caching import cache_policy_settings
+
+
+class Command(BaseCommand):
+    help = ("Demote idle cache entries one tier and evict idle RARE entries, moving the cached "
+            "values between the tier caches together with CachedData")
+
+    def add_arguments(self, parser):
+        config = cache_policy_settings()
+        parser.add_argument('--batch-size', type=int, default=config['MAINTENANCE_BATCH_SIZE'],
+                            help='Entries moved per transaction')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop a run after this many batches')
+        parser.add_argument('--continuous', action='store_true',
+                            help='Keep running, one run every --interval seconds')
+        parser.add_argument('--interval', type=float, default=config['MAINTENANCE_INTERVAL'],
+                            help='Seconds between runs with --continuous')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+        try:
+            while not stop_event.is_set():
+                report = run_maintenance(batch_size=options['batch_size'], max_batches=options['max_batches'],
+                                         stop_event=stop_event)
+                self.report(report)
+                if not options['continuous']:
+                    break
+                stop_event.wait(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def report(self, report):
+        for level, counts in report['levels'].items():
+            self.stdout.write(f"  {level:<14} {counts['moved']:>7} moved  {counts['evicted']:>7} evicted  "
+                              f"{counts['batches']:>4} batches  {counts['elapsed'] * 1000:8.1f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Cache maintenance: {report['moved']} moved, {report['evicted']} evicted "
+            f"in {report['elapsed']:.2f}s"
+        ))
@@ -0,0 +1,82 @@
+import multiprocessing
+import signal
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connections
+from data_management.utils.processing_queue import (
+    queue_settings, queue_stats, retry_failed, run_worker,
+)
+
+
+def _worker_process(batch_size, poll_interval, once):
+    # Entry point for worker processes; safe under both fork and spawn
+    import django
+    django.setup()
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    run_worker(stop_event, batch_size=batch_size, poll_interval=poll_interval, once=once)
+
+
+class Command(BaseCommand):
+    help = "Drain unprocessed RawData rows (caching, erasure coding, federated learning) in batches"
+
+    def add_arguments(self, parser):
+        config = queue_settings()
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of worker processes')
+        parser.add_argument('--batch-size', type=int, default=config['BATCH_SIZE'])
+        parser.add_argument('--interval', type=float, default=config['POLL_INTERVAL'],
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is drained')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Reset readings that exhausted their attempts before starting')
+        parser.add_argument('--stats-every', type=float, default=10.0,
+                            help='Seconds between queue depth reports')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            self.stdout.write(f"Re-queued {retry_failed()} failed readings")
+
+        worker_args = (options['batch_size'], options['interval'], options['once'])
+        if options['workers'] <= 1:
+            stop_event = threading.Event()
+            signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+            start = time.perf_counter()
+            try:
+                run_worker(stop_event, batch_size=options['batch_size'],
+                           poll_interval=options['interval'], once=options['once'])
+            except KeyboardInterrupt:
+                pass
+            self.report(start)
+            return
+
+        # Child processes must not inherit the parent's DB connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_worker_process, args=worker_args, daemon=True)
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+
+        start = time.perf_counter()
+        try:
+            while any(p.is_alive() for p in processes):
+                for process in processes:
+                    process.join(timeout=options['stats_every'] / len(processes))
+                self.report(start)
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+        self.report(start)
+
+    def report(self, start):
+        stats = queue_stats()['queue']
+        self.stdout.write(
+            f"[{time.perf_counter() - start:.1f}s] pending={stats['pending']} "
+            f"in_flight={stats['in_flight']} retrying={stats['retrying']} dead={stats['dead']}"
+        )
@@ -0,0 +1,67 @@
+import argparse
+import signal
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from data_management.utils.retention import POLICIES, purge_expired, retention_settings
+
+
+class Command(BaseCommand):
+    help = ("Delete rows older than their retention policy (see settings.RETENTION), "
+            "optionally archiving them to compressed segment files first")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policy', action='append', choices=sorted(POLICIES), dest='policies',
+                            help='Policy to purge (repeatable; default all)')
+        parser.add_argument('--days', type=float, default=None,
+                            help='Override the retention period in days')
+        parser.add_argument('--archive', action=argparse.BooleanOptionalAction, default=None,
+                            help='Override whether expired rows are archived before deletion')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows deleted per transaction')
+        parser.add_argument('--rate', type=float, default=None,
+                            help='Maximum rows deleted per second')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the expired rows')
+        parser.add_argument('--stats-every', type=float, default=10.0,
+                            help='Seconds between progress reports')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+        policies = retention_settings()['POLICIES']
+        unknown = set(policies) - set(POLICIES)
+        if unknown:
+            raise CommandError(f"Unknown retention policies in settings: {', '.join(sorted(unknown))}")
+        self.stats_every = options['stats_every']
+        self.last_report = time.monotonic()
+
+        # POLICIES order matters: blocks only expire once their readings are gone
+        for name in options['policies'] or [name for name in POLICIES if name in policies]:
+            try:
+                totals = purge_expired(
+                    name, days=options['days'], archive=options['archive'], chunk_size=options['chunk_size'],
+                    max_rate=options['rate'], dry_run=options['dry_run'], progress=self.progress,
+                    stop_event=stop_event,
+                )
+            except KeyboardInterrupt:
+                break
+            self.report(totals, options['dry_run'])
+            if stop_event.is_set():
+                break
+
+    def progress(self, totals, elapsed):
+        if time.monotonic() - self.last_report < self.stats_every:
+            return
+        self.last_report = time.monotonic()
+        rate = totals['deleted'] / elapsed if elapsed else 0
+        self.stdout.write(f"  {totals['policy']}: {totals['deleted']} deleted, {rate:.0f} rows/s")
+
+    def report(self, totals, dry_run):
+        if dry_run:
+            self.stdout.write(f"{totals['policy']}: {totals.get('expired', 0)} expired rows")
+            return
+        message = f"{totals['policy']}: deleted {totals['deleted']} rows in {totals['elapsed']:.2f}s"
+        if totals['archived']:
+            message += f", archived {totals['archived']} to {totals['segment']}"
+        self.stdout.write(self.style.SUCCESS(message))
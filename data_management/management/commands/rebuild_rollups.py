@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from data_management.models import RawData, ReadingRollup
+from data_management.utils.rollups import update_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the 1m/1h/1d reading rollups from all processed RawData rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Readings folded into the rollups per batch')
+
+    def handle(self, *args, **options):
+        last_id = 0
+        readings = 0
+        with transaction.atomic():
+            ReadingRollup.objects.all().delete()
+            # Unprocessed rows are rolled up by the queue workers when they run
+            while True:
+                chunk = list(RawData.objects.filter(pk__gt=last_id, is_processed=True).order_by('pk').only(
+                    'id', 'device_id', 'timestamp', 'data'
+                )[:options['chunk_size']])
+                if not chunk:
+                    break
+                update_rollups(chunk)
+                readings += len(chunk)
+                last_id = chunk[-1].id
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {readings} readings into {ReadingRollup.objects.count()} buckets"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from data_management.utils.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = "Recount the pre-aggregated dashboard statistics from the underlying tables"
+
+    def handle(self, *args, **options):
+        stats = rebuild_statistics()
+        self.stdout.write(
+            f"raw data: {stats.raw_data_count}, "
+            f"cached: {stats.cached_frequent}/{stats.cached_less_frequent}/{stats.cached_rare}, "
+            f"fragments: {stats.data_fragments} data + {stats.parity_fragments} parity, "
+            f"model v{stats.model_version} with {stats.model_updates} updates"
+        )
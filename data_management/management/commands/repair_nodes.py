@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from data_management.models import DataFragment
+from data_management.utils.placement import configured_nodes, down_nodes, set_node_down
+from data_management.utils.repair import REPAIR_BATCH_SIZE, repair_nodes
+
+
+class Command(BaseCommand):
+    help = "Mark storage nodes down or up and rebuild the fragments lost with down nodes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fail', action='append', default=[], metavar='NODE',
+                            help='Mark a node down (repeatable)')
+        parser.add_argument('--restore', action='append', default=[], metavar='NODE',
+                            help='Mark a node up again (repeatable)')
+        parser.add_argument('--repair', action='store_true',
+                            help='Rebuild fragments held by down nodes on healthy nodes')
+        parser.add_argument('--batch-size', type=int, default=REPAIR_BATCH_SIZE)
+        parser.add_argument('--rate', type=float, default=None,
+                            help='Maximum records repaired per second')
+
+    def handle(self, *args, **options):
+        known = {node.name for node in configured_nodes()}
+        for name in options['fail'] + options['restore']:
+            if name not in known:
+                raise CommandError(f"Unknown storage node '{name}'")
+        for name in options['fail']:
+            set_node_down(name)
+        for name in options['restore']:
+            set_node_down(name, down=False)
+
+        if options['repair']:
+            if not down_nodes():
+                self.stdout.write("No nodes are down; nothing to repair")
+            else:
+                totals = repair_nodes(batch_size=options['batch_size'], max_rate=options['rate'],
+                                      progress=self.progress)
+                self.stdout.write(self.style.SUCCESS(
+                    f"Repaired {totals['repaired']}/{totals['records']} records "
+                    f"({totals['fragments']} fragments, {totals['unrecoverable']} unrecoverable) "
+                    f"in {totals['elapsed']:.2f}s, {totals['records_per_second']:.0f} records/s"
+                ))
+
+        self.report()
+
+    def progress(self, done, total, elapsed):
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(f"  {done}/{total} records, {rate:.0f} records/s")
+
+    def report(self):
+        down = down_nodes()
+        loads = dict(DataFragment.objects.values_list('storage_node').annotate(n=Count('id')))
+        for node in configured_nodes():
+            state = 'DOWN' if node.name in down else 'up'
+            self.stdout.write(f"{node.name:<16} {node.zone:<8} {node.rack:<8} {state:<5} "
+                              f"{loads.get(node.name, 0)} fragments")
@@ -0,0 +1,58 @@
+import signal
+import threading
+import time
+from django.core.management.base import BaseCommand
+from data_management.utils.scrub import SCRUB_CHUNK_SIZE, scrub_fragments
+
+
+class Command(BaseCommand):
+    help = "Verify fragment checksums and rebuild corrupt fragments from the rest of their stripe"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=SCRUB_CHUNK_SIZE,
+                            help='Fragments read per query')
+        parser.add_argument('--rate', type=float, default=None,
+                            help='Maximum MB of fragment data read per second')
+        parser.add_argument('--start-after', type=int, default=0,
+                            help='Resume after this fragment id')
+        parser.add_argument('--continuous', action='store_true',
+                            help='Start a new pass after each one finishes')
+        parser.add_argument('--interval', type=float, default=60.0,
+                            help='Seconds to wait between passes with --continuous')
+        parser.add_argument('--stats-every', type=float, default=10.0,
+                            help='Seconds between progress reports')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+        max_bytes = options['rate'] * 1024 * 1024 if options['rate'] else None
+        start_after = options['start_after']
+        self.stats_every = options['stats_every']
+        self.last_report = time.monotonic()
+        try:
+            while not stop_event.is_set():
+                totals = scrub_fragments(chunk_size=options['chunk_size'], max_bytes_per_second=max_bytes,
+                                         start_after=start_after, progress=self.progress,
+                                         stop_event=stop_event)
+                self.report(totals)
+                if not options['continuous']:
+                    break
+                start_after = 0
+                stop_event.wait(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def progress(self, totals, elapsed):
+        if time.monotonic() - self.last_report < self.stats_every:
+            return
+        self.last_report = time.monotonic()
+        rate = totals['bytes'] / elapsed / (1024 * 1024) if elapsed else 0
+        self.stdout.write(f"  up to fragment {totals['last_id']}: {totals['fragments']} checked, "
+                          f"{totals['corrupt']} corrupt, {rate:.1f} MB/s")
+
+    def report(self, totals):
+        self.stdout.write(self.style.SUCCESS(
+            f"Scrubbed {totals['fragments']} fragments ({totals['bytes'] / (1024 * 1024):.1f} MB) "
+            f"in {totals['elapsed']:.2f}s: {totals['corrupt']} corrupt, {totals['repaired']} records repaired, "
+            f"{totals['unrecoverable']} unrecoverable, {totals['backfilled']} checksums recorded"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2025-06-03 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0002_performancemetrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='globalmodel',
+            name='accuracy',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
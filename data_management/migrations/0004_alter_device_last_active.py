@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2025-06-04 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0003_globalmodel_accuracy'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='device',
+            name='last_active',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0004_alter_device_last_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawdata',
+            name='claim_token',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='rawdata',
+            name='last_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='rawdata',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rawdata',
+            name='processing_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
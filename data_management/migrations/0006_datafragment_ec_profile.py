@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0005_rawdata_processing_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datafragment',
+            name='ec_k',
+            field=models.PositiveSmallIntegerField(default=4),
+        ),
+        migrations.AddField(
+            model_name='datafragment',
+            name='ec_m',
+            field=models.PositiveSmallIntegerField(default=2),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0006_datafragment_ec_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('raw_data_count', models.BigIntegerField(default=0)),
+                ('cached_frequent', models.BigIntegerField(default=0)),
+                ('cached_less_frequent', models.BigIntegerField(default=0)),
+                ('cached_rare', models.BigIntegerField(default=0)),
+                ('data_fragments', models.BigIntegerField(default=0)),
+                ('parity_fragments', models.BigIntegerField(default=0)),
+                ('model_version', models.PositiveIntegerField(blank=True, null=True)),
+                ('model_accuracy', models.FloatField(blank=True, null=True)),
+                ('model_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('model_updates', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:04
+
+import json
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import Length
+
+
+def backfill_sizes(apps, schema_editor):
+    # Sizes for records erasure-coded before they were stored; the encoded
+    # size comes from one grouped aggregate over the fragments
+    RawData = apps.get_model('data_management', 'RawData')
+    DataFragment = apps.get_model('data_management', 'DataFragment')
+    SystemStatistics = apps.get_model('data_management', 'SystemStatistics')
+
+    raw_data_ids = list(DataFragment.objects.values_list('original_data_id', flat=True).distinct())
+    for start in range(0, len(raw_data_ids), 500):
+        chunk = raw_data_ids[start:start + 500]
+        encoded = dict(DataFragment.objects.filter(original_data_id__in=chunk).values_list(
+            'original_data_id'
+        ).annotate(size=Sum(Length('fragment_data'))))
+        rows = list(RawData.objects.filter(pk__in=chunk).only('id', 'data'))
+        for raw_data in rows:
+            try:
+                raw_data.original_size = len(json.dumps(raw_data.data).encode('utf-8'))
+            except TypeError:
+                raw_data.original_size = len(str(raw_data.data).encode('utf-8'))
+            raw_data.encoded_size = encoded[raw_data.id]
+        RawData.objects.bulk_update(rows, ['original_size', 'encoded_size'])
+
+    # The statistics row is recounted on next use
+    SystemStatistics.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0007_systemstatistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawdata',
+            name='encoded_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rawdata',
+            name='original_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='systemstatistics',
+            name='ec_records',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='systemstatistics',
+            name='efficiency_sum',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(backfill_sizes, migrations.RunPython.noop),
+    ]
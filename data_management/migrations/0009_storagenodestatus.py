@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0008_rawdata_sizes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageNodeStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('is_down', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='datafragment',
+            name='storage_node',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0009_storagenodestatus'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datafragment',
+            name='checksum',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
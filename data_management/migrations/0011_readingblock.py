@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0010_datafragment_checksum'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='datafragment',
+            name='original_data',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='data_management.rawdata'),
+        ),
+        migrations.CreateModel(
+            name='ReadingBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reading_count', models.PositiveIntegerField()),
+                ('compression', models.CharField(max_length=10)),
+                ('original_size', models.PositiveIntegerField()),
+                ('packed_size', models.PositiveIntegerField()),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='data_management.device')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='datafragment',
+            name='block',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='data_management.readingblock'),
+        ),
+        migrations.AddField(
+            model_name='rawdata',
+            name='block',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='readings', to='data_management.readingblock'),
+        ),
+    ]
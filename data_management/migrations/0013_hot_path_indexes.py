@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0012_readingrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cacheddata',
+            index=models.Index(fields=['cache_level', 'last_accessed'], name='cacheddata_level_accessed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='globalmodel',
+            index=models.Index(fields=['-version'], name='globalmodel_version_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performancemetrics',
+            index=models.Index(fields=['-timestamp'], name='perfmetrics_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rawdata',
+            index=models.Index(condition=models.Q(('is_processed', False)), fields=['id'], name='rawdata_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rawdata',
+            index=models.Index(condition=models.Q(('is_processed', False)), fields=['claim_token'], name='rawdata_claim_token_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rawdata',
+            index=models.Index(fields=['device', '-timestamp', '-id'], name='rawdata_device_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rawdata',
+            index=models.Index(fields=['-timestamp'], name='rawdata_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0013_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performancemetrics',
+            name='sample_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
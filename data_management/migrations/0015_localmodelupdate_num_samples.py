@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0014_performancemetrics_sample_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localmodelupdate',
+            name='num_samples',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0015_localmodelupdate_num_samples'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localmodelupdate',
+            name='is_delta',
+            field=models.BooleanField(default=False),
+        ),
+    ]
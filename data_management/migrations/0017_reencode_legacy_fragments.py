@@ -0,0 +1,83 @@
+import json
+import zlib
+from collections import defaultdict
+import numpy as np
+from django.db import migrations
+from data_management.utils.gf256 import encoding_matrix, gf_matmul
+
+
+def serialize(data):
+    # As erasure_coding.serialize_data when this migration was written
+    try:
+        return json.dumps(json.loads(data) if isinstance(data, str) else data).encode('utf-8')
+    except (TypeError, json.JSONDecodeError):
+        return str(data).encode('utf-8')
+
+
+def encode(payload, k, m):
+    # Systematic GF(256) Reed-Solomon, as ReedSolomonEC.encode
+    chunk_size = (len(payload) + k - 1) // k
+    data_matrix = np.frombuffer(payload.ljust(chunk_size * k, b'\0'), dtype=np.uint8).reshape(k, chunk_size)
+    stripe = np.concatenate([data_matrix, gf_matmul(encoding_matrix(k, m)[k:], data_matrix)])
+    return {f"F{i + 1}": row.tobytes() for i, row in enumerate(stripe)}
+
+
+def reencode_legacy_fragments(apps, schema_editor):
+    # Fragments written by the original integer Vandermonde code cannot be
+    # decoded by the GF(256) codec. They are recognised by their data
+    # fragments not joining up to the payload, which the systematic code
+    # guarantees. The payload is still in RawData.data, so each such record
+    # is encoded again in place: same rows, ids and nodes, new bytes and
+    # checksums.
+    RawData = apps.get_model('data_management', 'RawData')
+    DataFragment = apps.get_model('data_management', 'DataFragment')
+    SystemStatistics = apps.get_model('data_management', 'SystemStatistics')
+
+    raw_data_ids = list(DataFragment.objects.filter(original_data__isnull=False).values_list(
+        'original_data_id', flat=True
+    ).distinct().order_by('original_data_id'))
+    reencoded = 0
+    for start in range(0, len(raw_data_ids), 500):
+        chunk = raw_data_ids[start:start + 500]
+        by_record = defaultdict(list)
+        for fragment in DataFragment.objects.filter(original_data_id__in=chunk):
+            by_record[fragment.original_data_id].append(fragment)
+        payloads = {raw_data.id: serialize(raw_data.data)
+                    for raw_data in RawData.objects.filter(pk__in=chunk).only('id', 'data')}
+
+        fragments_to_update = []
+        records_to_update = []
+        for raw_data_id, fragments in by_record.items():
+            k, m = fragments[0].ec_k, fragments[0].ec_m
+            data_fragments = sorted((f for f in fragments if not f.is_parity), key=lambda f: int(f.fragment_id[1:]))
+            joined = b''.join(bytes(f.fragment_data) for f in data_fragments).rstrip(b'\0')
+            payload = payloads[raw_data_id]
+            if len(data_fragments) == k and joined == payload.rstrip(b'\0'):
+                continue
+            encoded = encode(payload, k, m)
+            for fragment in fragments:
+                fragment.fragment_data = encoded[fragment.fragment_id]
+                fragment.checksum = zlib.crc32(fragment.fragment_data)
+                fragments_to_update.append(fragment)
+            records_to_update.append(RawData(
+                id=raw_data_id, original_size=len(payload),
+                encoded_size=sum(len(fragment_data) for fragment_data in encoded.values()),
+            ))
+        DataFragment.objects.bulk_update(fragments_to_update, ['fragment_data', 'checksum'], batch_size=500)
+        RawData.objects.bulk_update(records_to_update, ['original_size', 'encoded_size'], batch_size=500)
+        reencoded += len(records_to_update)
+
+    if reencoded:
+        # Storage efficiency changed with the sizes; recounted on next use
+        SystemStatistics.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0016_localmodelupdate_is_delta'),
+    ]
+
+    operations = [
+        migrations.RunPython(reencode_legacy_fragments, migrations.RunPython.noop),
+    ]
@@ -19,6 +19,27 @@ class RawData(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     data = models.JSONField()  # Store sensor readings
     is_processed = models.BooleanField(default=False)
+    # Background processing queue bookkeeping
+    processing_attempts = models.PositiveSmallIntegerField(default=0)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    claim_token = models.CharField(max_length=32, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    # Serialized and erasure-coded sizes in bytes, set when fragments are stored
+    original_size = models.PositiveIntegerField(null=True, blank=True)
+    encoded_size = models.PositiveIntegerField(null=True, blank=True)
+    # Compact block holding this reading's erasure-coded copy, if any
+    block = models.ForeignKey('ReadingBlock', null=True, blank=True, on_delete=models.SET_NULL,
+                              related_name='readings')
+
+    class Meta:
+        indexes = [
+            # The processing queue only ever looks at unprocessed rows
+            models.Index(fields=['id'], condition=models.Q(is_processed=False), name='rawdata_pending_idx'),
+            models.Index(fields=['claim_token'], condition=models.Q(is_processed=False),
+                         name='rawdata_claim_token_idx'),
+            models.Index(fields=['device', '-timestamp', '-id'], name='rawdata_device_recent_idx'),
+            models.Index(fields=['-timestamp'], name='rawdata_recent_idx'),
+        ]
 
 class CachedData(models.Model):
     CACHE_LEVEL_CHOICES = [
@@ -31,12 +52,41 @@ class CachedData(models.Model):
     last_accessed = models.DateTimeField(auto_now=True)
     access_count = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['cache_level', 'last_accessed'], name='cacheddata_level_accessed_idx'),
+        ]
+
+class ReadingBlock(models.Model):
+    # Struct-packed, compressed readings of one device, erasure-coded as a
+    # single stripe; see utils/block_format.py
+    device = models.ForeignKey(Device, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    reading_count = models.PositiveIntegerField()
+    compression = models.CharField(max_length=10)
+    original_size = models.PositiveIntegerField()  # JSON bytes of the readings
+    packed_size = models.PositiveIntegerField()  # Block bytes before erasure coding
+
 class DataFragment(models.Model):
-    original_data = models.ForeignKey(RawData, on_delete=models.CASCADE)
+    # A fragment belongs to either a single reading or a reading block
+    original_data = models.ForeignKey(RawData, null=True, blank=True, on_delete=models.CASCADE)
+    block = models.ForeignKey(ReadingBlock, null=True, blank=True, on_delete=models.CASCADE)
     fragment_id = models.CharField(max_length=10)
     fragment_data = models.BinaryField()
-    storage_node = models.CharField(max_length=100) 
+    storage_node = models.CharField(max_length=100, db_index=True)
     is_parity = models.BooleanField(default=False)
+    # Erasure coding profile the fragment was written with (k data + m parity)
+    ec_k = models.PositiveSmallIntegerField(default=4)
+    ec_m = models.PositiveSmallIntegerField(default=2)
+    # CRC-32 of fragment_data; null for fragments written before checksums
+    checksum = models.BigIntegerField(null=True, blank=True)
+
+class StorageNodeStatus(models.Model):
+    # Availability of a configured storage node; nodes without a row are up.
+    # Fragments on a down node are treated as lost until repaired elsewhere.
+    name = models.CharField(max_length=100, unique=True)
+    is_down = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now=True)
 
 class GlobalModel(models.Model):
     version = models.PositiveIntegerField()
@@ -45,17 +95,73 @@ class GlobalModel(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     accuracy = models.FloatField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-version'], name='globalmodel_version_idx'),
+        ]
+
 class LocalModelUpdate(models.Model):
     device = models.ForeignKey(Device, on_delete=models.CASCADE)
     global_model = models.ForeignKey(GlobalModel, on_delete=models.CASCADE)
     gradients = models.BinaryField()  # Serialized gradients
     created_at = models.DateTimeField(auto_now_add=True)
+    num_samples = models.PositiveIntegerField(default=1)  # Training examples, the FedAvg weight
+    is_delta = models.BooleanField(default=False)  # Parameters are relative to global_model's
 
 
 class PerformanceMetrics(models.Model):
+    # One row per flush of the request metrics buffer, averaging its samples
     timestamp = models.DateTimeField(auto_now_add=True)
+    sample_count = models.PositiveIntegerField(default=1)
     edge_processing_time = models.FloatField()  # in milliseconds
     cloud_processing_time = models.FloatField()  # in milliseconds (simulated)
     data_transfer_size = models.FloatField()  # in KB
     raw_storage_size = models.FloatField()  # in KB
-    encoded_storage_size = models.FloatField()  # in KB
\ No newline at end of file
+    encoded_storage_size = models.FloatField()  # in KB
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-timestamp'], name='perfmetrics_recent_idx'),
+        ]
+
+class ReadingRollup(models.Model):
+    # Per-device, per-type aggregate of reading values over one time bucket,
+    # maintained incrementally by utils/rollups.py
+    RESOLUTION_CHOICES = [
+        ('1m', '1 minute'),
+        ('1h', '1 hour'),
+        ('1d', '1 day'),
+    ]
+    device = models.ForeignKey(Device, on_delete=models.CASCADE)
+    reading_type = models.CharField(max_length=50)
+    resolution = models.CharField(max_length=2, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0.0)
+    minimum = models.FloatField(null=True, blank=True)
+    maximum = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['device', 'resolution', 'reading_type', 'bucket_start'],
+                name='unique_reading_rollup_bucket',
+            ),
+        ]
+
+class SystemStatistics(models.Model):
+    # Single pre-aggregated row (pk=1) kept up to date by the write paths so the
+    # dashboard never has to count whole tables; see utils/statistics.py
+    raw_data_count = models.BigIntegerField(default=0)
+    cached_frequent = models.BigIntegerField(default=0)
+    cached_less_frequent = models.BigIntegerField(default=0)
+    cached_rare = models.BigIntegerField(default=0)
+    data_fragments = models.BigIntegerField(default=0)
+    parity_fragments = models.BigIntegerField(default=0)
+    ec_records = models.BigIntegerField(default=0)
+    efficiency_sum = models.FloatField(default=0.0)  # Sum of clamped per-record efficiencies
+    model_version = models.PositiveIntegerField(null=True, blank=True)
+    model_accuracy = models.FloatField(null=True, blank=True)
+    model_updated_at = models.DateTimeField(null=True, blank=True)
+    model_updates = models.BigIntegerField(default=0)  # Local updates for the current model
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,86 @@
+import pickle
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from ..models import Device, GlobalModel, LocalModelUpdate
+from ..utils.fedavg import merge_partials, partial_sum, robust_mean
+from ..utils.federated_learning import aggregate_local_updates
+
+# Per-update value of every parameter and its num_samples; the last update is an outlier
+VALUES = [1, 2, 3, 4, 5, 6, 7, 8, 9, 1000]
+WEIGHTS = [1, 1, 1, 1, 1, 1, 1, 1, 1, 11]
+
+
+def gradients(value, accuracy=0.5, features=5):
+    return pickle.dumps({
+        'coef_': np.full((1, features), value, dtype=np.float64),
+        'intercept_': np.full(1, value, dtype=np.float64),
+        'accuracy': accuracy,
+    })
+
+
+class ReductionTests(SimpleTestCase):
+    def test_partials_merge_to_the_whole(self):
+        rows = [(gradients(value), weight) for value, weight in zip(VALUES, WEIGHTS)]
+        whole = partial_sum(rows)
+        merged = merge_partials([partial_sum(rows[:3]), None, partial_sum(rows[3:])])
+        np.testing.assert_allclose(merged['sum'], whole['sum'])
+        self.assertEqual((merged['weight'], merged['count']), (whole['weight'], whole['count']))
+
+    def test_merge_leaves_partials_untouched(self):
+        first = partial_sum([(gradients(1), 1)])
+        before = first['sum'].copy()
+        merge_partials([first, partial_sum([(gradients(2), 1)])])
+        np.testing.assert_array_equal(first['sum'], before)
+
+    def test_robust_means(self):
+        vectors = np.array(VALUES, dtype=np.float64)[:, None]
+        self.assertEqual(robust_mean(vectors, 'median')[0], 5.5)
+        self.assertEqual(robust_mean(vectors, 'trimmed_mean', 0.1)[0], 5.5)
+        # Too few rows to trim anything
+        self.assertEqual(robust_mean(vectors[:3], 'trimmed_mean', 0.1)[0], 2.0)
+
+
+class AggregationTests(TestCase):
+    def setUp(self):
+        device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        global_model = GlobalModel.objects.create(version=1, model_data=b'')
+        LocalModelUpdate.objects.bulk_create([
+            LocalModelUpdate(device=device, global_model=global_model, gradients=gradients(value, value / 1000),
+                             num_samples=weight)
+            for value, weight in zip(VALUES, WEIGHTS)
+        ])
+        self.updates = LocalModelUpdate.objects.all()
+
+    def aggregate(self, method, **kwargs):
+        parameters, accuracy, weight = aggregate_local_updates(self.updates, method=method, **kwargs)
+        self.assertEqual(weight, sum(WEIGHTS))
+        self.assertEqual(parameters['coef_'].shape, (1, 5))
+        self.assertEqual(parameters['intercept_'].shape, (1,))
+        return parameters['coef_'][0, 0], parameters['intercept_'][0], accuracy
+
+    def test_methods_against_each_other(self):
+        fedavg = (sum(VALUES[:9]) + 1000 * 11) / 20
+        # The outlier pulls the weighted mean far off; the robust methods ignore it
+        for method, expected in (('fedavg', fedavg), ('median', 5.5), ('trimmed_mean', 5.5)):
+            coef, intercept, accuracy = self.aggregate(method)
+            self.assertEqual((coef, intercept), (expected, expected), method)
+            self.assertAlmostEqual(accuracy, expected / 1000)
+        self.assertEqual(self.aggregate('trimmed_mean', trim_ratio=0.2)[0], 5.5)
+
+    def test_chunking_does_not_change_the_result(self):
+        for method in ('fedavg', 'trimmed_mean', 'median'):
+            self.assertEqual(self.aggregate(method, chunk_size=3), self.aggregate(method))
+
+    def test_process_pool_matches_in_process(self):
+        self.assertEqual(self.aggregate('fedavg', chunk_size=4, workers=2), self.aggregate('fedavg'))
+
+    def test_updates_with_another_shape_are_left_out(self):
+        update = self.updates.first()
+        LocalModelUpdate.objects.create(device=update.device, global_model=update.global_model,
+                                        gradients=gradients(-1e6, features=3))
+        self.assertEqual(self.aggregate('median')[0], 5.5)
+
+    def test_no_updates_and_unknown_methods(self):
+        self.assertIsNone(aggregate_local_updates(LocalModelUpdate.objects.none()))
+        with self.assertRaises(ValueError):
+            aggregate_local_updates(self.updates, method='mean')
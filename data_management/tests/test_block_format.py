@@ -0,0 +1,111 @@
+from unittest import mock
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..models import DataFragment, Device, RawData, ReadingBlock
+from ..utils import block_format, placement
+from ..utils.block_format import decode_block, encode_block, pack_reading
+from ..utils.erasure_coding import recover_many, store_with_ec_batch
+from ..utils.placement import set_node_down
+from ..utils.repair import repair_nodes
+from ..utils.scrub import scrub_fragments
+
+READINGS = [
+    {'type': 'temperature', 'value': 21.5, 'timestamp': '2026-10-18T10:00:00.123456', 'unit': '°C'},
+    {'type': 'humidity', 'value': 40, 'timestamp': '2026-10-18T10:00:01', 'unit': '%'},
+    {'type': 'pressure', 'value': 1013.25, 'timestamp': '2026-10-18T10:00:02.500000', 'unit': 'hPa'},
+    {'type': 'random', 'value': -3, 'timestamp': '1969-12-31T23:59:59', 'unit': 'unit'},
+]
+
+
+class BlockFormatTests(SimpleTestCase):
+    def test_round_trip(self):
+        rows = [(100 + i, pack_reading(data)) for i, data in enumerate(READINGS)]
+        for compression in ('zlib', 'none'):
+            self.assertEqual(decode_block(encode_block(rows, compression)),
+                             [(100 + i, data) for i, data in enumerate(READINGS)])
+
+    def test_round_trip_survives_stripped_padding(self):
+        # Erasure decoding strips trailing zero bytes from the block
+        block = encode_block([(1, pack_reading(READINGS[0]))], 'none')
+        self.assertEqual(decode_block(block.rstrip(b'\0')), [(1, READINGS[0])])
+
+    def test_zstd_falls_back_to_zlib_without_zstandard(self):
+        rows = [(1, pack_reading(READINGS[1]))]
+        with mock.patch.object(block_format, 'zstandard', None):
+            block = encode_block(rows, 'zstd')
+        self.assertEqual(block[4], block_format.CODECS['zlib'])
+        self.assertEqual(decode_block(block), [(1, READINGS[1])])
+
+    def test_readings_the_format_cannot_reproduce(self):
+        reading = READINGS[0]
+        for data in (
+            {**reading, 'type': 'co2'},
+            {**reading, 'unit': 'ppm'},
+            {**reading, 'extra': 1},
+            {**reading, 'value': 0.1 + 0.2},
+            {**reading, 'value': 2 ** 40 + 1},
+            {**reading, 'value': True},
+            {**reading, 'value': '21.5'},
+            {**reading, 'timestamp': '2026-10-18T10:00:00+00:00'},
+            {**reading, 'timestamp': '2026-10-18 10:00:00'},
+            [reading],
+        ):
+            self.assertIsNone(pack_reading(data), data)
+
+    def test_not_a_block(self):
+        with self.assertRaises(ValueError):
+            decode_block(b'JSON' + bytes(16))
+
+
+@override_settings(ERASURE_CODING={**settings.ERASURE_CODING, 'BLOCKS': {'ENABLED': True, 'MAX_READINGS': 3}})
+class BlockStorageTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(placement._status_cache, {'loaded_at': 0.0, 'down': frozenset()})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        devices = [Device.objects.create(name=f'sensor {i}', device_type='Temperature', location='lab')
+                   for i in range(2)]
+        self.readings = [
+            RawData.objects.create(device=devices[i % 2], data=data)
+            for i, data in enumerate(READINGS * 2)
+        ]
+        # Not representable in a block, so stored as JSON on its own
+        self.readings.append(RawData.objects.create(device=devices[0], data={**READINGS[0], 'note': 'x'}))
+        self.ids = [raw_data.id for raw_data in self.readings]
+        store_with_ec_batch(self.ids)
+        self.expected = {raw_data.id: raw_data.data for raw_data in self.readings}
+
+    def test_readings_are_packed_per_device(self):
+        # 4 readings per device, at most 3 per block
+        self.assertEqual(sorted(ReadingBlock.objects.values_list('reading_count', flat=True)), [1, 1, 3, 3])
+        self.assertEqual(RawData.objects.filter(block__isnull=True).get().id, self.ids[-1])
+        self.assertEqual(DataFragment.objects.filter(block__isnull=False).count(), 4 * 6)
+        self.assertEqual(DataFragment.objects.filter(original_data__isnull=False).count(), 6)
+        for raw_data in RawData.objects.all():
+            self.assertTrue(raw_data.original_size and raw_data.encoded_size)
+
+    def test_recovers_block_and_json_readings(self):
+        self.assertEqual(recover_many(self.ids), self.expected)
+        DataFragment.objects.filter(fragment_id__in=['F1', 'F4']).delete()
+        self.assertEqual(recover_many(self.ids), self.expected)
+
+    def test_repair_and_scrub_handle_block_stripes(self):
+        set_node_down('edge_node_2')
+        totals = repair_nodes()
+        self.assertEqual((totals['records'], totals['unrecoverable']), (5, 0))
+        self.assertFalse(DataFragment.objects.filter(storage_node='edge_node_2').exists())
+
+        fragment = DataFragment.objects.filter(block__isnull=False, fragment_id='F2').first()
+        DataFragment.objects.filter(pk=fragment.pk).update(fragment_data=bytes(len(fragment.fragment_data)))
+        self.assertEqual(scrub_fragments()['corrupt'], 1)
+        self.assertEqual(scrub_fragments()['corrupt'], 0)
+        self.assertEqual(recover_many(self.ids), self.expected)
+
+    def test_unrecoverable_blocks_are_logged(self):
+        DataFragment.objects.filter(block__isnull=False, fragment_id__in=['F1', 'F2', 'F3']).delete()
+        with self.assertLogs('data_management.utils.erasure_coding', 'ERROR') as logs:
+            recovered = recover_many(self.ids)
+        self.assertEqual(len(logs.records), ReadingBlock.objects.count())
+        self.assertIn('error', recovered[self.ids[0]])
+        self.assertEqual(recovered[self.ids[-1]], self.expected[self.ids[-1]])
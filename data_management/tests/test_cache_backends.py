@@ -0,0 +1,47 @@
+import shutil
+import tempfile
+from pathlib import Path
+from django.test import SimpleTestCase
+from ..cache_backends import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(Path(self.directory) / 'cache.sqlite3', {'OPTIONS': options})
+
+    def assertTotalsMatchRows(self, cache):
+        entries, stored_bytes = cache._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries'
+        ).fetchone()
+        self.assertEqual(cache.stats(), {'entries': entries, 'bytes': stored_bytes})
+
+    def test_overwrites_keep_totals_in_step(self):
+        for i in range(250):
+            self.cache.set('key', 'x' * (i % 7))
+        self.assertTotalsMatchRows(self.cache)
+        self.assertEqual(self.cache.stats()['entries'], 1)
+        self.assertEqual(self.cache.get('key'), 'x' * (249 % 7))
+
+    def test_set_many_add_and_delete_keep_totals_in_step(self):
+        self.cache.set_many({f'key{i}': i for i in range(20)})
+        self.cache.set_many({f'key{i}': 'value' * i for i in range(10, 30)})
+        self.assertFalse(self.cache.add('key0', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.cache.delete_many([f'key{i}' for i in range(5)])
+        self.assertTotalsMatchRows(self.cache)
+        self.assertEqual(self.cache.stats()['entries'], 26)
+        self.assertEqual(self.cache.get('key0', 'missing'), 'missing')
+        self.assertEqual(self.cache.get('key12'), 'value' * 12)
+
+    def test_overwriting_a_full_cache_keeps_its_entries(self):
+        cache = self.make_cache(MAX_ENTRIES=10)
+        cache.set_many({f'key{i}': i for i in range(10)})
+        for _ in range(50):
+            cache.set('key0', 0)
+        self.assertTotalsMatchRows(cache)
+        self.assertEqual(len(cache.get_many([f'key{i}' for i in range(10)])), 10)
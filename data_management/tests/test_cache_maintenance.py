@@ -0,0 +1,93 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import caches
+from django.core.management import call_command
+from django.forms.models import model_to_dict
+from django.test import TestCase
+from django.utils import timezone
+from ..models import CachedData, Device, RawData
+from ..utils import caching
+from ..utils.cache_maintenance import TIER_CACHES, run_maintenance
+from ..utils.caching import HierarchicalCache
+from ..utils.statistics import get_statistics, rebuild_statistics
+from .utils import use_fresh_cache_policy, use_temporary_cache_tiers
+
+# level, idle, value still cached
+ENTRIES = [
+    ('FREQUENT', True, True),
+    ('FREQUENT', True, True),
+    ('FREQUENT', True, False),
+    ('FREQUENT', False, True),
+    ('LESS_FREQUENT', True, True),
+    ('LESS_FREQUENT', True, True),
+    ('RARE', True, True),
+    ('RARE', False, True),
+]
+
+
+class CacheMaintenanceTests(TestCase):
+    def setUp(self):
+        use_temporary_cache_tiers(self)
+        use_fresh_cache_policy(self)
+        device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        self.ids = []
+        for i, (level, idle, cached) in enumerate(ENTRIES):
+            raw_data = RawData.objects.create(device=device, data={'type': 'temperature', 'value': i})
+            CachedData.objects.create(raw_data=raw_data, cache_level=level)
+            if idle:
+                # Past every tier's idle threshold
+                CachedData.objects.filter(raw_data=raw_data).update(
+                    last_accessed=timezone.now() - timedelta(hours=2)
+                )
+            if cached:
+                caches[TIER_CACHES[level]].set(f'data_{raw_data.id}', raw_data.data)
+            self.ids.append(raw_data.id)
+        rebuild_statistics()
+
+    def levels(self):
+        return dict(CachedData.objects.values_list('raw_data_id', 'cache_level'))
+
+    def tier_of(self, raw_data_id):
+        for level, alias in TIER_CACHES.items():
+            if caches[alias].get(f'data_{raw_data_id}') is not None:
+                return level
+        return None
+
+    def test_demotes_idle_entries_one_tier_and_evicts_idle_rare_ones(self):
+        report = run_maintenance(batch_size=2)
+        self.assertEqual((report['moved'], report['evicted']), (4, 2))
+        self.assertEqual(report['levels']['FREQUENT'], {**report['levels']['FREQUENT'],
+                                                         'moved': 2, 'evicted': 1, 'batches': 2})
+        # Idle FREQUENT and LESS_FREQUENT entries move down exactly one tier
+        expected = {
+            self.ids[0]: 'LESS_FREQUENT', self.ids[1]: 'LESS_FREQUENT', self.ids[3]: 'FREQUENT',
+            self.ids[4]: 'RARE', self.ids[5]: 'RARE', self.ids[7]: 'RARE',
+        }
+        self.assertEqual(self.levels(), expected)
+        for raw_data_id, level in expected.items():
+            self.assertEqual(self.tier_of(raw_data_id), level)
+        self.assertIsNone(self.tier_of(self.ids[6]))
+
+        counters = model_to_dict(get_statistics(), fields=['cached_frequent', 'cached_less_frequent', 'cached_rare'])
+        self.assertEqual(counters, {'cached_frequent': 1, 'cached_less_frequent': 2, 'cached_rare': 3})
+        self.assertEqual(counters, model_to_dict(rebuild_statistics(), fields=list(counters)))
+
+    def test_max_batches(self):
+        report = run_maintenance(batch_size=1, max_batches=3)
+        self.assertEqual((report['batches'], report['moved'], report['evicted']), (3, 2, 1))
+        # Coldest tier first, so FREQUENT was not reached yet
+        self.assertEqual(report['levels']['FREQUENT']['batches'], 0)
+        self.assertEqual(CachedData.objects.filter(cache_level='FREQUENT').count(), 4)
+
+    def test_reads_find_values_moved_by_another_process(self):
+        raw_data_id = self.ids[0]
+        # This process last saw the entry in FREQUENT
+        caching.policy.access(raw_data_id, 'FREQUENT')
+        run_maintenance()
+        self.assertEqual(HierarchicalCache().get_data(raw_data_id), {'type': 'temperature', 'value': 0})
+        self.assertEqual(caching.policy.level_of(raw_data_id), 'LESS_FREQUENT')
+
+    def test_command(self):
+        out = StringIO()
+        call_command('maintain_cache', stdout=out)
+        self.assertIn('Cache maintenance: 4 moved, 2 evicted', out.getvalue())
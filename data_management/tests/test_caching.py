@@ -0,0 +1,125 @@
+from unittest import mock
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase
+from ..models import CachedData, Device, RawData
+from ..utils import caching
+from ..utils.cache_policy import FrequencySketch, TieredCachePolicy
+from ..utils.caching import HierarchicalCache
+from .utils import use_fresh_cache_policy, use_temporary_cache_tiers
+
+CAPACITY = {'FREQUENT': 1, 'LESS_FREQUENT': 2, 'RARE': 2}
+PROMOTE_AT = {'FREQUENT': 4, 'LESS_FREQUENT': 2}
+
+
+class FrequencySketchTests(SimpleTestCase):
+    def test_counts_saturate_and_age(self):
+        sketch = FrequencySketch(width=64, sample_size=40)
+        for _ in range(20):
+            sketch.increment('hot')
+        self.assertEqual(sketch.estimate('hot'), 15)
+        self.assertEqual(sketch.estimate('cold'), 0)
+        for _ in range(20):
+            sketch.increment('other')
+        # Reaching the sample size halves every counter
+        self.assertLess(sketch.estimate('hot'), 15)
+
+
+class TieredCachePolicyTests(SimpleTestCase):
+    def setUp(self):
+        self.policy = TieredCachePolicy(CAPACITY, PROMOTE_AT, FrequencySketch(width=1024))
+
+    def test_new_keys_enter_rare_and_overflow_is_evicted(self):
+        for key in (1, 2):
+            self.assertEqual(self.policy.admit(key), ('RARE', []))
+        level, changes = self.policy.admit(3)
+        self.assertEqual(level, 'RARE')
+        # The least recently used RARE entry leaves the cache
+        self.assertEqual(changes, [(1, 'RARE', None)])
+        self.assertIsNone(self.policy.level_of(1))
+
+    def test_hits_promote_one_tier_at_a_time(self):
+        self.policy.admit(1)
+        self.assertEqual(self.policy.access(1), ('LESS_FREQUENT', [(1, 'RARE', 'LESS_FREQUENT')]))
+        self.assertEqual(self.policy.access(1), ('LESS_FREQUENT', []))
+        self.assertEqual(self.policy.access(1), ('FREQUENT', [(1, 'LESS_FREQUENT', 'FREQUENT')]))
+
+    def test_full_tier_admits_only_more_popular_keys(self):
+        for key in (1, 2):
+            self.policy.admit(key)
+        for _ in range(5):
+            self.policy.access(1)
+        self.assertEqual(self.policy.level_of(1), 'FREQUENT')
+
+        # Key 2 reaches the FREQUENT threshold but is less popular than key 1
+        for _ in range(3):
+            self.policy.access(2)
+        self.assertEqual(self.policy.level_of(2), 'LESS_FREQUENT')
+
+        # Once it is more popular it takes the slot and key 1 is demoted
+        for _ in range(3):
+            level, changes = self.policy.access(2)
+        self.assertEqual(level, 'FREQUENT')
+        self.assertIn((1, 'FREQUENT', 'LESS_FREQUENT'), changes)
+
+    def test_popular_keys_reenter_above_rare(self):
+        self.policy.admit(1)
+        for _ in range(4):
+            self.policy.access(1)
+        self.policy.discard(1)
+        self.assertEqual(self.policy.admit(1)[0], 'FREQUENT')
+
+
+class HierarchicalCacheTests(TestCase):
+    def setUp(self):
+        use_temporary_cache_tiers(self)
+        self.access_log = use_fresh_cache_policy(
+            self, TieredCachePolicy(CAPACITY, PROMOTE_AT, FrequencySketch(width=1024))
+        )
+
+        device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        self.readings = [
+            RawData.objects.create(device=device, data={'type': 'temperature', 'value': i}) for i in range(3)
+        ]
+        self.cache = HierarchicalCache()
+
+    def test_values_follow_their_tier(self):
+        raw_data = self.readings[0]
+        self.cache.cache_data(raw_data.id, raw_data.data)
+        self.assertEqual(CachedData.objects.get(raw_data=raw_data).cache_level, 'RARE')
+        self.assertEqual(caches['rare'].get(f'data_{raw_data.id}'), raw_data.data)
+
+        self.assertEqual(self.cache.get_data(raw_data.id), raw_data.data)
+        self.assertIsNone(caches['rare'].get(f'data_{raw_data.id}'))
+        self.assertEqual(caches['less_frequent'].get(f'data_{raw_data.id}'), raw_data.data)
+
+    def test_access_counts_are_written_in_batches(self):
+        raw_data = self.readings[0]
+        self.cache.cache_data(raw_data.id, raw_data.data)
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.cache.get_data(raw_data.id)
+        self.access_log.flush()
+        cached = CachedData.objects.get(raw_data=raw_data)
+        self.assertEqual((cached.access_count, cached.cache_level), (3, 'FREQUENT'))
+
+    def test_evicted_entries_are_removed(self):
+        self.cache.cache_many({raw_data.id: raw_data.data for raw_data in self.readings})
+        self.access_log.flush()
+        first = self.readings[0]
+        self.assertFalse(CachedData.objects.filter(raw_data=first).exists())
+        self.assertIsNone(self.cache.get_data(first.id))
+        self.assertEqual(self.cache.get_data(self.readings[2].id), self.readings[2].data)
+
+    def test_get_many_reads_each_tier_once(self):
+        first, second, third = self.readings
+        self.cache.cache_many({first.id: first.data, second.id: second.data})
+        self.cache.get_data(first.id)
+        # Values cached by another process are probed hottest tier first
+        caches['frequent'].set(f'data_{third.id}', third.data)
+
+        with mock.patch.object(caches['rare'], 'get_many', wraps=caches['rare'].get_many) as rare_get_many:
+            found = self.cache.get_many([first.id, second.id, third.id, 999])
+        self.assertEqual(found, {first.id: first.data, second.id: second.data, third.id: third.data})
+        # One lookup for the known RARE entry, one probe for the unknown id
+        self.assertEqual(rare_get_many.call_count, 2)
+        self.assertEqual(caching.policy.level_of(third.id), 'FREQUENT')
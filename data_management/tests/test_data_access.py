@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db.models import JSONField, Value
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from ..models import DataFragment, Device, RawData
+from ..utils.data_access import get_readings
+from ..utils.erasure_coding import store_with_ec_batch
+from .utils import use_fresh_cache_policy, use_temporary_cache_tiers
+
+
+class ReadThroughTests(TestCase):
+    def setUp(self):
+        use_temporary_cache_tiers(self)
+        use_fresh_cache_policy(self)
+
+        self.device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        self.readings = [
+            RawData.objects.create(device=self.device, data={'type': 'temperature', 'value': i})
+            for i in range(3)
+        ]
+        self.ids = [raw_data.id for raw_data in self.readings]
+
+    def test_database_reads_are_cached(self):
+        first = get_readings(self.ids + [999])
+        self.assertEqual(list(first), self.ids)
+        self.assertEqual({reading['source'] for reading in first.values()}, {'database'})
+        self.assertEqual(first[self.ids[0]]['data'], self.readings[0].data)
+
+        with self.assertNumQueries(0):
+            second = get_readings(self.ids)
+        self.assertEqual({reading['source'] for reading in second.values()}, {'cache'})
+        self.assertEqual([reading['data'] for reading in second.values()],
+                         [raw_data.data for raw_data in self.readings])
+
+    @override_settings(ERASURE_CODING={**settings.ERASURE_CODING, 'BLOCKS': {'ENABLED': True}})
+    def test_rows_without_data_are_recovered_from_fragments(self):
+        for i, raw_data in enumerate(self.readings):
+            raw_data.data = {'type': 'temperature', 'value': 20 + i, 'timestamp': '2026-10-18T10:00:00', 'unit': '°C'}
+            raw_data.save()
+        bare = RawData.objects.create(device=self.device, data=7)
+        store_with_ec_batch(self.ids + [bare.id])
+        self.assertEqual(RawData.objects.filter(pk__in=self.ids, block__isnull=False).count(), 3)
+
+        # The rows lose their payload; the fragments still hold it
+        RawData.objects.filter(pk__in=self.ids + [bare.id]).update(data=Value(None, JSONField()))
+        # A reading with too few fragments left cannot be recovered
+        lost = RawData.objects.create(device=self.device, data=Value(None, JSONField()))
+        DataFragment.objects.create(original_data=lost, fragment_id='F1', fragment_data=b'\xff',
+                                    storage_node='edge_node_0')
+
+        with self.assertLogs('data_management.utils.erasure_coding', 'ERROR'):
+            readings = get_readings(self.ids + [bare.id, lost.id])
+        self.assertEqual(list(readings), self.ids + [bare.id])
+        self.assertEqual({reading['source'] for reading in readings.values()}, {'fragments'})
+        self.assertEqual([reading['data']['value'] for reading in readings.values() if reading['data'] != 7],
+                         [20, 21, 22])
+        self.assertEqual(readings[bare.id]['data'], 7)
+        # Recovered readings are cached like database reads
+        self.assertEqual({reading['source'] for reading in get_readings(self.ids).values()}, {'cache'})
+
+    def test_readings_api(self):
+        url = reverse('readings_api')
+        response = self.client.get(url, {'ids': ','.join(map(str, self.ids))})
+        self.assertEqual(response.json()['count'], 3)
+
+        response = self.client.get(url, {'start': self.ids[1], 'end': self.ids[2]})
+        self.assertEqual([reading['id'] for reading in response.json()['readings']], self.ids[1:])
+
+        response = self.client.get(url, {'device_id': self.device.id, 'latest': 2})
+        self.assertEqual({reading['id'] for reading in response.json()['readings']}, set(self.ids[1:]))
+
+        response = self.client.get(reverse('reading_api', args=[self.ids[0]]))
+        self.assertEqual(response.json()['reading']['data'], self.readings[0].data)
+
+    def test_readings_api_rejects_bad_requests(self):
+        url = reverse('readings_api')
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'ids': 'a,b'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': 5, 'end': 1}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('reading_api', args=[999])).status_code, 404)
@@ -0,0 +1,131 @@
+from importlib import import_module
+from itertools import combinations
+import numpy as np
+from django.apps import apps
+from django.test import SimpleTestCase, TestCase
+from ..models import DataFragment, Device, RawData
+from ..utils.erasure_coding import (ReedSolomonEC, build_fragments, decoding_matrix, fragment_checksum, recover_data,
+                                   recover_many, serialize_data, store_with_ec_batch)
+from ..utils.gf256 import encoding_matrix, gf_inverse, gf_matmul
+from ..utils.placement import down_nodes
+
+PROFILES = [(4, 2), (8, 3), (10, 4)]
+
+
+def payload(size, seed=0):
+    # Random bytes that do not end in padding zeros (decode strips them)
+    data = np.random.default_rng(seed).integers(0, 256, size, dtype=np.uint8).tobytes()
+    return data.rstrip(b'\0') + b'\x01'
+
+
+class GF256Tests(SimpleTestCase):
+    def test_every_k_rows_of_the_encoding_matrix_are_invertible(self):
+        for k, m in PROFILES:
+            matrix = encoding_matrix(k, m)
+            for rows in combinations(range(k + m), k):
+                submatrix = matrix[list(rows)]
+                np.testing.assert_array_equal(gf_matmul(gf_inverse(submatrix), submatrix),
+                                              np.eye(k, dtype=np.uint8))
+
+    def test_singular_matrix_is_rejected(self):
+        with self.assertRaises(ValueError):
+            gf_inverse(np.array([[1, 2], [1, 2]], dtype=np.uint8))
+
+
+class ReedSolomonTests(SimpleTestCase):
+    def test_decodes_with_any_m_fragments_lost(self):
+        for k, m in PROFILES:
+            ec = ReedSolomonEC(k, m)
+            data = payload(1000 + k, seed=k)
+            fragments = ec.encode(data)
+            self.assertEqual(len(fragments), k + m)
+            for lost in combinations(range(k + m), m):
+                survivors = [fragment for i, fragment in enumerate(fragments) if i not in lost]
+                self.assertEqual(ec.decode(survivors), data, (k, m, lost))
+
+    def test_data_fragments_are_the_data_itself(self):
+        ec = ReedSolomonEC(4, 2)
+        data = payload(400)
+        fragments = ec.encode(data)
+        self.assertEqual(b''.join(chunk for _, chunk in fragments[:4]).rstrip(b'\0'), data)
+
+    def test_intact_data_fragments_skip_parity(self):
+        ec = ReedSolomonEC(4, 2)
+        data = payload(400)
+        fragments = ec.encode(data)
+        garbage_parity = [(fragment_id, bytes(len(chunk))) for fragment_id, chunk in fragments[4:]]
+        self.assertEqual(ec.decode(garbage_parity + fragments[:4]), data)
+
+    def test_decoding_matrices_are_memoized(self):
+        ec = ReedSolomonEC(8, 3)
+        fragments = ec.encode(payload(800))
+        survivors = fragments[1:5] + fragments[6:]
+        ec.decode(survivors)
+        hits = decoding_matrix.cache_info().hits
+        self.assertEqual(ec.decode(survivors), ec.decode(list(reversed(survivors))))
+        self.assertEqual(decoding_matrix.cache_info().hits, hits + 2)
+
+    def test_too_few_fragments(self):
+        ec = ReedSolomonEC(4, 2)
+        with self.assertRaises(ValueError):
+            ec.decode(ec.encode(payload(100))[:3])
+
+
+class RecoveryTests(TestCase):
+    def setUp(self):
+        device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        self.readings = [
+            RawData.objects.create(device=device, data={'type': 'temperature', 'value': i / 10})
+            for i in range(3)
+        ]
+        self.efficiencies = store_with_ec_batch([raw_data.id for raw_data in self.readings])
+
+    def test_recovers_readings_without_data_fragments(self):
+        # Drop m = 2 data fragments of every reading, so recovery needs parity
+        DataFragment.objects.filter(fragment_id__in=['F1', 'F3']).delete()
+        for raw_data in self.readings:
+            self.assertEqual(recover_data(raw_data.id), raw_data.data)
+
+    def test_recover_many_reads_parity_only_when_needed(self):
+        ids = [raw_data.id for raw_data in self.readings]
+        expected = {raw_data.id: raw_data.data for raw_data in self.readings}
+        down_nodes()  # Node status is cached between reads
+        # One query for block membership, one for the data fragments
+        with self.assertNumQueries(2):
+            self.assertEqual(recover_many(ids), expected)
+        DataFragment.objects.filter(original_data=self.readings[1], fragment_id='F2').delete()
+        with self.assertNumQueries(3):
+            self.assertEqual(recover_many(ids), expected)
+
+    def test_batch_encoding_matches_one_by_one(self):
+        ec = ReedSolomonEC(4, 2)
+        fragments, sizes = build_fragments(self.readings, ec)
+        for raw_data in self.readings:
+            payload = serialize_data(raw_data.data)
+            coded = [(fragment.fragment_id, fragment.fragment_data)
+                     for fragment in fragments if fragment.original_data == raw_data]
+            self.assertEqual(coded, ec.encode(payload))
+            self.assertEqual(sizes[raw_data.id], (len(payload), sum(len(data) for _, data in coded)))
+        self.assertEqual(set(self.efficiencies), {raw_data.id for raw_data in self.readings})
+
+    def test_migration_reencodes_legacy_fragments(self):
+        legacy, current = self.readings[:2]
+        # As the original integer Vandermonde encoder stored them
+        data = serialize_data(legacy.data)
+        chunks = ReedSolomonEC(4, 2).split(data)
+        for i, row in enumerate(np.vander(np.arange(1, 7), 4, increasing=True) @ chunks % 256):
+            DataFragment.objects.filter(original_data=legacy, fragment_id=f'F{i + 1}').update(
+                fragment_data=bytes(row), checksum=None
+            )
+        untouched = list(DataFragment.objects.filter(original_data=current).values_list('fragment_data', 'checksum'))
+
+        migration = import_module('data_management.migrations.0017_reencode_legacy_fragments')
+        migration.reencode_legacy_fragments(apps, None)
+        self.assertEqual(list(DataFragment.objects.filter(original_data=current).values_list(
+            'fragment_data', 'checksum')), untouched)
+        for fragment in DataFragment.objects.filter(original_data=legacy):
+            self.assertEqual(fragment.checksum, fragment_checksum(fragment.fragment_data))
+        DataFragment.objects.filter(fragment_id__in=['F1', 'F3']).delete()
+        self.assertEqual(recover_data(legacy.id), legacy.data)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.encoded_size, 6 * len(chunks[0]))
@@ -0,0 +1,97 @@
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from sklearn.linear_model import LogisticRegression
+from ..models import Device, LocalModelUpdate, RawData
+from ..utils.features import FEATURES, reading_value, sequence_features, window_features
+from ..utils.federated_learning import SimpleFederatedLearning, local_learner
+from ..utils.model_format import decode_update
+from .utils import use_fresh_model_registry
+
+
+class SequenceFeaturesTests(SimpleTestCase):
+    def test_rows_and_labels(self):
+        X, y = sequence_features([1, 3, 2, 2, 5], [0, 6, 12, 18, 0])
+        self.assertEqual(X.shape, (4, len(FEATURES)))
+        # Whether the next reading is higher; the last reading has no label
+        np.testing.assert_array_equal(y, [1, 0, 0, 1])
+        values = np.array([1, 3, 2, 2, 5])
+        np.testing.assert_allclose(X[:, 0], ((values - values.mean()) / values.std())[:-1])
+        self.assertEqual((X[0, 1], X[0, 2]), (0.0, 0.0))
+        np.testing.assert_allclose(X[1, 3:], [1.0, 0.0], atol=1e-12)
+
+    def test_constant_sequence(self):
+        X, y = sequence_features([4, 4, 4], [0, 0, 0])
+        self.assertFalse(np.isnan(X).any())
+        np.testing.assert_array_equal(y, [0, 0])
+
+    def test_reading_value(self):
+        self.assertEqual(reading_value({'value': 3}), 3.0)
+        for data in ({'value': True}, {'value': '3'}, {'value': float('nan')}, {}, ['value']):
+            self.assertIsNone(reading_value(data), data)
+
+
+class WindowFeaturesTests(TestCase):
+    def setUp(self):
+        self.devices = [Device.objects.create(name=f'sensor {i}', device_type='Temperature', location='lab')
+                        for i in range(2)]
+
+    def reading(self, device, value, reading_type='temperature'):
+        return RawData.objects.create(device=device, data={
+            'type': reading_type, 'value': value, 'timestamp': '2026-10-18T10:00:00',
+        })
+
+    def test_pairs_ending_in_the_batch(self):
+        for value in (1, 2, 3):
+            self.reading(self.devices[0], value)
+        batch = [self.reading(self.devices[0], 2), self.reading(self.devices[0], 4),
+                 self.reading(self.devices[0], 50, 'humidity'), self.reading(self.devices[1], 7)]
+        # One context query per device
+        with self.assertNumQueries(2):
+            samples = window_features(batch)
+        # 3 -> 2 and 2 -> 4; the humidity reading and the second device have no pair yet
+        self.assertEqual(list(samples), [self.devices[0].id])
+        X, y = samples[self.devices[0].id]
+        np.testing.assert_array_equal(y, [0, 1])
+        self.assertEqual(X.shape, (2, len(FEATURES)))
+
+    def test_samples_follow_arrival_order_across_types(self):
+        batch = [self.reading(self.devices[0], 1), self.reading(self.devices[0], 10, 'humidity'),
+                 self.reading(self.devices[0], 5, 'humidity'), self.reading(self.devices[0], 2)]
+        # humidity 10 -> 5 ends first, so the holdout tail is the latest pair of any type
+        np.testing.assert_array_equal(window_features(batch)[self.devices[0].id][1], [0, 1])
+
+    def test_each_pair_is_returned_once(self):
+        first = [self.reading(self.devices[0], value) for value in (1, 2)]
+        second = [self.reading(self.devices[0], value) for value in (3, 1)]
+        self.assertEqual(len(window_features(first)[self.devices[0].id][1]), 1)
+        np.testing.assert_array_equal(window_features(second)[self.devices[0].id][1], [1, 0])
+
+
+@override_settings(FEDERATED_LEARNING={**settings.FEDERATED_LEARNING, 'SEND_DELTAS': False})
+class PartialFitTests(TestCase):
+    def setUp(self):
+        self.registry = use_fresh_model_registry(self)
+        self.device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+
+    def test_first_model_is_untrained(self):
+        model = SimpleFederatedLearning().get_global_model()
+        np.testing.assert_array_equal(model.coef_, np.zeros((1, len(FEATURES))))
+
+    def test_continues_compatible_models_and_restarts_others(self):
+        model = LogisticRegression().fit(np.random.rand(10, len(FEATURES)), [0, 1] * 5)
+        np.testing.assert_array_equal(local_learner(model).coef_, model.coef_)
+        other = LogisticRegression().fit(np.random.rand(10, 3), [0, 1] * 5)
+        np.testing.assert_array_equal(local_learner(other).coef_, np.zeros((1, len(FEATURES))))
+
+    def test_one_pass_learns_the_signal_and_reports_holdout_accuracy(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(500, len(FEATURES)))
+        y = (X[:, 0] < 0).astype(np.int64)
+        SimpleFederatedLearning().train_local_model(self.device.id, X, y)
+
+        update = LocalModelUpdate.objects.get()
+        self.assertEqual(update.num_samples, 400)
+        parameters = decode_update(update.gradients)
+        self.assertLess(parameters['coef_'][0, 0], 0)
+        self.assertGreater(parameters['accuracy'], 0.9)
@@ -0,0 +1,46 @@
+from unittest import mock
+from django.test import TestCase
+from django.urls import reverse
+from ..models import DataFragment, Device, RawData
+from ..utils import health
+from ..utils.erasure_coding import store_with_ec_batch
+from ..utils.health import health_report, redundancy_breakdown
+from ..utils.statistics import rebuild_statistics
+
+
+class HealthReportTests(TestCase):
+    def setUp(self):
+        device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        self.readings = [
+            RawData.objects.create(device=device, data={'type': 'temperature', 'value': i}) for i in range(4)
+        ]
+        full, degraded, lost, _ = self.readings
+        store_with_ec_batch([full.id, degraded.id, lost.id])
+        store_with_ec_batch([RawData.objects.create(device=device, data={'value': 'wide'}).id], profile='8+3')
+        DataFragment.objects.filter(original_data=degraded, fragment_id='F5').delete()
+        DataFragment.objects.filter(original_data=lost, fragment_id__in=['F1', 'F2', 'F6']).delete()
+        rebuild_statistics()
+
+        patcher = mock.patch.dict(health._report_cache, {'built_at': 0.0, 'report': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_records_are_classified_against_their_own_profile(self):
+        self.assertEqual(redundancy_breakdown(), {'full': 2, 'degraded': 1, 'unrecoverable': 1})
+
+    def test_report(self):
+        report = health_report()
+        self.assertEqual(report['redundancy'], {'full': 2, 'degraded': 1, 'unrecoverable': 1, 'not_encoded': 1})
+        # 3 of 5 readings can be recovered
+        self.assertEqual(report['recovery_confidence'], 60.0)
+        self.assertEqual(sum(node['total'] for node in report['fragment_distribution']),
+                         DataFragment.objects.count())
+
+    def test_report_is_reused_until_it_expires(self):
+        first = health_report()
+        DataFragment.objects.filter(original_data=self.readings[0]).delete()
+        with self.assertNumQueries(0):
+            self.assertIs(health_report(), first)
+
+        response = self.client.get(reverse('system_health'), {'refresh': 1})
+        self.assertEqual(response.json()['redundancy']['full'], 1)
@@ -0,0 +1,11 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class HotPathIndexTests(TestCase):
+    def test_hot_lookups_use_their_indexes(self):
+        # Big enough that, after ANALYZE, SQLite prefers the indexes to table scans
+        out = StringIO()
+        call_command('bench_indexes', rows=10000, batch_size=5000, repeat=1, stdout=out)
+        self.assertIn('All hot lookups use their indexes', out.getvalue())
@@ -0,0 +1,112 @@
+import json
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from ..models import CachedData, DataFragment, Device, LocalModelUpdate, RawData
+from ..utils.ingestion import ingest_readings, parse_readings, process_batch
+from .utils import use_fresh_model_registry, use_fresh_update_buffer, use_temporary_cache_tiers
+
+
+class ParseReadingsTests(SimpleTestCase):
+    def test_json_array_and_object(self):
+        readings = [{'device_id': 1, 'value': 2}]
+        self.assertEqual(parse_readings(json.dumps(readings)), readings)
+        self.assertEqual(parse_readings(json.dumps({'readings': readings}).encode()), readings)
+        # A single reading on its own
+        self.assertEqual(parse_readings(json.dumps(readings[0])), readings)
+
+    def test_ndjson(self):
+        body = '{"device_id": 1, "value": 2}\n\n{"device_id": 2, "value": 3}\n'
+        self.assertEqual(parse_readings(body, 'application/x-ndjson'),
+                         [{'device_id': 1, 'value': 2}, {'device_id': 2, 'value': 3}])
+
+    def test_invalid_payloads(self):
+        with self.assertRaises(ValueError):
+            parse_readings('42')
+        with self.assertRaises(ValueError):
+            parse_readings('{"device_id": 1,')
+
+
+class IngestReadingsTests(TestCase):
+    def setUp(self):
+        use_temporary_cache_tiers(self)
+        use_fresh_model_registry(self)
+        self.update_buffer = use_fresh_update_buffer(self)
+        self.devices = [
+            Device.objects.create(name=f'sensor {i}', device_type='Temperature', location='lab')
+            for i in range(2)
+        ]
+
+    def test_stores_and_processes_a_batch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            raw_data_list = ingest_readings([
+                {'device_id': self.devices[0].id, 'type': 'temperature', 'value': 21.5},
+                {'device_id': self.devices[1].id, 'data': {'type': 'humidity', 'value': 40, 'unit': '%'}},
+                {'device_id': str(self.devices[1].id), 'value': 0.5},
+            ])
+        self.assertEqual(len(raw_data_list), 3)
+        flat, nested, untyped = (RawData.objects.get(pk=raw_data.pk) for raw_data in raw_data_list)
+        self.assertEqual((flat.data['type'], flat.data['unit'], flat.data['value']), ('temperature', '°C', 21.5))
+        self.assertEqual(nested.data, {'type': 'humidity', 'value': 40, 'unit': '%'})
+        self.assertEqual((untyped.data['type'], untyped.data['unit']), ('random', 'unit'))
+
+        self.assertFalse(RawData.objects.filter(is_processed=False).exists())
+        self.assertEqual(CachedData.objects.count(), 3)
+        self.assertEqual(DataFragment.objects.count(), 3 * 6)
+        self.assertEqual(DataFragment.objects.filter(is_parity=True).count(), 3 * 2)
+        # No device has two readings of one type yet, so nothing to train on
+        self.assertFalse(LocalModelUpdate.objects.exists())
+        self.assertEqual(self.update_buffer.stats()['buffered'], 0)
+
+    def test_invalid_batches_store_nothing(self):
+        with self.assertRaises(Device.DoesNotExist):
+            ingest_readings([{'device_id': self.devices[0].id, 'value': 1}, {'device_id': 999, 'value': 1}])
+        with self.assertRaises(ValueError):
+            ingest_readings([{'device_id': self.devices[0].id, 'value': 1}, {'value': 1}])
+        self.assertFalse(RawData.objects.exists())
+
+    def test_process_batch_marks_rows_processed(self):
+        raw_data = RawData.objects.create(device=self.devices[0], data={'type': 'pressure', 'value': 1000})
+        process_batch(RawData.objects.filter(pk=raw_data.pk))
+        raw_data.refresh_from_db()
+        self.assertTrue(raw_data.is_processed)
+        self.assertEqual(DataFragment.objects.filter(original_data=raw_data).count(), 6)
+
+    def test_training_samples_are_buffered_after_commit(self):
+        readings = [{'device_id': self.devices[0].id, 'type': 'temperature', 'value': value} for value in (1, 2, 3)]
+        with self.captureOnCommitCallbacks() as callbacks:
+            ingest_readings(readings)
+        self.assertEqual(self.update_buffer.stats()['buffered'], 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.update_buffer.stats()['buffered'], 2)
+
+        # A batch that rolls back leaves nothing behind to train on twice
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                ingest_readings(readings)
+                raise RuntimeError
+        self.assertEqual(self.update_buffer.stats()['buffered'], 2)
+
+
+class BulkIngestAPITests(TestCase):
+    def setUp(self):
+        use_temporary_cache_tiers(self)
+        use_fresh_model_registry(self)
+        use_fresh_update_buffer(self)
+        self.device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        self.url = reverse('bulk_ingest_api')
+
+    def test_ingests_ndjson(self):
+        body = '\n'.join(json.dumps({'device_id': self.device.id, 'value': i}) for i in range(5))
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ingested'], 5)
+        self.assertEqual(RawData.objects.filter(device=self.device).count(), 5)
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.client.post(self.url, 'not json', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, '[]', content_type='application/json').status_code, 400)
+        response = self.client.post(self.url, json.dumps([{'device_id': 999, 'value': 1}]),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,123 @@
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from sklearn.linear_model import LogisticRegression
+from ..models import Device, GlobalModel, LocalModelUpdate
+from ..utils import statistics
+from ..utils.federated_learning import (CLASSES, SimpleFederatedLearning, decode_model, encode_model, local_learner,
+                                        parameter_delta)
+from ..utils.model_format import decode_update, encode_update
+from .utils import use_fresh_model_registry, use_fresh_update_buffer
+
+FL = {**settings.FEDERATED_LEARNING, 'BUFFER_SAMPLES': 12, 'BUFFER_SECONDS': 3600, 'SEND_DELTAS': True,
+      'TOP_K_FRACTION': None}
+
+
+def samples(count, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.random((count, 5))
+    return X, (X[:, 0] > 0.5).astype(int) if count > 1 else np.array([0])
+
+
+class ParameterDeltaTests(SimpleTestCase):
+    def model(self, coef, intercept):
+        model = LogisticRegression()
+        model.coef_, model.intercept_ = np.array([coef], dtype=float), np.array([intercept], dtype=float)
+        return model
+
+    def test_delta_and_top_k(self):
+        local = self.model([1, 5, -3, 0.5], 2)
+        global_model = self.model([0, 0, 0, 0], 0)
+        coef, intercept = parameter_delta(local, global_model)
+        np.testing.assert_array_equal(coef, [[1, 5, -3, 0.5]])
+        # Two of the five entries, over coef_ and intercept_ together
+        coef, intercept = parameter_delta(local, global_model, top_k_fraction=0.4)
+        np.testing.assert_array_equal(coef, [[0, 5, -3, 0]])
+        np.testing.assert_array_equal(intercept, [0])
+
+    def test_shapes_must_match(self):
+        self.assertIsNone(parameter_delta(self.model([1, 2], 0), self.model([1, 2, 3], 0)))
+
+
+@override_settings(FEDERATED_LEARNING=FL)
+class LocalUpdateBufferTests(TestCase):
+    def setUp(self):
+        use_fresh_model_registry(self)
+        self.buffer = use_fresh_update_buffer(self)
+        self.devices = [Device.objects.create(name=f'sensor {i}', device_type='Temperature', location='lab')
+                        for i in range(2)]
+        self.global_model = SimpleFederatedLearning().get_global_model()
+
+    def test_one_update_per_full_buffer(self):
+        for seed in range(3):
+            self.buffer.add(self.devices[0].id, *samples(4, seed))
+        self.buffer.add(self.devices[1].id, *samples(10))
+        self.assertEqual(self.buffer.flush(), 1)
+        update = LocalModelUpdate.objects.get()
+        # The last 20% are held out to measure accuracy
+        self.assertEqual((update.device, update.num_samples), (self.devices[0], 10))
+
+        self.assertEqual(self.buffer.flush(force=True), 1)
+        stats = self.buffer.stats()
+        self.assertEqual((stats['samples'], stats['updates'], stats['buffered']), (22, 2, 0))
+        self.assertEqual(stats['samples_per_update'], 11.0)
+
+    def test_small_batches_are_skipped(self):
+        self.buffer.add(self.devices[0].id, *samples(1))
+        self.assertEqual(self.buffer.flush(force=True), 0)
+        self.assertEqual(self.buffer.stats()['skipped'], 1)
+        self.assertFalse(LocalModelUpdate.objects.exists())
+
+    def test_updates_are_deltas_against_the_global_model(self):
+        X, y = samples(40)
+        # partial_fit shuffles with the global NumPy state
+        np.random.seed(0)
+        SimpleFederatedLearning().train_local_model(self.devices[0].id, X, y)
+        update = LocalModelUpdate.objects.get()
+        self.assertTrue(update.is_delta)
+        delta = decode_update(update.gradients)
+
+        local = local_learner(self.global_model)
+        np.random.seed(0)
+        local.partial_fit(X[:32], y[:32], classes=CLASSES)
+        np.testing.assert_allclose(delta['coef_'], local.coef_ - self.global_model.coef_, atol=1e-5)
+
+    @override_settings(FEDERATED_LEARNING={**FL, 'SEND_DELTAS': False})
+    def test_full_parameters_without_deltas(self):
+        SimpleFederatedLearning().train_local_model(self.devices[0].id, *samples(40))
+        update = LocalModelUpdate.objects.get()
+        self.assertFalse(update.is_delta)
+        self.assertGreater(np.abs(decode_update(update.gradients)['coef_']).sum(), 0)
+
+
+@override_settings(FEDERATED_LEARNING=FL)
+class DeltaAggregationTests(TestCase):
+    def setUp(self):
+        use_fresh_model_registry(self)
+        self.device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        model = LogisticRegression().fit(*samples(20))
+        model.coef_, model.intercept_ = np.ones((1, 5)), np.ones(1)
+        self.global_model = GlobalModel.objects.create(version=1, model_data=encode_model(model))
+        statistics.record_global_model(self.global_model)
+
+    def add_update(self, value, num_samples, is_delta):
+        LocalModelUpdate.objects.create(
+            device=self.device, global_model=self.global_model, num_samples=num_samples, is_delta=is_delta,
+            gradients=encode_update(np.full((1, 5), value), np.full(1, value), 0.8),
+        )
+
+    def aggregated(self):
+        new_model, _ = SimpleFederatedLearning().aggregate_updates()
+        model = decode_model(new_model.model_data)
+        return model.coef_[0, 0], model.intercept_[0]
+
+    def test_averaged_deltas_are_added_to_the_global_model(self):
+        self.add_update(0.5, 1, True)
+        self.add_update(-0.5, 3, True)
+        # 1 + (0.5 * 1 - 0.5 * 3) / 4
+        self.assertEqual(self.aggregated(), (0.75, 0.75))
+
+    def test_full_updates_combine_by_weight(self):
+        self.add_update(1.0, 1, True)   # 2.0 once applied
+        self.add_update(5.0, 3, False)
+        self.assertEqual(self.aggregated(), ((2.0 * 1 + 5.0 * 3) / 4,) * 2)
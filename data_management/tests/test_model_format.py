@@ -0,0 +1,68 @@
+import pickle
+import numpy as np
+from django.test import SimpleTestCase
+from ..utils.model_format import (decode_parameters, decode_update, encode_parameters, encode_update,
+                                  is_parameter_blob, stack_parameters)
+
+
+def parameters(seed=0, features=5):
+    rng = np.random.default_rng(seed)
+    return {'coef_': rng.normal(size=(1, features)), 'intercept_': rng.normal(size=1)}
+
+
+class ModelFormatTests(SimpleTestCase):
+    def assertRoundTrip(self, dtype, compression, tolerance):
+        arrays = parameters()
+        blob = encode_parameters(arrays, extras={'version': 3}, dtype=dtype, compression=compression)
+        self.assertTrue(is_parameter_blob(blob))
+        decoded, extras = decode_parameters(blob)
+        self.assertEqual(extras, {'version': 3})
+        self.assertEqual(set(decoded), set(arrays))
+        for name, array in arrays.items():
+            self.assertEqual(decoded[name].shape, array.shape)
+            np.testing.assert_allclose(decoded[name], array, rtol=0, atol=tolerance)
+
+    def test_round_trips(self):
+        for compression in ('none', 'zlib'):
+            with self.subTest(compression=compression):
+                self.assertRoundTrip('float32', compression, 1e-6)
+                self.assertRoundTrip('float16', compression, 5e-3)
+                self.assertRoundTrip('int8', compression, 0.02)
+
+    def test_int8_error_is_within_half_a_step(self):
+        array = np.linspace(-3, 5, 1000)
+        decoded, _ = decode_parameters(encode_parameters({'w': array}, dtype='int8'))
+        step = (array.max() - array.min()) / 255
+        self.assertLessEqual(np.abs(decoded['w'] - array).max(), step / 2 + 1e-6)
+
+    def test_constant_and_empty_arrays(self):
+        arrays = {'constant': np.full((2, 3), 1.5), 'empty': np.empty((0, 4))}
+        for dtype in ('float32', 'float16', 'int8'):
+            decoded, _ = decode_parameters(encode_parameters(arrays, dtype=dtype))
+            np.testing.assert_array_equal(decoded['constant'], arrays['constant'])
+            self.assertEqual(decoded['empty'].shape, (0, 4))
+
+    def test_update_round_trip(self):
+        arrays = parameters()
+        update = decode_update(encode_update(arrays['coef_'], arrays['intercept_'], 0.75))
+        self.assertEqual(update['accuracy'], 0.75)
+        np.testing.assert_allclose(update['coef_'], arrays['coef_'], atol=1e-6)
+
+    def test_pickled_updates_still_decode(self):
+        legacy = {**parameters(), 'accuracy': 0.5}
+        self.assertEqual(decode_update(pickle.dumps(legacy))['accuracy'], 0.5)
+
+    def test_stack_parameters(self):
+        updates = [parameters(seed) for seed in range(4)]
+        blobs = [encode_update(u['coef_'], u['intercept_'], seed / 10) for seed, u in enumerate(updates)]
+        # A compressed blob takes the slow path, one of another shape is left out
+        blobs[2] = encode_update(updates[2]['coef_'], updates[2]['intercept_'], 0.2, compression='zlib')
+        other = parameters(9, features=3)
+        blobs.append(encode_update(other['coef_'], other['intercept_'], 0.9))
+
+        shapes, matrix, kept = stack_parameters(blobs, ('coef_', 'intercept_', 'accuracy'), decode=decode_update)
+        self.assertEqual(shapes, ((1, 5), (1,), ()))
+        self.assertEqual(kept, [0, 1, 2, 3])
+        expected = np.array([np.concatenate([u['coef_'].ravel(), u['intercept_'], [seed / 10]])
+                             for seed, u in enumerate(updates)])
+        np.testing.assert_allclose(matrix, expected, atol=1e-6)
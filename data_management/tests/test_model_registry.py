@@ -0,0 +1,67 @@
+import pickle
+from unittest import mock
+import numpy as np
+from django.test import TestCase
+from sklearn.linear_model import LogisticRegression
+from ..models import Device, GlobalModel, LocalModelUpdate
+from ..utils import federated_learning, statistics
+from ..utils.federated_learning import SimpleFederatedLearning
+from .utils import use_fresh_model_registry
+
+
+class ModelRegistryTests(TestCase):
+    def setUp(self):
+        self.registry = use_fresh_model_registry(self)
+        # Only the tests that expect a re-check get one, however slow the run
+        patcher = mock.patch.object(federated_learning, 'MODEL_REFRESH_SECONDS', 3600)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+
+    def publish_elsewhere(self, version):
+        # A model published by another process: only the database knows it
+        model = LogisticRegression().fit(np.random.rand(10, 5), [0, 1] * 5)
+        global_model = GlobalModel.objects.create(version=version, model_data=pickle.dumps(model))
+        statistics.record_global_model(global_model)
+        return global_model
+
+    def test_creates_the_first_model(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            global_model_id, version, model = self.registry.current()
+        self.assertEqual(GlobalModel.objects.get().pk, global_model_id)
+        self.assertEqual(version, 1)
+        self.assertTrue(hasattr(model, 'coef_'))
+
+    def test_rechecks_the_version_at_most_once_per_interval(self):
+        first = self.publish_elsewhere(1)
+        self.assertEqual(self.registry.current()[0], first.pk)
+        second = self.publish_elsewhere(2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.registry.current()[0], first.pk)
+
+        with mock.patch.object(federated_learning, 'MODEL_REFRESH_SECONDS', 0):
+            self.assertEqual(self.registry.current()[0], second.pk)
+            # Same version: one lookup, no unpickling
+            with self.assertNumQueries(1), mock.patch.object(pickle, 'loads') as loads:
+                self.assertEqual(self.registry.current()[0], second.pk)
+            loads.assert_not_called()
+
+    def test_aggregation_publishes_into_the_registry(self):
+        self.publish_elsewhere(1)
+        fl = SimpleFederatedLearning()
+        fl.train_local_model(self.device.id, np.random.rand(20, 5), np.array([0, 1] * 10))
+        with self.captureOnCommitCallbacks(execute=True):
+            new_model, _ = fl.aggregate_updates()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.registry.current()[:2], (new_model.pk, 2))
+
+    def test_training_only_inserts_the_update(self):
+        self.publish_elsewhere(1)
+        fl = SimpleFederatedLearning()
+        shared = fl.get_global_model()
+        coef = shared.coef_.copy()
+        # The update insert and the counter bump
+        with self.assertNumQueries(2):
+            fl.train_local_model(self.device.id, np.random.rand(20, 5), np.array([0, 1] * 10))
+        self.assertEqual(LocalModelUpdate.objects.count(), 1)
+        np.testing.assert_array_equal(shared.coef_, coef)
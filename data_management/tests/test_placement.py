@@ -0,0 +1,72 @@
+from collections import Counter
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..models import DataFragment, Device, RawData
+from ..utils.erasure_coding import recover_data, store_with_ec_batch
+from ..utils.placement import PlacementEngine, StorageNode, get_profile, profile_for_device_type
+
+NODES = [StorageNode(f'node_{i}', f'zone-{"abc"[i % 3]}', f'rack-{i // 3}') for i in range(6)]
+
+
+class PlacementEngineTests(SimpleTestCase):
+    def test_fragments_go_to_distinct_nodes_spread_over_zones(self):
+        chosen = PlacementEngine(NODES, Counter()).place(6)
+        self.assertEqual(len(set(chosen)), 6)
+        zones = Counter(node.zone for node in NODES if node.name in chosen)
+        self.assertEqual(set(zones.values()), {2})
+
+    def test_wide_stripes_wrap_around_evenly(self):
+        # 8+3 on six nodes: no node holds more than two fragments of the stripe
+        chosen = PlacementEngine(NODES, Counter()).place(11)
+        self.assertLessEqual(max(Counter(chosen).values()), 2)
+
+    def test_parity_rotates_across_stripes(self):
+        engine = PlacementEngine(NODES, Counter())
+        parity = Counter()
+        for _ in range(len(NODES)):
+            chosen = engine.place(6)
+            self.assertEqual(len(set(chosen)), 6)
+            parity.update(chosen[4:])
+        # Every node holds parity for two of the six stripes
+        self.assertEqual(parity, Counter({node.name: 2 for node in NODES}))
+
+    def test_ties_go_to_the_least_loaded_node(self):
+        loads = Counter({node.name: 10 for node in NODES})
+        loads['node_4'] = 0
+        self.assertEqual(PlacementEngine(NODES, loads).place(1), ['node_4'])
+        self.assertEqual(loads['node_4'], 1)
+
+    def test_no_nodes(self):
+        with self.assertRaises(ValueError):
+            PlacementEngine([], Counter())
+
+
+@override_settings(ERASURE_CODING={
+    'PROFILES': {'4+2': (4, 2), '8+3': (8, 3)},
+    'DEFAULT_PROFILE': '4+2',
+    'DEVICE_TYPE_PROFILES': {'Multi': '8+3'},
+})
+class ProfileTests(TestCase):
+    def test_profile_lookup(self):
+        self.assertEqual(get_profile(), (4, 2))
+        self.assertEqual(get_profile('8+3'), (8, 3))
+        self.assertEqual(profile_for_device_type('Multi'), (8, 3))
+        self.assertEqual(profile_for_device_type('Temperature'), (4, 2))
+        with self.assertRaises(ValueError):
+            get_profile('6+6')
+
+    def test_mixed_profiles_in_one_batch(self):
+        readings = [
+            RawData.objects.create(
+                device=Device.objects.create(name=device_type, device_type=device_type, location='lab'),
+                data={'type': 'temperature', 'value': 20.5},
+            )
+            for device_type in ('Temperature', 'Multi')
+        ]
+        store_with_ec_batch([raw_data.id for raw_data in readings])
+        single, multi = readings
+        self.assertEqual(DataFragment.objects.filter(original_data=single, ec_k=4, ec_m=2).count(), 6)
+        self.assertEqual(DataFragment.objects.filter(original_data=multi, ec_k=8, ec_m=3).count(), 11)
+
+        # Recovery follows the profile stored with the fragments
+        DataFragment.objects.filter(original_data=multi, fragment_id__in=['F1', 'F2', 'F5']).delete()
+        self.assertEqual(recover_data(multi.id), multi.data)
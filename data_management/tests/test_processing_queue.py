@@ -0,0 +1,134 @@
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from ..models import CachedData, Device, RawData
+from ..utils import processing_queue
+from ..utils.processing_queue import (QueueFullError, check_backpressure, claim_batch, has_pending,
+                                      process_next_batch, retry_failed)
+from .utils import use_fresh_cache_policy, use_fresh_update_buffer, use_temporary_cache_tiers
+
+QUEUE = {'ASYNC': True, 'IN_PROCESS_WORKERS': 0, 'BATCH_SIZE': 10, 'MAX_ATTEMPTS': 3,
+         'LEASE_SECONDS': 60, 'MAX_PENDING': 100, 'POLL_INTERVAL': 0.1}
+
+
+def mark_processed(rows):
+    RawData.objects.filter(pk__in=[row.pk for row in rows]).update(is_processed=True)
+
+
+@override_settings(PROCESSING_QUEUE=QUEUE)
+class ProcessingQueueTests(TestCase):
+    def setUp(self):
+        device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        self.rows = RawData.objects.bulk_create(
+            [RawData(device=device, data={'type': 'temperature', 'value': i}) for i in range(15)]
+        )
+
+    def test_claim_leases_rows_to_one_worker(self):
+        claimed = claim_batch()
+        self.assertEqual([row.id for row in claimed], [row.id for row in self.rows[:10]])
+        self.assertEqual(len({row.claim_token for row in claimed}), 1)
+        for row in claimed:
+            self.assertEqual(row.processing_attempts, 1)
+            self.assertGreater(row.locked_until, timezone.now() + timedelta(seconds=50))
+
+        # Leased rows are skipped until the lease runs out
+        self.assertEqual([row.id for row in claim_batch()], [row.id for row in self.rows[10:]])
+        self.assertEqual(claim_batch(), [])
+        RawData.objects.filter(pk=self.rows[0].pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed = claim_batch()
+        self.assertEqual([row.id for row in reclaimed], [self.rows[0].id])
+        self.assertEqual(reclaimed[0].processing_attempts, 2)
+
+    def test_processes_a_batch(self):
+        with mock.patch.object(processing_queue, 'process_batch', side_effect=mark_processed):
+            self.assertEqual(process_next_batch(), 10)
+            self.assertEqual(process_next_batch(), 5)
+            self.assertEqual(process_next_batch(), 0)
+        self.assertFalse(has_pending())
+
+    def test_failed_reading_backs_off_without_holding_back_the_batch(self):
+        bad = self.rows[3]
+
+        def process(rows):
+            if any(row.pk == bad.pk for row in rows):
+                raise ValueError('bad reading')
+            mark_processed(rows)
+
+        with mock.patch.object(processing_queue, 'process_batch', side_effect=process):
+            process_next_batch()
+        self.assertEqual(RawData.objects.filter(pk__in=[row.pk for row in self.rows[:10]],
+                                                is_processed=True).count(), 9)
+        bad.refresh_from_db()
+        self.assertFalse(bad.is_processed)
+        self.assertEqual(bad.last_error, 'bad reading')
+        # 2 ** attempts seconds of backoff after the first attempt
+        delay = (bad.locked_until - timezone.now()).total_seconds()
+        self.assertTrue(0 < delay <= 2, delay)
+
+    def test_readings_are_dead_lettered_after_max_attempts(self):
+        RawData.objects.filter(pk=self.rows[0].pk).update(processing_attempts=QUEUE['MAX_ATTEMPTS'])
+        self.assertNotIn(self.rows[0].id, [row.id for row in claim_batch(batch_size=20)])
+        self.assertEqual(retry_failed(), 1)
+        self.assertIn(self.rows[0].id, [row.id for row in claim_batch(batch_size=20)])
+
+    def test_expired_lease_does_not_commit_over_the_new_claim(self):
+        use_temporary_cache_tiers(self)
+        use_fresh_cache_policy(self)
+        use_fresh_update_buffer(self)
+        rows = claim_batch()
+        # The lease ran out and another worker claimed the first row
+        RawData.objects.filter(pk=rows[0].pk).update(claim_token='b' * 32)
+
+        with mock.patch.object(processing_queue, 'claim_batch', return_value=rows), \
+                self.assertLogs('data_management.utils.processing_queue', 'WARNING'), \
+                self.captureOnCommitCallbacks(execute=True):
+            process_next_batch()
+        lost = RawData.objects.get(pk=rows[0].pk)
+        self.assertEqual((lost.is_processed, lost.last_error, lost.claim_token), (False, '', 'b' * 32))
+        self.assertEqual(RawData.objects.filter(is_processed=True).count(), 9)
+        # Only committed readings reach the cache
+        self.assertEqual(set(CachedData.objects.values_list('raw_data_id', flat=True)),
+                         {row.id for row in rows[1:]})
+
+    @mock.patch.dict(processing_queue._pending_estimate, {'checked_at': 0.0, 'count': 0})
+    def test_backpressure(self):
+        check_backpressure(85)
+        with self.assertRaises(QueueFullError):
+            check_backpressure(86)
+
+    def test_concurrent_requests_never_overfill_the_queue(self):
+        accepted = []
+        barrier = threading.Barrier(20)
+
+        def request():
+            barrier.wait()
+            try:
+                check_backpressure(10)
+                accepted.append(10)
+            except QueueFullError:
+                pass
+
+        # A fresh estimate, so no thread needs the database
+        with mock.patch.dict(processing_queue._pending_estimate, {'checked_at': time.monotonic(), 'count': 0}):
+            threads = [threading.Thread(target=request) for _ in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(processing_queue._pending_estimate['count'], 100)
+        self.assertEqual(sum(accepted), QUEUE['MAX_PENDING'])
+
+    @mock.patch.dict(processing_queue._pending_estimate, {'checked_at': 0.0, 'count': 0})
+    def test_simulate_form_shows_backpressure(self):
+        response = self.client.post(reverse('simulate_device'), {
+            'device_id': self.rows[0].device_id, 'auto_generate': 'on', 'num_records': 90,
+        })
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertTemplateUsed(response, 'data_management/device_input.html')
+        self.assertContains(response, 'alert-danger', status_code=503)
+        self.assertEqual(RawData.objects.count(), 15)
@@ -0,0 +1,68 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from ..models import DataFragment, Device, RawData
+from ..utils import placement
+from ..utils.erasure_coding import ReedSolomonEC, recover_many, serialize_data, store_with_ec_batch
+from ..utils.health import redundancy_breakdown
+from ..utils.placement import set_node_down
+from ..utils.repair import repair_nodes
+
+
+class NodeRepairTests(TestCase):
+    def setUp(self):
+        # Node status is cached per process; start from "all up" and leave it that way
+        patcher = mock.patch.dict(placement._status_cache, {'loaded_at': 0.0, 'down': frozenset()})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        self.readings = [
+            RawData.objects.create(device=device, data={'type': 'temperature', 'value': i / 3}) for i in range(12)
+        ]
+        self.ids = [raw_data.id for raw_data in self.readings]
+        store_with_ec_batch(self.ids)
+
+    def assertFullyRedundant(self, down):
+        ec = ReedSolomonEC(4, 2)
+        for raw_data in self.readings:
+            stored = list(DataFragment.objects.filter(original_data=raw_data).order_by('fragment_id')
+                          .values_list('fragment_id', 'fragment_data', 'storage_node'))
+            self.assertEqual([row[:2] for row in stored], ec.encode(serialize_data(raw_data.data)))
+            # Spread over every healthy node, at most two fragments on one
+            self.assertEqual({row[2] for row in stored}, {f'edge_node_{i}' for i in range(6)} - {down})
+
+    def test_reads_survive_a_node_failure(self):
+        set_node_down('edge_node_1')
+        self.assertEqual(recover_many(self.ids), {raw_data.id: raw_data.data for raw_data in self.readings})
+        self.assertEqual(redundancy_breakdown()['degraded'], len(self.readings))
+
+    def test_repair_restores_full_redundancy_elsewhere(self):
+        set_node_down('edge_node_1')
+        totals = repair_nodes(batch_size=5)
+        self.assertEqual((totals['records'], totals['repaired'], totals['unrecoverable']), (12, 12, 0))
+        self.assertEqual(totals['fragments'], 12)
+        self.assertFalse(DataFragment.objects.filter(storage_node='edge_node_1').exists())
+        self.assertEqual(redundancy_breakdown(), {'full': 12, 'degraded': 0, 'unrecoverable': 0})
+        self.assertFullyRedundant(down='edge_node_1')
+
+    def test_unrecoverable_records_keep_their_fragments(self):
+        for name in ('edge_node_0', 'edge_node_1', 'edge_node_2'):
+            set_node_down(name)
+        totals = repair_nodes()
+        self.assertEqual((totals['repaired'], totals['unrecoverable']), (0, 12))
+        self.assertEqual(DataFragment.objects.count(), 12 * 6)
+
+        # Once enough nodes are back, the rest can be rebuilt
+        set_node_down('edge_node_0', down=False)
+        set_node_down('edge_node_1', down=False)
+        self.assertEqual(repair_nodes()['repaired'], 12)
+        self.assertFullyRedundant(down='edge_node_2')
+
+    def test_command(self):
+        out = StringIO()
+        call_command('repair_nodes', '--fail', 'edge_node_3', '--repair', stdout=out)
+        self.assertIn('Repaired 12/12 records', out.getvalue())
+        self.assertIn('DOWN', out.getvalue())
+        self.assertFalse(DataFragment.objects.filter(storage_node='edge_node_3').exists())
@@ -0,0 +1,65 @@
+from unittest import mock
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from ..models import PerformanceMetrics
+from ..performance_middleware import MetricsBuffer, PerformanceTrackingMiddleware
+from ..views import calculate_latency_reduction
+
+
+class MetricsBufferTests(TestCase):
+    def setUp(self):
+        # No flusher thread; the tests flush by hand
+        patcher = mock.patch.object(MetricsBuffer, '_start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Rows the process-wide flusher may have committed after earlier tests' requests
+        PerformanceMetrics.objects.all().delete()
+
+    def test_flush_writes_one_row_averaging_the_window(self):
+        buffer = MetricsBuffer()
+        for duration_ms, size in ((2, 1024), (4, 3072), (6, 2048)):
+            buffer.record(duration_ms * 1_000_000, size)
+        row = buffer.flush()
+        self.assertEqual(row.sample_count, 3)
+        self.assertAlmostEqual(row.edge_processing_time, 4.0)
+        self.assertAlmostEqual(row.data_transfer_size, 2.0)
+        self.assertTrue(2.0 * row.edge_processing_time <= row.cloud_processing_time <= 3.0 * row.edge_processing_time)
+
+        self.assertIsNone(buffer.flush())
+        self.assertEqual(PerformanceMetrics.objects.count(), 1)
+
+    @override_settings(REQUEST_METRICS={'BUFFER_SIZE': 3})
+    def test_full_buffer_drops_the_oldest_samples(self):
+        buffer = MetricsBuffer()
+        for i in range(5):
+            buffer.record(i * 1_000_000, 0)
+        with self.assertLogs('data_management.performance_middleware', 'WARNING') as logs:
+            row = buffer.flush()
+        self.assertIn('dropped 2 samples', logs.output[0])
+        self.assertEqual(row.sample_count, 3)
+        self.assertAlmostEqual(row.edge_processing_time, 3.0)
+
+    def test_middleware_records_without_writing(self):
+        buffer = MetricsBuffer()
+        middleware = PerformanceTrackingMiddleware(lambda request: HttpResponse())
+        with mock.patch('data_management.performance_middleware.metrics_buffer', buffer):
+            with self.assertNumQueries(0):
+                middleware(RequestFactory().post('/', data='x' * 100, content_type='text/plain'))
+        self.assertEqual(len(buffer.samples), 1)
+        self.assertEqual(buffer.samples[0][1], 100)
+
+    def test_every_request_is_timed(self):
+        buffer = MetricsBuffer()
+        with mock.patch('data_management.performance_middleware.metrics_buffer', buffer):
+            self.client.get(reverse('bulk_ingest_api'))
+        self.assertEqual(len(buffer.samples), 1)
+
+    def test_dashboard_weights_rows_by_sample_count(self):
+        for edge, cloud, sample_count in ((1.0, 2.0, 1), (1.0, 10.0, 3)):
+            PerformanceMetrics.objects.create(
+                sample_count=sample_count, edge_processing_time=edge, cloud_processing_time=cloud,
+                data_transfer_size=1.0, raw_storage_size=1.0, encoded_storage_size=0.5,
+            )
+        # 50% for one request and 60% (clamped) for three
+        self.assertEqual(calculate_latency_reduction(), 57.5)
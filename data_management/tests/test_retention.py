@@ -0,0 +1,88 @@
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.forms.models import model_to_dict
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from ..models import Device, GlobalModel, LocalModelUpdate, RawData
+from ..utils.caching import HierarchicalCache
+from ..utils.erasure_coding import store_with_ec_batch
+from ..utils.retention import purge_expired, read_segment
+from ..utils.statistics import get_statistics, rebuild_statistics
+from .utils import use_fresh_cache_policy, use_temporary_cache_tiers
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        self.directory = use_temporary_cache_tiers(self)
+        use_fresh_cache_policy(self)
+        overrides = override_settings(RETENTION={**settings.RETENTION, 'ARCHIVE_DIR': self.directory / 'archive'})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        rows = RawData.objects.bulk_create(
+            [RawData(device=self.device, data={'type': 'temperature', 'value': i}, is_processed=True)
+             for i in range(10)]
+        )
+        # 0-5 expired, 6-7 expired but still queued, 8-9 recent
+        self.expired = [row.id for row in rows[:6]]
+        self.kept = [row.id for row in rows[6:]]
+        RawData.objects.filter(id__in=[row.id for row in rows[:8]]).update(
+            timestamp=timezone.now() - timedelta(days=200)
+        )
+        RawData.objects.filter(id__in=[row.id for row in rows[6:8]]).update(is_processed=False)
+        self.data = {row.id: row.data for row in rows}
+        rebuild_statistics()
+
+    def test_purge_archives_then_deletes_in_chunks(self):
+        chunks = []
+        totals = purge_expired('raw_data', days=90, archive=True, chunk_size=4,
+                               progress=lambda totals, elapsed: chunks.append(totals['deleted']))
+        self.assertEqual(chunks, [4, 6])
+        self.assertEqual((totals['deleted'], totals['archived']), (6, 6))
+        self.assertEqual(sorted(RawData.objects.values_list('id', flat=True)), self.kept)
+
+        archived = list(read_segment(totals['segment']))
+        self.assertEqual([row['id'] for row in archived], self.expired)
+        self.assertEqual([row['data'] for row in archived], [self.data[i] for i in self.expired])
+        self.assertEqual(get_statistics().raw_data_count, len(self.kept))
+
+    def test_dry_run_only_counts(self):
+        totals = purge_expired('raw_data', days=90, dry_run=True)
+        self.assertEqual((totals['expired'], totals['deleted']), (6, 0))
+        self.assertEqual(RawData.objects.count(), 10)
+
+    def test_counters_follow_fragments_and_cache_entries(self):
+        store_with_ec_batch(list(self.data))
+        HierarchicalCache().cache_many(self.data)
+        rebuild_statistics()
+        purge_expired('raw_data', days=90, archive=False, chunk_size=4)
+
+        counters = model_to_dict(get_statistics(), exclude=['id', 'updated_at', 'model_updated_at'])
+        self.assertEqual(counters['data_fragments'], len(self.kept) * 4)
+        recounted = model_to_dict(rebuild_statistics(), exclude=['id', 'updated_at', 'model_updated_at'])
+        self.assertAlmostEqual(counters.pop('efficiency_sum'), recounted.pop('efficiency_sum'))
+        self.assertEqual(counters, recounted)
+
+    def test_purged_readings_leave_the_cache(self):
+        cache = HierarchicalCache()
+        cache.cache_many(self.data)
+        self.assertEqual(set(cache.get_many(list(self.data))), set(self.data))
+        purge_expired('raw_data', days=90, archive=False)
+        self.assertEqual(set(HierarchicalCache().get_many(list(self.data))), set(self.kept))
+
+    def test_updates_for_the_current_model_are_kept(self):
+        old, current = (GlobalModel.objects.create(version=version, model_data=b'') for version in (1, 2))
+        for global_model in (old, current):
+            LocalModelUpdate.objects.create(device=self.device, global_model=global_model, gradients=b'')
+        LocalModelUpdate.objects.update(created_at=timezone.now() - timedelta(days=60))
+        self.assertEqual(purge_expired('model_updates')['deleted'], 1)
+        self.assertEqual(LocalModelUpdate.objects.get().global_model, current)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('purge_expired', '--policy', 'raw_data', '--no-archive', stdout=out)
+        self.assertIn('raw_data: deleted 6 rows', out.getvalue())
+        self.assertEqual(sorted(RawData.objects.values_list('id', flat=True)), self.kept)
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from ..models import Device, RawData, ReadingRollup
+from ..utils.rollups import bucket_start, choose_resolution, rollup_series, update_rollups
+
+START = datetime(2026, 10, 18, 10, 0, tzinfo=dt_timezone.utc)
+
+
+class ResolutionTests(SimpleTestCase):
+    def test_finest_resolution_within_max_points(self):
+        self.assertEqual(choose_resolution(START, START + timedelta(hours=10)), '1m')
+        self.assertEqual(choose_resolution(START, START + timedelta(days=30)), '1h')
+        self.assertEqual(choose_resolution(START, START + timedelta(days=365)), '1d')
+        self.assertEqual(choose_resolution(START, START + timedelta(hours=10), max_points=100), '1h')
+        # Never coarser than a day, however long the range
+        self.assertEqual(choose_resolution(START, START + timedelta(days=5000)), '1d')
+
+    def test_bucket_start(self):
+        moment = datetime(2026, 10, 18, 10, 41, 27, 5000, tzinfo=dt_timezone.utc)
+        self.assertEqual(bucket_start(moment, '1m'), datetime(2026, 10, 18, 10, 41, tzinfo=dt_timezone.utc))
+        self.assertEqual(bucket_start(moment, '1h'), datetime(2026, 10, 18, 10, tzinfo=dt_timezone.utc))
+        self.assertEqual(bucket_start(moment, '1d'), datetime(2026, 10, 18, tzinfo=dt_timezone.utc))
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+
+    def readings(self, values, reading_type='temperature', offset=timedelta(0)):
+        # One reading every 20 seconds from START + offset
+        return [
+            RawData.objects.create(device=self.device, is_processed=True, data={
+                'type': reading_type, 'value': value, 'unit': 'unit',
+                'timestamp': (START + offset + timedelta(seconds=20 * i)).replace(tzinfo=None).isoformat(),
+            })
+            for i, value in enumerate(values)
+        ]
+
+    def bucket(self, resolution, start, reading_type='temperature'):
+        row = ReadingRollup.objects.get(device=self.device, resolution=resolution,
+                                        reading_type=reading_type, bucket_start=start)
+        return row.count, row.total, row.minimum, row.maximum
+
+    def test_batches_fold_into_shared_buckets(self):
+        update_rollups(self.readings([1, 2, 3, 4]))
+        update_rollups(self.readings([10, -5], offset=timedelta(minutes=1, seconds=30)))
+
+        self.assertEqual(self.bucket('1m', START), (3, 6, 1, 3))
+        self.assertEqual(self.bucket('1m', START + timedelta(minutes=1)), (3, 9, -5, 10))
+        self.assertEqual(self.bucket('1h', START), (6, 15, -5, 10))
+        self.assertEqual(self.bucket('1d', START.replace(hour=0)), (6, 15, -5, 10))
+
+    def test_skips_readings_without_a_numeric_value(self):
+        readings = self.readings([1, 'high', True])
+        readings.append(RawData.objects.create(device=self.device, data=['not', 'a', 'reading']))
+        update_rollups(readings)
+        self.assertEqual(self.bucket('1h', START), (1, 1, 1, 1))
+
+    def test_series(self):
+        update_rollups(self.readings([1, 2, 3, 4, 5, 6]) + self.readings([50], 'humidity'))
+        resolution, points = rollup_series(self.device.id, START, START + timedelta(minutes=30))
+        self.assertEqual(resolution, '1m')
+        self.assertEqual([(p['type'], p['count'], p['avg']) for p in points],
+                         [('humidity', 1, 50), ('temperature', 3, 2), ('temperature', 3, 5)])
+
+        _, points = rollup_series(self.device.id, START, START + timedelta(days=1), reading_type='temperature',
+                                  resolution='1h')
+        self.assertEqual([(p['count'], p['min'], p['max']) for p in points], [(6, 1, 6)])
+        with self.assertRaises(ValueError):
+            rollup_series(self.device.id, START, START + timedelta(hours=1), resolution='1w')
+
+    def test_history_api(self):
+        update_rollups(self.readings([1, 2, 3]))
+        url = reverse('device_history_api', args=[self.device.id])
+        response = self.client.get(url, {'start': START.isoformat(), 'end': (START + timedelta(days=20)).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['resolution'], '1h')
+        self.assertEqual(response.json()['points'][0]['count'], 3)
+
+        self.assertEqual(self.client.get(url, {'start': START.isoformat(), 'end': START.isoformat()}).status_code,
+                         400)
+        self.assertEqual(self.client.get(url, {'start': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('device_history_api', args=[999])).status_code, 404)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        update_rollups(self.readings([1, 2, 3]))
+        update_rollups(self.readings([4, 5], offset=timedelta(hours=2)))
+        incremental = sorted(ReadingRollup.objects.values_list(
+            'resolution', 'bucket_start', 'count', 'total', 'minimum', 'maximum'
+        ))
+        call_command('rebuild_rollups', chunk_size=2, stdout=StringIO())
+        self.assertEqual(sorted(ReadingRollup.objects.values_list(
+            'resolution', 'bucket_start', 'count', 'total', 'minimum', 'maximum'
+        )), incremental)
@@ -0,0 +1,65 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from ..models import DataFragment, Device, RawData
+from ..utils import placement
+from ..utils.erasure_coding import fragment_checksum, recover_many, store_with_ec_batch
+from ..utils.scrub import scrub_fragments
+
+
+class ScrubTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(placement._status_cache, {'loaded_at': 0.0, 'down': frozenset()})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        device = Device.objects.create(name='sensor', device_type='Temperature', location='lab')
+        self.readings = [
+            RawData.objects.create(device=device, data={'type': 'temperature', 'value': i / 7}) for i in range(5)
+        ]
+        self.ids = [raw_data.id for raw_data in self.readings]
+        store_with_ec_batch(self.ids)
+        self.expected = {raw_data.id: raw_data.data for raw_data in self.readings}
+
+    def corrupt(self, raw_data, fragment_id):
+        fragment = DataFragment.objects.get(original_data=raw_data, fragment_id=fragment_id)
+        fragment.fragment_data = bytes(b ^ 0xFF for b in fragment.fragment_data)
+        fragment.save(update_fields=['fragment_data'])
+        return fragment
+
+    def test_recovery_skips_corrupt_fragments(self):
+        self.corrupt(self.readings[0], 'F1')
+        self.corrupt(self.readings[1], 'F5')
+        self.assertEqual(recover_many(self.ids), self.expected)
+
+    def test_scrub_rebuilds_corrupt_fragments(self):
+        bad = self.corrupt(self.readings[2], 'F3')
+        totals = scrub_fragments(chunk_size=7)
+        # The replacement gets a new, higher id, so the same pass checks it too
+        self.assertEqual((totals['fragments'], totals['corrupt'], totals['repaired']), (31, 1, 1))
+
+        self.assertFalse(DataFragment.objects.filter(pk=bad.pk).exists())
+        rebuilt = DataFragment.objects.get(original_data=self.readings[2], fragment_id='F3')
+        self.assertEqual(rebuilt.checksum, fragment_checksum(rebuilt.fragment_data))
+        self.assertEqual(scrub_fragments()['corrupt'], 0)
+        self.assertEqual(recover_many(self.ids), self.expected)
+
+    def test_records_checksums_of_older_fragments(self):
+        DataFragment.objects.filter(original_data=self.readings[0]).update(checksum=None)
+        self.assertEqual(scrub_fragments()['backfilled'], 6)
+        for fragment in DataFragment.objects.all():
+            self.assertEqual(fragment.checksum, fragment_checksum(fragment.fragment_data))
+
+    def test_resumes_after_the_last_fragment(self):
+        first = scrub_fragments(chunk_size=10, limit=10)
+        self.assertEqual(first['fragments'], 10)
+        rest = scrub_fragments(start_after=first['last_id'])
+        self.assertEqual(rest['fragments'], 20)
+
+    def test_command(self):
+        self.corrupt(self.readings[0], 'F6')
+        out = StringIO()
+        call_command('scrub_fragments', stdout=out)
+        self.assertIn('Scrubbed 31 fragments', out.getvalue())
+        self.assertIn('1 corrupt, 1 records repaired', out.getvalue())
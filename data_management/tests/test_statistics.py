@@ -0,0 +1,98 @@
+from datetime import timedelta
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from ..models import CachedData, DataFragment, Device, SystemStatistics
+from ..utils import statistics
+from ..utils.cache_maintenance import downgrade_inactive_data
+from ..utils.ingestion import ingest_readings
+from ..utils.erasure_coding import serialize_data
+from ..utils.statistics import (cache_level_deltas, clamped_efficiency, get_statistics, rebuild_statistics,
+                                storage_efficiency)
+from .utils import (use_fresh_cache_policy, use_fresh_model_registry, use_fresh_update_buffer,
+                    use_temporary_cache_tiers)
+
+COUNTERS = ['raw_data_count', 'cached_frequent', 'cached_less_frequent', 'cached_rare',
+            'data_fragments', 'parity_fragments', 'ec_records', 'model_version', 'model_updates']
+
+
+class CacheLevelDeltaTests(SimpleTestCase):
+    def test_moves_cancel_out(self):
+        self.assertEqual(
+            cache_level_deltas([(None, 'RARE'), ('RARE', 'LESS_FREQUENT'), ('FREQUENT', None), ('RARE', 'RARE')]),
+            {'cached_rare': 0, 'cached_less_frequent': 1, 'cached_frequent': -1},
+        )
+
+
+class StatisticsTests(TestCase):
+    def setUp(self):
+        use_temporary_cache_tiers(self)
+        self.access_log = use_fresh_cache_policy(self)
+        use_fresh_model_registry(self)
+        use_fresh_update_buffer(self)
+        self.devices = [
+            Device.objects.create(name=f'sensor {i}', device_type='Temperature', location='lab')
+            for i in range(2)
+        ]
+
+    def counters(self):
+        return model_to_dict(get_statistics(), fields=COUNTERS)
+
+    def recounted(self):
+        return model_to_dict(rebuild_statistics(), fields=COUNTERS)
+
+    def test_incremental_counters_match_a_recount(self):
+        rebuild_statistics()
+        for value in range(3):
+            ingest_readings([{'device_id': device.id, 'value': value} for device in self.devices])
+        self.access_log.flush()
+        CachedData.objects.update(cache_level='FREQUENT', last_accessed=timezone.now() - timedelta(hours=2))
+        rebuild_statistics()
+        downgrade_inactive_data()
+        DataFragment.objects.filter(fragment_id='F1').delete()
+
+        counters = self.counters()
+        self.assertEqual(counters['raw_data_count'], 6)
+        # Fragment deletes are not tracked; the recount picks them up
+        self.assertEqual(counters['data_fragments'], 6 * 4)
+        counters['data_fragments'] -= 6
+        self.assertEqual(counters, self.recounted())
+
+    def test_storage_efficiency_from_recorded_sizes(self):
+        raw_data_list = ingest_readings([
+            {'device_id': self.devices[0].id, 'data': {'type': 'log', 'value': 'x' * size}} for size in (10, 500)
+        ])
+        for raw_data in raw_data_list:
+            raw_data.refresh_from_db()
+            fragments = DataFragment.objects.filter(original_data=raw_data)
+            self.assertEqual(raw_data.encoded_size, sum(len(fragment.fragment_data) for fragment in fragments))
+            self.assertEqual(raw_data.original_size, len(serialize_data(raw_data.data)))
+
+        expected = sum(clamped_efficiency(raw_data.original_size, raw_data.encoded_size)
+                       for raw_data in raw_data_list) / 2
+        self.assertAlmostEqual(storage_efficiency(), expected)
+        rebuild_statistics()
+        self.assertAlmostEqual(storage_efficiency(), expected)
+
+    def test_first_increment_counts_the_tables(self):
+        ingest_readings([{'device_id': self.devices[0].id, 'value': 1}])
+        SystemStatistics.objects.all().delete()
+        statistics.increment(raw_data_count=1)
+        self.assertEqual(get_statistics().raw_data_count, 1)
+
+    def test_counters_roll_back_with_the_rows(self):
+        rebuild_statistics()
+        with self.assertRaises(Device.DoesNotExist), transaction.atomic():
+            ingest_readings([{'device_id': self.devices[0].id, 'value': 1}])
+            Device.objects.get(pk=999)
+        self.assertEqual(get_statistics().raw_data_count, 0)
+
+    def test_dashboard_reads_the_counters(self):
+        ingest_readings([{'device_id': self.devices[0].id, 'value': 1}])
+        with self.assertNumQueries(1):
+            get_statistics()
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['raw_data_count'], 1)
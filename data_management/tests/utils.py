@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+from django.conf import settings
+from django.test import override_settings
+
+CACHE_TIERS = ('frequent', 'less_frequent', 'rare')
+
+
+def use_temporary_cache_tiers(testcase):
+    """Point the SQLite-backed cache tiers at a throwaway directory for one test.
+
+    Returns the directory, which is removed again on cleanup.
+    """
+    directory = Path(tempfile.mkdtemp())
+    testcase.addCleanup(shutil.rmtree, directory)
+    overrides = override_settings(CACHES={
+        **settings.CACHES,
+        **{alias: {**settings.CACHES[alias], 'LOCATION': directory / f'{alias}.sqlite3'} for alias in CACHE_TIERS},
+    })
+    overrides.enable()
+    testcase.addCleanup(overrides.disable)
+    return directory
+
+
+def use_fresh_cache_policy(testcase, policy=None):
+    """Give one test its own tier policy and access log instead of the process-wide ones.
+
+    Returns the access log so the test can flush it.
+    """
+    from ..utils import caching
+    from ..utils.cache_policy import TieredCachePolicy
+
+    if policy is None:
+        config = caching.cache_policy_settings()
+        policy = TieredCachePolicy(config['CAPACITY'], config['PROMOTE_AT'])
+    access_log = caching.AccessLog()
+    for name, value in (('policy', policy), ('access_log', access_log)):
+        patcher = mock.patch.object(caching, name, value)
+        patcher.start()
+        testcase.addCleanup(patcher.stop)
+    return access_log
+
+
+def use_fresh_model_registry(testcase):
+    """Give one test an empty global model registry.
+
+    The process-wide one would keep a model whose row was rolled back with
+    an earlier test. Returns the registry.
+    """
+    from ..utils import federated_learning
+
+    registry = federated_learning.ModelRegistry()
+    patcher = mock.patch.object(federated_learning, 'model_registry', registry)
+    patcher.start()
+    testcase.addCleanup(patcher.stop)
+    return registry
+
+
+def use_fresh_update_buffer(testcase):
+    """Empty the process-wide local update buffer for one test.
+
+    Samples left over from an earlier test would belong to devices that were
+    rolled back with it. Returns the buffer.
+    """
+    from ..utils.federated_learning import local_update_buffer
+
+    for name, value in (('_buffers', {}), ('_metrics', {'samples': 0, 'updates': 0, 'skipped': 0})):
+        patcher = mock.patch.object(local_update_buffer, name, value)
+        patcher.start()
+        testcase.addCleanup(patcher.stop)
+    return local_update_buffer
@@ -1,10 +1,15 @@
 from django.urls import path
-from .views import DashboardView, SimulateDeviceView, ProcessDataView, AutoGenerateAPI,SystemHealthView
+from .views import DashboardView, SimulateDeviceView, ProcessDataView, AutoGenerateAPI, BulkIngestAPI, DeviceHistoryAPI, QueueStatusAPI, ReadingsAPI, SystemHealthView
 
 urlpatterns = [
     path('', DashboardView.as_view(), name='dashboard'),
     path('simulate/', SimulateDeviceView.as_view(), name='simulate_device'),
     path('process/', ProcessDataView.as_view(), name='process_data'),
     path('api/generate-data/', AutoGenerateAPI.as_view(), name='generate_data_api'),
+    path('api/ingest/', BulkIngestAPI.as_view(), name='bulk_ingest_api'),
+    path('api/readings/', ReadingsAPI.as_view(), name='readings_api'),
+    path('api/readings/<int:raw_data_id>/', ReadingsAPI.as_view(), name='reading_api'),
+    path('api/devices/<int:device_id>/history/', DeviceHistoryAPI.as_view(), name='device_history_api'),
+    path('api/queue/', QueueStatusAPI.as_view(), name='queue_status_api'),
     path('health/', SystemHealthView.as_view(), name='system_health'),
 ]
\ No newline at end of file
@@ -0,0 +1,133 @@
+import struct
+import zlib
+from datetime import datetime, timedelta
+import numpy as np
+from .placement import ec_settings
+
+try:
+    import zstandard
+except ImportError:  # optional; blocks fall back to zlib
+    zstandard = None
+
+DEFAULT_BLOCK_SETTINGS = {
+    # Off by default: readings are erasure-coded one JSON payload at a time
+    'ENABLED': False,
+    'COMPRESSION': 'zlib',  # 'zstd', 'zlib' or 'none'
+    'MAX_READINGS': 4096,
+}
+
+# Enum tables stored as one byte each; codes are list positions, so only append
+READING_TYPES = ('random', 'temperature', 'humidity', 'pressure')
+READING_UNITS = ('unit', '°C', '%', 'hPa')
+
+MAGIC = b'RDB1'
+# magic, codec, reading count, stored body length
+HEADER = struct.Struct('<4sBII')
+CODECS = {'none': 0, 'zlib': 1, 'zstd': 2}
+FLAG_INTEGER = 1  # value was a JSON integer
+
+# Columns in the order they are laid out in a block body
+COLUMNS = (
+    ('raw_data_id', np.dtype('<i8')),
+    ('timestamp', np.dtype('<i8')),  # microseconds since the epoch, naive
+    ('value', np.dtype('<f4')),
+    ('type', np.dtype('u1')),
+    ('unit', np.dtype('u1')),
+    ('flags', np.dtype('u1')),
+)
+
+EPOCH = datetime(1970, 1, 1)
+_TYPE_CODES = {name: code for code, name in enumerate(READING_TYPES)}
+_UNIT_CODES = {name: code for code, name in enumerate(READING_UNITS)}
+
+
+def block_settings():
+    return {**DEFAULT_BLOCK_SETTINGS, **ec_settings().get('BLOCKS', {})}
+
+
+def pack_reading(data):
+    """(timestamp, value, type, unit, flags) for a reading, or None when the
+    compact format could not reproduce it exactly (it is then stored as JSON).
+    """
+    if not isinstance(data, dict) or set(data) != {'type', 'value', 'timestamp', 'unit'}:
+        return None
+    type_code = _TYPE_CODES.get(data['type'])
+    unit_code = _UNIT_CODES.get(data['unit'])
+    if type_code is None or unit_code is None:
+        return None
+
+    value = data['value']
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    packed = np.float32(value)
+    if isinstance(value, int):
+        if int(packed) != value:
+            return None
+        flags = FLAG_INTEGER
+    else:
+        if float(str(packed)) != value:
+            return None
+        flags = 0
+
+    timestamp = data['timestamp']
+    if not isinstance(timestamp, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None or parsed.isoformat() != timestamp:
+        return None
+    micros = (parsed - EPOCH) // timedelta(microseconds=1)
+
+    return micros, packed, type_code, unit_code, flags
+
+
+def encode_block(rows, compression='zlib'):
+    """Pack [(raw_data_id, packed_reading), ...] into one columnar block."""
+    if compression == 'zstd' and zstandard is None:
+        compression = 'zlib'
+    codec = CODECS[compression]
+
+    columns = list(zip(*[(raw_data_id, *packed) for raw_data_id, packed in rows]))
+    body = b''.join(
+        np.asarray(column, dtype=dtype).tobytes()
+        for column, (_, dtype) in zip(columns, COLUMNS)
+    )
+    if compression == 'zlib':
+        body = zlib.compress(body, 6)
+    elif compression == 'zstd':
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+    return HEADER.pack(MAGIC, codec, len(rows), len(body)) + body
+
+
+def decode_block(block):
+    """Unpack a block into [(raw_data_id, data), ...] in stored order."""
+    magic, codec, count, length = HEADER.unpack_from(block)
+    if magic != MAGIC:
+        raise ValueError("Not a reading block")
+    # Erasure decoding strips trailing zero bytes, so restore them
+    body = bytes(block[HEADER.size:HEADER.size + length]).ljust(length, b'\0')
+    if codec == CODECS['zlib']:
+        body = zlib.decompress(body)
+    elif codec == CODECS['zstd']:
+        if zstandard is None:
+            raise ValueError("Block is zstd-compressed but zstandard is not installed")
+        body = zstandard.ZstdDecompressor().decompress(body)
+
+    columns = {}
+    offset = 0
+    for name, dtype in COLUMNS:
+        columns[name] = np.frombuffer(body, dtype=dtype, count=count, offset=offset)
+        offset += dtype.itemsize * count
+
+    readings = []
+    for i in range(count):
+        value = columns['value'][i]
+        readings.append((int(columns['raw_data_id'][i]), {
+            'type': READING_TYPES[columns['type'][i]],
+            'value': int(value) if columns['flags'][i] & FLAG_INTEGER else float(str(value)),
+            'timestamp': (EPOCH + timedelta(microseconds=int(columns['timestamp'][i]))).isoformat(),
+            'unit': READING_UNITS[columns['unit'][i]],
+        }))
+    return readings
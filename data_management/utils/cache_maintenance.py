@@ -1,21 +1,103 @@
-from django.utils import timezone
+import time
 from datetime import timedelta
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
 from ..models import CachedData
+from .cache_policy import LEVELS
+from .caching import cache_policy_settings, policy
+from . import statistics
 
-def downgrade_inactive_data():
-    # Downgrade frequent data that hasn't been accessed in 10 minutes
-    frequent_to_downgrade = CachedData.objects.filter(
-        cache_level='FREQUENT',
-        last_accessed__lt=timezone.now() - timedelta(minutes=10)
-    ).update(cache_level='LESS_FREQUENT')
-
-    # Downgrade less frequent data that hasn't been accessed in 1 hour
-    less_frequent_to_downgrade = CachedData.objects.filter(
-        cache_level='LESS_FREQUENT',
-        last_accessed__lt=timezone.now() - timedelta(hours=1)
-    ).update(cache_level='RARE')
+# CachedData.cache_level -> tier cache alias
+TIER_CACHES = {
+    'FREQUENT': 'frequent',
+    'LESS_FREQUENT': 'less_frequent',
+    'RARE': 'rare',
+}
+
+
+def _move_batch(level, cutoff, batch_size, tiers, timeouts):
+    """Move one batch of entries idle since `cutoff` out of `level`.
+
+    Entries go one tier down, or are evicted from RARE. Rows whose value
+    already expired from their tier are evicted too, so the table matches
+    what is actually cached. Returns (moved, evicted) counts.
+    """
+    lower = LEVELS[LEVELS.index(level) + 1] if level != LEVELS[-1] else None
+    source = tiers[level]
+    with transaction.atomic():
+        rows = list(CachedData.objects.filter(
+            cache_level=level, last_accessed__lt=cutoff
+        ).order_by('last_accessed').values_list('id', 'raw_data_id')[:batch_size])
+        if not rows:
+            return 0, 0
+        keys = {raw_data_id: f'data_{raw_data_id}' for _, raw_data_id in rows}
+        values = source.get_many(list(keys.values())) if lower else {}
+        moved = [pk for pk, raw_data_id in rows if keys[raw_data_id] in values]
+        evicted = [pk for pk, raw_data_id in rows if keys[raw_data_id] not in values]
+
+        if moved:
+            # last_accessed is auto_now on save() only, so update() leaves it alone
+            CachedData.objects.filter(pk__in=moved).update(cache_level=lower)
+        if evicted:
+            CachedData.objects.filter(pk__in=evicted).delete()
+        statistics.increment(**statistics.cache_level_deltas(
+            [(level, lower)] * len(moved) + [(level, None)] * len(evicted)
+        ))
+
+    # The table is committed first: a reader racing the move finds the value
+    # in one of the tiers and the per-process policy re-learns its level
+    if values:
+        tiers[lower].set_many(values, timeout=timeouts[lower])
+    source.delete_many(list(keys.values()))
+    for raw_data_id in keys:
+        policy.discard(raw_data_id)
+    return len(moved), len(evicted)
 
+
+def run_maintenance(batch_size=None, max_batches=None, now=None, stop_event=None):
+    """Demote idle entries one tier and evict idle RARE entries, in batches.
+
+    Tiers are processed coldest first so an entry moves at most one tier per
+    run. Idle thresholds come from CACHE_POLICY['IDLE_SECONDS']. Returns per
+    tier counts and durations plus the run totals.
+    """
+    config = cache_policy_settings()
+    batch_size = batch_size or config['MAINTENANCE_BATCH_SIZE']
+    now = now or timezone.now()
+    tiers = {level: caches[alias] for level, alias in TIER_CACHES.items()}
+
+    report = {'levels': {}, 'moved': 0, 'evicted': 0, 'batches': 0}
+    start = time.perf_counter()
+    for level in reversed(LEVELS):
+        idle = config['IDLE_SECONDS'].get(level)
+        if idle is None:
+            continue
+        cutoff = now - timedelta(seconds=idle)
+        counts = {'moved': 0, 'evicted': 0, 'batches': 0}
+        level_start = time.perf_counter()
+        while max_batches is None or report['batches'] < max_batches:
+            if stop_event is not None and stop_event.is_set():
+                break
+            moved, evicted = _move_batch(level, cutoff, batch_size, tiers, config['TIMEOUT'])
+            if not moved and not evicted:
+                break
+            counts['moved'] += moved
+            counts['evicted'] += evicted
+            counts['batches'] += 1
+            report['batches'] += 1
+        counts['elapsed'] = time.perf_counter() - level_start
+        report['levels'][level] = counts
+        report['moved'] += counts['moved']
+        report['evicted'] += counts['evicted']
+
+    report['elapsed'] = time.perf_counter() - start
+    return report
+
+
+def downgrade_inactive_data():
+    report = run_maintenance()
     return {
-        'frequent_downgraded': frequent_to_downgrade,
-        'less_frequent_downgraded': less_frequent_to_downgrade
-    }
\ No newline at end of file
+        'frequent_downgraded': report['levels'].get('FREQUENT', {}).get('moved', 0),
+        'less_frequent_downgraded': report['levels'].get('LESS_FREQUENT', {}).get('moved', 0),
+    }
@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Tiers from hottest to coldest; they map onto CachedData.cache_level
+LEVELS = ('FREQUENT', 'LESS_FREQUENT', 'RARE')
+
+
+class FrequencySketch:
+    """Count-min sketch of recent access frequency (the TinyLFU filter).
+
+    Counters saturate at 15 and are all halved once `sample_size` increments
+    have been recorded, so old popularity fades instead of sticking forever.
+    """
+
+    def __init__(self, width=1 << 14, depth=4, sample_size=None):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint8)
+        self.rows = np.arange(depth)
+        self.sample_size = sample_size or width * 10
+        self.additions = 0
+
+    def _indexes(self, key):
+        return [hash((seed, key)) % self.width for seed in range(self.depth)]
+
+    def increment(self, key):
+        idx = self._indexes(key)
+        counters = self.table[self.rows, idx]
+        self.table[self.rows, idx] = np.minimum(counters + 1, 15)
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.table >>= 1
+            self.additions //= 2
+
+    def estimate(self, key):
+        return int(self.table[self.rows, self._indexes(key)].min())
+
+
+class TieredCachePolicy:
+    """Segmented LRU over FREQUENT / LESS_FREQUENT / RARE with TinyLFU admission.
+
+    New keys enter RARE. A hit moves a key up one tier once its sketch
+    frequency reaches that tier's threshold and, when the tier is full, only
+    if it is more popular than the tier's LRU entry. Overflowing tiers demote
+    their LRU entry one tier down; RARE overflow evicts it.
+
+    Every call returns the list of (key, old_level, new_level) changes it made
+    (new_level None meaning evicted) so the caller can move cached values.
+    """
+
+    def __init__(self, capacities, promote_at, sketch=None):
+        self.capacities = capacities
+        self.promote_at = promote_at
+        self.sketch = sketch or FrequencySketch()
+        self.segments = {level: OrderedDict() for level in LEVELS}
+        self.levels = {}
+        self.lock = threading.RLock()
+
+    def level_of(self, key):
+        return self.levels.get(key)
+
+    def admit(self, key):
+        with self.lock:
+            self.sketch.increment(key)
+            changes = []
+            if key in self.levels:
+                self.segments[self.levels[key]].move_to_end(key)
+                return self.levels[key], changes
+            # Keys that were popular before being evicted go straight back up
+            level = 'RARE'
+            for candidate in ('FREQUENT', 'LESS_FREQUENT'):
+                if self.sketch.estimate(key) >= self.promote_at[candidate]:
+                    level = candidate
+                    break
+            self._insert(key, level, changes)
+            return self.levels.get(key), changes
+
+    def access(self, key, found_level=None):
+        with self.lock:
+            self.sketch.increment(key)
+            changes = []
+            level = self.levels.get(key)
+            if level is None:
+                # Entry cached by another process or before a restart
+                level = found_level or 'RARE'
+                self._insert(key, level, changes)
+                level = self.levels.get(key)
+                if level is None:
+                    return None, changes
+
+            upper = self._upper(level)
+            if upper and self._should_promote(key, upper):
+                del self.segments[level][key]
+                changes.append((key, level, upper))
+                self._insert(key, upper, changes)
+            else:
+                self.segments[level].move_to_end(key)
+            return self.levels.get(key), changes
+
+    def discard(self, key):
+        with self.lock:
+            level = self.levels.pop(key, None)
+            if level:
+                del self.segments[level][key]
+
+    def _should_promote(self, key, upper):
+        frequency = self.sketch.estimate(key)
+        if frequency < self.promote_at[upper]:
+            return False
+        segment = self.segments[upper]
+        if len(segment) < self.capacities[upper]:
+            return True
+        victim = next(iter(segment))
+        return frequency > self.sketch.estimate(victim)
+
+    def _insert(self, key, level, changes):
+        self.segments[level][key] = None
+        self.levels[key] = level
+        self._overflow(level, changes)
+
+    def _overflow(self, level, changes):
+        segment = self.segments[level]
+        while len(segment) > self.capacities[level]:
+            victim, _ = segment.popitem(last=False)
+            lower = self._lower(level)
+            changes.append((victim, level, lower))
+            if lower is None:
+                del self.levels[victim]
+            else:
+                self.segments[lower][victim] = None
+                self.levels[victim] = lower
+                self._overflow(lower, changes)
+
+    @staticmethod
+    def _upper(level):
+        index = LEVELS.index(level)
+        return LEVELS[index - 1] if index > 0 else None
+
+    @staticmethod
+    def _lower(level):
+        index = LEVELS.index(level)
+        return LEVELS[index + 1] if index + 1 < len(LEVELS) else None
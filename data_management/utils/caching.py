@@ -1,105 +1,236 @@
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
 from django.core.cache import caches
 from ..models import CachedData, RawData
 from django.utils import timezone
-import random
+from .cache_policy import LEVELS, TieredCachePolicy
+from . import statistics
+
+DEFAULT_CACHE_POLICY = {
+    # Entries held per tier before the LRU entry is demoted (or evicted from RARE)
+    'CAPACITY': {'FREQUENT': 1000, 'LESS_FREQUENT': 5000, 'RARE': 20000},
+    # Sketch frequency needed to move up into a tier
+    'PROMOTE_AT': {'FREQUENT': 4, 'LESS_FREQUENT': 2},
+    'TIMEOUT': {'FREQUENT': 300, 'LESS_FREQUENT': 1800, 'RARE': 3600},
+    # Access counts are written to CachedData in batches, not on every hit
+    'FLUSH_INTERVAL': 5.0,
+    'FLUSH_THRESHOLD': 500,
+    # Seconds without access before the maintenance runner demotes an entry
+    # one tier (or evicts it from RARE); None disables that step
+    'IDLE_SECONDS': {'FREQUENT': 600, 'LESS_FREQUENT': 3600, 'RARE': 3600},
+    'MAINTENANCE_BATCH_SIZE': 500,
+    'MAINTENANCE_INTERVAL': 60.0,
+}
+
+
+def cache_policy_settings():
+    return {**DEFAULT_CACHE_POLICY, **getattr(settings, 'CACHE_POLICY', {})}
+
+
+class AccessLog:
+    # Per-process buffer of CachedData changes, flushed with one bulk_update
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.evicted = set()
+        self.last_flush = time.monotonic()
+
+    def record(self, raw_data_id, level=None, hits=0):
+        with self.lock:
+            entry = self.pending.setdefault(raw_data_id, {'hits': 0, 'level': None, 'last_accessed': None})
+            entry['hits'] += hits
+            if hits:
+                entry['last_accessed'] = timezone.now()
+            if level:
+                entry['level'] = level
+                self.evicted.discard(raw_data_id)
+
+    def record_eviction(self, raw_data_id):
+        with self.lock:
+            self.pending.pop(raw_data_id, None)
+            self.evicted.add(raw_data_id)
+
+    def forget(self, raw_data_ids):
+        # Drop buffered changes for readings whose rows are gone
+        with self.lock:
+            for raw_data_id in raw_data_ids:
+                self.pending.pop(raw_data_id, None)
+                self.evicted.discard(raw_data_id)
+
+    def maybe_flush(self):
+        config = cache_policy_settings()
+        if (len(self.pending) + len(self.evicted) >= config['FLUSH_THRESHOLD']
+                or time.monotonic() - self.last_flush >= config['FLUSH_INTERVAL']):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            evicted, self.evicted = self.evicted, set()
+            self.last_flush = time.monotonic()
+
+        if evicted:
+            evicted_rows = CachedData.objects.filter(raw_data_id__in=evicted)
+            level_changes = list(evicted_rows.values_list('cache_level', flat=True))
+            evicted_rows.delete()
+            statistics.increment(**statistics.cache_level_deltas((level, None) for level in level_changes))
+        if not pending:
+            return
+
+        rows = list(CachedData.objects.filter(raw_data_id__in=list(pending)).only(
+            'id', 'raw_data_id', 'cache_level', 'access_count', 'last_accessed'
+        ))
+        level_changes = []
+        for row in rows:
+            entry = pending[row.raw_data_id]
+            row.access_count += entry['hits']
+            if entry['last_accessed']:
+                row.last_accessed = entry['last_accessed']
+            if entry['level']:
+                level_changes.append((row.cache_level, entry['level']))
+                row.cache_level = entry['level']
+        CachedData.objects.bulk_update(rows, ['cache_level', 'access_count', 'last_accessed'], batch_size=500)
+        statistics.increment(**statistics.cache_level_deltas(level_changes))
+
+
+def _build_policy():
+    config = cache_policy_settings()
+    return TieredCachePolicy(config['CAPACITY'], config['PROMOTE_AT'])
+
+
+# Shared by every HierarchicalCache in this process
+policy = _build_policy()
+access_log = AccessLog()
+
 
 class HierarchicalCache:
     def __init__(self):
         self.frequent_cache = caches['frequent']
         self.less_frequent_cache = caches['less_frequent']
         self.rare_cache = caches['rare']
+        self.tiers = {
+            'FREQUENT': self.frequent_cache,
+            'LESS_FREQUENT': self.less_frequent_cache,
+            'RARE': self.rare_cache,
+        }
+        self.timeouts = cache_policy_settings()['TIMEOUT']
 
     def cache_data(self, raw_data_id, data):
-        weights = self.generate_weight_distribution() 
-
-        initial_level = random.choices(
-            ['FREQUENT', 'LESS_FREQUENT', 'RARE'],
-            weights=weights,
-            k=1
-        )[0]
-
-        cached_obj, created = CachedData.objects.get_or_create(
-            raw_data_id=raw_data_id,
-            defaults={
-                'cache_level': initial_level,
-                'access_count': 0
-            }
-        )
-
-        if cached_obj.cache_level == 'FREQUENT':
-            self.frequent_cache.set(f'data_{raw_data_id}', data, timeout=300)
-        elif cached_obj.cache_level == 'LESS_FREQUENT':
-            self.less_frequent_cache.set(f'data_{raw_data_id}', data, timeout=1800)
-        else:
-            self.rare_cache.set(f'data_{raw_data_id}', data, timeout=3600) 
+        self.cache_many({raw_data_id: data})
+
+    def cache_many(self, items):
+        # items: {raw_data_id: data}; the policy picks each tier, then one query
+        # for existing rows, one bulk insert for new ones and one set_many per tier
+        levels = {}
+        changes = []
+        for raw_data_id in items:
+            level, admitted_changes = policy.admit(raw_data_id)
+            changes.extend(admitted_changes)
+            if level:
+                levels[raw_data_id] = level
+
+        existing = set(CachedData.objects.filter(
+            raw_data_id__in=list(levels)
+        ).values_list('raw_data_id', flat=True))
+        created = CachedData.objects.bulk_create([
+            CachedData(raw_data_id=raw_data_id, cache_level=level, access_count=0)
+            for raw_data_id, level in levels.items() if raw_data_id not in existing
+        ], batch_size=500)
+        statistics.increment(**statistics.cache_level_deltas((None, row.cache_level) for row in created))
+        for raw_data_id in existing:
+            access_log.record(raw_data_id, level=levels[raw_data_id])
+
+        by_level = {level: {} for level in LEVELS}
+        for raw_data_id, level in levels.items():
+            by_level[level][f'data_{raw_data_id}'] = items[raw_data_id]
+        for level, values in by_level.items():
+            if values:
+                self.tiers[level].set_many(values, timeout=self.timeouts[level])
+
+        self._apply_changes(changes, known=items)
+        access_log.maybe_flush()
 
     def get_data(self, raw_data_id):
-        data = self.frequent_cache.get(f'data_{raw_data_id}')
-        if data:
-            self._update_cache_level(raw_data_id, 'FREQUENT')
-            return data
-
-        data = self.less_frequent_cache.get(f'data_{raw_data_id}')
-        if data:
-            self._update_cache_level(raw_data_id, 'LESS_FREQUENT')
-            return data
-
-        data = self.rare_cache.get(f'data_{raw_data_id}')
-        if data:
-            self._update_cache_level(raw_data_id, 'RARE')
-            return data
-
-        return None
-    
-    @staticmethod
-    def generate_weight_distribution():
-        nums = [random.uniform(1, 100) for _ in range(3)]
-        nums.sort(reverse=True)
-        total = sum(nums)
-        weights = [round((n / total) * 100) for n in nums]
-        diff = 100 - sum(weights)
-        weights[0] += diff
-        return weights
-
-    def _update_cache_level(self, raw_data_id, current_level):
-        try:
-            cached_data = CachedData.objects.get(raw_data_id=raw_data_id)
-            cached_data.access_count += 1
-            cached_data.last_accessed = timezone.now()
-
-            if current_level == 'FREQUENT':
-                pass
-            elif current_level == 'LESS_FREQUENT':
-                if cached_data.access_count > 3:
-                    cached_data.cache_level = 'FREQUENT'
-            else:  # RARE
-                if cached_data.access_count > 1:
-                    cached_data.cache_level = 'LESS_FREQUENT'
-
-            cached_data.save()
-
-            # Update caches accordingly
-            data = None
-            if current_level == 'FREQUENT':
-                data = self.frequent_cache.get(f'data_{raw_data_id}')
-            elif current_level == 'LESS_FREQUENT':
-                data = self.less_frequent_cache.get(f'data_{raw_data_id}')
+        return self.get_many([raw_data_id]).get(raw_data_id)
+
+    def get_many(self, raw_data_ids):
+        """Look up many readings with one get_many per tier.
+
+        Ids whose tier the policy knows are fetched from that tier only; the
+        rest are probed hottest tier first. Returns {raw_data_id: data}.
+        """
+        known = defaultdict(list)
+        remaining = []
+        for raw_data_id in raw_data_ids:
+            level = policy.level_of(raw_data_id)
+            if level:
+                known[level].append(raw_data_id)
             else:
-                data = self.rare_cache.get(f'data_{raw_data_id}')
-
-            if data:
-                if cached_data.cache_level == 'FREQUENT':
-                    self.frequent_cache.set(f'data_{raw_data_id}', data, timeout=300)
-                    self.less_frequent_cache.delete(f'data_{raw_data_id}')
-                    self.rare_cache.delete(f'data_{raw_data_id}')
-                elif cached_data.cache_level == 'LESS_FREQUENT':
-                    self.less_frequent_cache.set(f'data_{raw_data_id}', data, timeout=1800)
-                    self.frequent_cache.delete(f'data_{raw_data_id}')
-                    self.rare_cache.delete(f'data_{raw_data_id}')
+                remaining.append(raw_data_id)
+
+        found = {}
+        for level, ids in known.items():
+            values = self.tiers[level].get_many([f'data_{i}' for i in ids])
+            for raw_data_id in ids:
+                data = values.get(f'data_{raw_data_id}')
+                if data is None:
+                    # Expired, or moved to another tier by cache maintenance
+                    policy.discard(raw_data_id)
+                    remaining.append(raw_data_id)
                 else:
-                    self.rare_cache.set(f'data_{raw_data_id}', data, timeout=3600)
-                    self.frequent_cache.delete(f'data_{raw_data_id}')
-                    self.less_frequent_cache.delete(f'data_{raw_data_id}')
+                    found[raw_data_id] = (data, level)
+
+        for level in LEVELS:
+            if not remaining:
+                break
+            values = self.tiers[level].get_many([f'data_{i}' for i in remaining])
+            for raw_data_id in remaining:
+                data = values.get(f'data_{raw_data_id}')
+                if data is not None:
+                    found[raw_data_id] = (data, level)
+            remaining = [i for i in remaining if i not in found]
+
+        results = {}
+        changes = []
+        for raw_data_id, (data, level) in found.items():
+            new_level, access_changes = policy.access(raw_data_id, level)
+            changes.extend(access_changes)
+            access_log.record(raw_data_id, level=new_level, hits=1)
+            results[raw_data_id] = data
+
+        self._apply_changes(changes, known=results)
+        access_log.maybe_flush()
+        return results
+
+    def evict_many(self, raw_data_ids):
+        """Remove readings from every tier and from this process's policy.
+
+        For readings that no longer exist; their CachedData rows are
+        expected to be gone with them (on_delete=CASCADE).
+        """
+        keys = [f'data_{raw_data_id}' for raw_data_id in raw_data_ids]
+        if not keys:
+            return
+        for cache in self.tiers.values():
+            cache.delete_many(keys)
+        for raw_data_id in raw_data_ids:
+            policy.discard(raw_data_id)
+        access_log.forget(raw_data_ids)
+
+    def _apply_changes(self, changes, known=None):
+        # Move values between the tier caches to match the policy's decisions
+        known = known or {}
+        for raw_data_id, old_level, new_level in changes:
+            key = f'data_{raw_data_id}'
+            data = known.get(raw_data_id)
+            if data is None:
+                data = self.tiers[old_level].get(key)
+            self.tiers[old_level].delete(key)
 
-        except CachedData.DoesNotExist:
-            pass
+            if new_level is None:
+                access_log.record_eviction(raw_data_id)
+            elif data is not None:
+                self.tiers[new_level].set(key, data, timeout=self.timeouts[new_level])
+                access_log.record(raw_data_id, level=new_level)
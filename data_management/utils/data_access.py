@@ -0,0 +1,56 @@
+from ..models import RawData
+from .caching import HierarchicalCache
+from .erasure_coding import recover_many
+
+# Upper bound on readings returned by one read request
+MAX_READ_BATCH = 1000
+
+
+def get_readings(raw_data_ids):
+    """Read-through access to readings.
+
+    Checks the tiered caches first (one multi-get per tier), then loads the
+    misses from RawData in one query and, for anything the table can't
+    provide, reconstructs the reading from its erasure-coded fragments.
+    Readings loaded from the database or fragments are put back in the cache.
+
+    Returns {raw_data_id: {'data': ..., 'source': 'cache'|'database'|'fragments'}}
+    in the order of raw_data_ids; unknown ids are left out.
+    """
+    raw_data_ids = list(dict.fromkeys(raw_data_ids))
+    cache = HierarchicalCache()
+    results = {i: {'data': data, 'source': 'cache'} for i, data in cache.get_many(raw_data_ids).items()}
+
+    misses = [i for i in raw_data_ids if i not in results]
+    if misses:
+        rows = dict(RawData.objects.filter(id__in=misses).values_list('id', 'data'))
+        loaded = {i: data for i, data in rows.items() if data is not None}
+        for i, data in loaded.items():
+            results[i] = {'data': data, 'source': 'database'}
+
+        lost = [i for i in misses if i not in loaded]
+        if lost:
+            for i, data in recover_many(lost).items():
+                # Failed recoveries come back as an error dict; readings need not be dicts
+                if not (isinstance(data, dict) and 'error' in data):
+                    results[i] = {'data': data, 'source': 'fragments'}
+                    if i in rows:
+                        loaded[i] = data
+
+        # Only readings that still have a RawData row can be tracked in CachedData
+        if loaded:
+            cache.cache_many(loaded)
+
+    return {i: results[i] for i in raw_data_ids if i in results}
+
+
+def get_reading(raw_data_id):
+    return get_readings([raw_data_id]).get(raw_data_id)
+
+
+def latest_reading_ids(device_id, count):
+    return list(
+        RawData.objects.filter(device_id=device_id)
+        .order_by('-timestamp', '-id')
+        .values_list('id', flat=True)[:count]
+    )
@@ -1,33 +1,45 @@
+import logging
 import numpy as np
 from typing import List, Tuple
 import json
 import base64
-from ..models import DataFragment, RawData
+import zlib
+from collections import defaultdict
+from functools import lru_cache
+from ..models import DataFragment, Device, RawData, ReadingBlock
+from .block_format import block_settings, decode_block, encode_block, pack_reading
+from .gf256 import encoding_matrix, gf_inverse, gf_matmul
+from .placement import PlacementEngine, down_nodes, get_profile, profile_for_device_type
+from . import statistics
+
+logger = logging.getLogger(__name__)
 
 class ReedSolomonEC:
+    # Systematic Reed-Solomon over GF(256): fragments F1..Fk are the data
+    # chunks themselves, F(k+1)..F(k+m) are parity.
     def __init__(self, k: int = 4, m: int = 2):
         self.k = k  # data fragments
         self.m = m  # parity fragments
-        
-    def encode(self, data: bytes) -> List[Tuple[str, bytes]]:
-        # Split data into k chunks
+        self.matrix = encoding_matrix(k, m)
+
+    def split(self, data: bytes) -> np.ndarray:
+        # Split data into k equally sized (zero padded) chunks, one per row
         chunk_size = (len(data) + self.k - 1) // self.k
         padded_data = data.ljust(chunk_size * self.k, b'\0')
-        chunks = [padded_data[i*chunk_size:(i+1)*chunk_size] for i in range(self.k)]
-        
-        # Convert to numpy array for matrix operations
-        data_matrix = np.array([list(chunk) for chunk in chunks], dtype=np.uint8)
+        return np.frombuffer(padded_data, dtype=np.uint8).reshape(self.k, chunk_size)
+
+    def encode_matrix(self, data_matrix: np.ndarray) -> np.ndarray:
+        # (k x n) data chunks -> (m x n) parity chunks
+        return gf_matmul(self.matrix[self.k:], data_matrix)
         
-        # Generate Vandermonde matrix for encoding
-        vandermonde = np.vander(np.arange(1, self.k + self.m + 1), self.k, increasing=True)
-        encoded_matrix = np.dot(vandermonde, data_matrix) % 256
+    def encode(self, data: bytes) -> List[Tuple[str, bytes]]:
+        data_matrix = self.split(data)
+        parity_matrix = self.encode_matrix(data_matrix)
         
-        # Convert back to bytes
         fragments = []
-        for i, row in enumerate(encoded_matrix):
+        for i, row in enumerate(np.concatenate([data_matrix, parity_matrix])):
             fragment_id = f"F{i+1}"
-            fragment_data = bytes(row)
-            fragments.append((fragment_id, fragment_data))
+            fragments.append((fragment_id, row.tobytes()))
             
         return fragments
         
@@ -36,70 +48,297 @@ class ReedSolomonEC:
         if len(fragments) < self.k:
             raise ValueError(f"Need at least {self.k} fragments for decoding")
             
-        # Sort fragments by ID
-        fragments.sort()
-        
-        # Reconstruct original data
-        fragment_ids = [int(fid[1:]) for fid, _ in fragments[:self.k]]
-        fragment_data = [np.array(list(data), dtype=np.uint8) for _, data in fragments[:self.k]]
-        
-        # Create decoding matrix
-        decoding_matrix = np.vander(fragment_ids, self.k, increasing=True)
-        inv_decoding_matrix = np.linalg.inv(decoding_matrix).astype(np.uint8)
-        
-        # Decode original chunks
-        original_chunks = np.dot(inv_decoding_matrix, fragment_data) % 256
+        # Any k fragments will do; prefer data fragments (lowest ids)
+        fragments = sorted(fragments, key=lambda f: int(f[0][1:]))[:self.k]
+        rows = tuple(int(fid[1:]) - 1 for fid, _ in fragments)
+
+        # Systematic code: with F1..Fk intact the data is just their concatenation
+        if rows == tuple(range(self.k)):
+            return b''.join(bytes(data) for _, data in fragments).rstrip(b'\0')
+
+        fragment_matrix = np.stack([np.frombuffer(data, dtype=np.uint8) for _, data in fragments])
+        original_chunks = gf_matmul(decoding_matrix(self.k, self.m, rows), fragment_matrix)
         
         # Combine chunks and remove padding
-        original_data = b''.join(bytes(chunk) for chunk in original_chunks)
-        return original_data.rstrip(b'\0')
+        return original_chunks.tobytes().rstrip(b'\0')
+
 
-def store_with_ec(raw_data_id):
-    raw_data = RawData.objects.get(pk=raw_data_id)
-    
+@lru_cache(maxsize=1024)
+def decoding_matrix(k, m, rows):
+    # Inverse of the encoding rows that survived, memoized per surviving set
+    return gf_inverse(encoding_matrix(k, m)[list(rows)])
+
+
+def fragment_checksum(data):
+    return zlib.crc32(data)
+
+
+def fragment_is_intact(data, checksum):
+    # Fragments stored before checksums were recorded cannot be verified
+    return checksum is None or zlib.crc32(data) == checksum
+
+
+def serialize_data(data):
     # Convert data to JSON and then to bytes for more reliable encoding
     try:
-        if isinstance(raw_data.data, str):
+        if isinstance(data, str):
             # If it's already a string, parse it first to ensure valid JSON
-            data_obj = json.loads(raw_data.data)
+            data_obj = json.loads(data)
         else:
-            data_obj = raw_data.data
+            data_obj = data
         
-        data_bytes = json.dumps(data_obj).encode('utf-8')
+        return json.dumps(data_obj).encode('utf-8')
     except (TypeError, json.JSONDecodeError):
         # Fallback to string representation if not JSON serializable
-        data_bytes = str(raw_data.data).encode('utf-8')
-    
-    original_size = len(data_bytes)
-    
-    ec = ReedSolomonEC(k=4, m=2)
-    fragments = ec.encode(data_bytes)
-    
-    total_fragment_size = 0
-    for i, (fragment_id, fragment_data) in enumerate(fragments):
-        total_fragment_size += len(fragment_data)
-        DataFragment.objects.create(
-            original_data=raw_data,
-            fragment_id=fragment_id,
+        return str(data).encode('utf-8')
+
+def encode_payloads(payloads, ec):
+    """Erasure-code many payloads with a single matrix multiplication.
+
+    Each payload is split into k chunks as usual; the chunks of all payloads
+    are laid side by side in one (k x total) matrix so parity for the whole
+    batch is computed at once. Returns the (k + m) x total stripe and the
+    column offsets of each payload in it.
+    """
+    chunk_sizes = [(len(payload) + ec.k - 1) // ec.k for payload in payloads]
+    offsets = np.concatenate([[0], np.cumsum(chunk_sizes)]).astype(int)
+
+    data_matrix = np.zeros((ec.k, offsets[-1]), dtype=np.uint8)
+    for payload, start, end in zip(payloads, offsets[:-1], offsets[1:]):
+        data_matrix[:, start:end] = ec.split(payload)
+    return np.concatenate([data_matrix, ec.encode_matrix(data_matrix)]), offsets
+
+def stripe_fragments(stripe, start, end, ec, placement, **owner):
+    # Unsaved DataFragment rows for one payload's columns of a stripe; owner
+    # is original_data=... for a single reading or block=... for a block
+    nodes = placement.place(ec.k + ec.m)
+    fragments = []
+    for i in range(ec.k + ec.m):
+        fragment_data = stripe[i, start:end].tobytes()
+        fragments.append(DataFragment(
+            fragment_id=f"F{i+1}",
             fragment_data=fragment_data,
-            storage_node=f"edge_node_{i%3}",
-            is_parity=(i >= 4)
-        )
+            storage_node=nodes[i],
+            is_parity=(i >= ec.k),
+            ec_k=ec.k,
+            ec_m=ec.m,
+            checksum=fragment_checksum(fragment_data),
+            **owner
+        ))
+    return fragments
+
+def build_fragments(raw_data_list, ec, placement=None):
+    """Erasure-code many records, each as its own JSON payload, in one pass.
+
+    Returns unsaved DataFragment rows and
+    {raw_data_id: (original_size, encoded_size)}.
+    """
+    placement = placement or PlacementEngine()
+    raw_data_list = list(raw_data_list)
+    payloads = [serialize_data(raw_data.data) for raw_data in raw_data_list]
+    stripe, offsets = encode_payloads(payloads, ec)
+
+    fragments = []
+    sizes = {}
+    for raw_data, payload, start, end in zip(raw_data_list, payloads, offsets[:-1], offsets[1:]):
+        fragments.extend(stripe_fragments(stripe, start, end, ec, placement, original_data=raw_data))
+        sizes[raw_data.id] = (len(payload), int(end - start) * (ec.k + ec.m))
+
+    return fragments, sizes
+
+def build_block_fragments(raw_data_list, ec, placement=None):
+    """Pack records into compact per-device blocks and erasure-code each
+    block as one stripe.
+
+    Records the block format cannot represent exactly are returned
+    untouched for the per-record JSON path. Saves the ReadingBlock rows and
+    sets raw_data.block; returns unsaved DataFragment rows, sizes as for
+    build_fragments (each record's share of its block) and the leftovers.
+    """
+    placement = placement or PlacementEngine()
+    config = block_settings()
+    by_device = defaultdict(list)
+    leftovers = []
+    for raw_data in raw_data_list:
+        packed = pack_reading(raw_data.data)
+        if packed is None:
+            leftovers.append(raw_data)
+        else:
+            by_device[raw_data.device_id].append((raw_data, packed))
+
+    blocks, members, payloads = [], [], []
+    for device_id, rows in by_device.items():
+        for start in range(0, len(rows), config['MAX_READINGS']):
+            chunk = rows[start:start + config['MAX_READINGS']]
+            payload = encode_block([(raw_data.id, packed) for raw_data, packed in chunk], config['COMPRESSION'])
+            original_size = sum(len(serialize_data(raw_data.data)) for raw_data, _ in chunk)
+            blocks.append(ReadingBlock(
+                device_id=device_id,
+                reading_count=len(chunk),
+                compression=config['COMPRESSION'],
+                original_size=original_size,
+                packed_size=len(payload),
+            ))
+            members.append([raw_data for raw_data, _ in chunk])
+            payloads.append(payload)
+    if not blocks:
+        return [], {}, leftovers
+
+    ReadingBlock.objects.bulk_create(blocks)
+    stripe, offsets = encode_payloads(payloads, ec)
+    fragments = []
+    sizes = {}
+    for block, records, start, end in zip(blocks, members, offsets[:-1], offsets[1:]):
+        fragments.extend(stripe_fragments(stripe, start, end, ec, placement, block=block))
+        share = max(int(end - start) * (ec.k + ec.m) // len(records), 1)
+        for raw_data in records:
+            raw_data.block = block
+            sizes[raw_data.id] = (len(serialize_data(raw_data.data)), share)
+
+    return fragments, sizes, leftovers
+
+def store_with_ec(raw_data_id, profile=None):
+    efficiencies = store_with_ec_batch([raw_data_id], profile)
+    if raw_data_id not in efficiencies:
+        raise RawData.DoesNotExist(f"RawData {raw_data_id} does not exist")
+    return efficiencies[raw_data_id]
+
+def store_with_ec_batch(raw_data_ids, profile=None):
+    # One query for the readings, one encode per profile, one bulk insert
+    raw_data_list = RawData.objects.filter(id__in=raw_data_ids).only('id', 'data', 'device_id')
+    return store_records_with_ec(raw_data_list, profile)
+
+def store_records_with_ec(raw_data_list, profile=None):
+    # Without an explicit profile each record uses the one configured for its device type
+    raw_data_list = list(raw_data_list)
+    if profile:
+        groups = {get_profile(profile): raw_data_list}
+    else:
+        device_types = dict(Device.objects.filter(
+            id__in={raw_data.device_id for raw_data in raw_data_list}
+        ).values_list('id', 'device_type'))
+        groups = defaultdict(list)
+        for raw_data in raw_data_list:
+            groups[profile_for_device_type(device_types.get(raw_data.device_id))].append(raw_data)
+
+    # Readings go into compact per-device blocks when enabled (see block_format)
+    use_blocks = block_settings()['ENABLED']
+    placement = PlacementEngine()
+    fragments = []
+    sizes = {}
+    for (k, m), records in groups.items():
+        ec = ReedSolomonEC(k=k, m=m)
+        if use_blocks:
+            block_fragments, block_sizes, records = build_block_fragments(records, ec, placement)
+            fragments.extend(block_fragments)
+            sizes.update(block_sizes)
+        group_fragments, group_sizes = build_fragments(records, ec, placement)
+        fragments.extend(group_fragments)
+        sizes.update(group_sizes)
+    DataFragment.objects.bulk_create(fragments, batch_size=500)
+
+    for raw_data in raw_data_list:
+        raw_data.original_size, raw_data.encoded_size = sizes[raw_data.id]
+    size_fields = ['original_size', 'encoded_size'] + (['block'] if use_blocks else [])
+    RawData.objects.bulk_update(raw_data_list, size_fields, batch_size=500)
+
+    parity_fragments = sum(1 for fragment in fragments if fragment.is_parity)
+    coded = [size for size in sizes.values() if size[1]]
+    statistics.increment(
+        data_fragments=len(fragments) - parity_fragments,
+        parity_fragments=parity_fragments,
+        ec_records=len(coded),
+        efficiency_sum=sum(statistics.clamped_efficiency(*size) for size in coded),
+    )
         
-    # Calculate and store storage efficiency
-    efficiency = (original_size / total_fragment_size) * 100
-    return efficiency
+    # Calculate and return storage efficiency per record
+    return {
+        raw_data_id: (original_size / encoded_size) * 100 if encoded_size else 0
+        for raw_data_id, (original_size, encoded_size) in sizes.items()
+    }
 
 def recover_data(raw_data_id):
-    fragments = list(DataFragment.objects.filter(original_data_id=raw_data_id))
-    
-    if not fragments:
-        return None
-        
-    # Get fragment data as (id, data) tuples
-    fragment_data = [(f.fragment_id, f.fragment_data) for f in fragments]
-    
-    ec = ReedSolomonEC(k=4, m=2)
+    return recover_many([raw_data_id]).get(raw_data_id)
+
+def recover_many(raw_data_ids):
+    """Recover many records, whether coded on their own or inside a block.
+
+    Fragments on nodes marked down or failing their checksum are ignored.
+    """
+    block_of = dict(RawData.objects.filter(
+        id__in=raw_data_ids, block__isnull=False
+    ).values_list('id', 'block_id'))
+
+    direct = [i for i in raw_data_ids if i not in block_of]
+    fragments, profiles = collect_fragments('original_data_id', direct)
+    recovered = {
+        raw_data_id: _decode_fragments(ReedSolomonEC(*profiles[raw_data_id]), fragments[raw_data_id])
+        for raw_data_id in direct if fragments.get(raw_data_id)
+    }
+    if block_of:
+        recovered.update(_recover_from_blocks(block_of))
+    return recovered
+
+def collect_fragments(field, keys):
+    """Usable fragments per stripe with two queries: all data fragments,
+    then parity only for the stripes that are missing data fragments.
+
+    field is 'original_data_id' or 'block_id'. Returns
+    ({key: [(fragment_id, data)]}, {key: (k, m)}).
+    """
+    fragments = defaultdict(list)
+    profiles = {}
+    if not keys:
+        return fragments, profiles
+    down = down_nodes()
+    columns = (field, 'fragment_id', 'fragment_data', 'checksum', 'ec_k', 'ec_m')
+    for key, fragment_id, data, checksum, k, m in DataFragment.objects.filter(
+        **{f'{field}__in': keys}, is_parity=False
+    ).exclude(storage_node__in=down).values_list(*columns):
+        profiles[key] = (k, m)
+        if fragment_is_intact(data, checksum):
+            fragments[key].append((fragment_id, data))
+
+    degraded = [
+        key for key in keys
+        if key not in profiles or len(fragments[key]) < profiles[key][0]
+    ]
+    if degraded:
+        for key, fragment_id, data, checksum, k, m in DataFragment.objects.filter(
+            **{f'{field}__in': degraded}, is_parity=True
+        ).exclude(storage_node__in=down).values_list(*columns):
+            profiles[key] = (k, m)
+            if fragment_is_intact(data, checksum):
+                fragments[key].append((fragment_id, data))
+    return fragments, profiles
+
+def _recover_from_blocks(block_of):
+    # block_of: {raw_data_id: block_id}; each block is decoded once
+    block_ids = sorted(set(block_of.values()))
+    fragments, profiles = collect_fragments('block_id', block_ids)
+    readings = {}
+    for block_id in block_ids:
+        if not fragments.get(block_id):
+            continue
+        try:
+            payload = ReedSolomonEC(*profiles[block_id]).decode(fragments[block_id])
+            readings[block_id] = dict(decode_block(payload))
+        except (ValueError, zlib.error) as e:
+            logger.exception("Recovery of reading block %s failed", block_id)
+            readings[block_id] = {'error': str(e), 'message': 'Data recovery failed'}
+
+    recovered = {}
+    for raw_data_id, block_id in block_of.items():
+        block = readings.get(block_id)
+        if block is None:
+            continue
+        if 'error' in block:
+            recovered[raw_data_id] = block
+        elif raw_data_id in block:
+            recovered[raw_data_id] = block[raw_data_id]
+    return recovered
+
+def _decode_fragments(ec, fragment_data):
     try:
         recovered_bytes = ec.decode(fragment_data)
         
@@ -115,7 +354,7 @@ def recover_data(raw_data_id):
             }
             
     except ValueError as e:
-        print(f"Recovery failed: {str(e)}")
+        logger.exception("Recovery failed")
         return {
             'error': str(e),
             'message': 'Data recovery failed'
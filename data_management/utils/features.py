@@ -0,0 +1,99 @@
+import math
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+from ..models import RawData
+
+# Columns of a feature vector; the global model is trained on these
+FEATURES = ('value', 'change', 'deviation', 'hour_sin', 'hour_cos')
+# Readings averaged for the 'deviation' feature
+ROLLING_WINDOW = 5
+# Earlier readings of each device loaded as context for a batch
+CONTEXT_READINGS = 3 * ROLLING_WINDOW
+
+
+def reading_value(data):
+    value = data.get('value') if isinstance(data, dict) else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    return float(value)
+
+
+def reading_hour(data):
+    try:
+        parsed = datetime.fromisoformat(data['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+    return parsed.hour + parsed.minute / 60
+
+
+def sequence_features(values, hours):
+    """Feature rows for one device's readings of one type, in arrival order.
+
+    Values are standardized over the sequence; 'change' is the step from
+    the previous reading and 'deviation' the distance from the mean of the
+    last ROLLING_WINDOW readings. Row i is labelled 1 when reading i + 1
+    is higher than reading i, so the last reading gets no row.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    std = values.std() or 1.0
+    scaled = (values - values.mean()) / std
+    change = np.diff(scaled, prepend=scaled[0])
+    sums = np.cumsum(np.concatenate([[0.0], scaled]))
+    counts = np.minimum(np.arange(1, len(scaled) + 1), ROLLING_WINDOW)
+    rolling = (sums[1:] - sums[np.arange(1, len(scaled) + 1) - counts]) / counts
+    angle = np.asarray(hours, dtype=np.float64) / 24 * 2 * np.pi
+    X = np.column_stack([scaled, change, scaled - rolling, np.sin(angle), np.cos(angle)])
+    y = (values[1:] > values[:-1]).astype(np.int64)
+    return X[:-1], y
+
+
+def window_features(raw_data_list):
+    """{device_id: (X, y)} training samples for a processing batch.
+
+    Each device's batch readings are preceded by its CONTEXT_READINGS
+    previous readings and split per reading type. A sample pairs a reading
+    with the next one of the same type; only pairs ending in this batch are
+    returned, so every pair is trained on once, when its second reading is
+    processed. A device's samples are in the order their second readings
+    arrived, whatever their type.
+    """
+    batch = defaultdict(list)
+    for raw_data in raw_data_list:
+        batch[raw_data.device_id].append((raw_data.id, raw_data.device_id, raw_data.data))
+
+    rows = []
+    for device_id, device_rows in batch.items():
+        batch_ids = [raw_data_id for raw_data_id, _, _ in device_rows]
+        # One query per device: an index range scan ending after at most
+        # CONTEXT_READINGS rows, however long the device's history is
+        context = RawData.objects.filter(
+            device_id=device_id, id__lt=max(batch_ids)
+        ).exclude(id__in=batch_ids).order_by('-id').values_list('id', 'device_id', 'data')[:CONTEXT_READINGS]
+        rows.extend(device_rows)
+        rows.extend(context)
+    batch_ids = {raw_data.id for raw_data in raw_data_list}
+
+    sequences = defaultdict(list)
+    for raw_data_id, device_id, data in sorted(rows):
+        value = reading_value(data)
+        if value is not None:
+            sequences[(device_id, data.get('type'))].append((raw_data_id, value, reading_hour(data)))
+
+    samples = defaultdict(lambda: ([], [], []))
+    for (device_id, _), sequence in sequences.items():
+        if len(sequence) < 2:
+            continue
+        X, y = sequence_features([value for _, value, _ in sequence], [hour for _, _, hour in sequence])
+        ends = np.array([raw_data_id for raw_data_id, _, _ in sequence[1:]])
+        in_batch = np.isin(ends, list(batch_ids))
+        if in_batch.any():
+            samples[device_id][0].append(ends[in_batch])
+            samples[device_id][1].append(X[in_batch])
+            samples[device_id][2].append(y[in_batch])
+
+    features = {}
+    for device_id, (ends, X, y) in samples.items():
+        order = np.argsort(np.concatenate(ends), kind='stable')
+        features[device_id] = (np.vstack(X)[order], np.concatenate(y)[order])
+    return features
@@ -0,0 +1,76 @@
+# Pure NumPy reductions over local model updates. This module must not import
+# Django: aggregation worker processes import it on their own.
+import numpy as np
+from .model_format import decode_update, stack_parameters
+
+METHODS = ('fedavg', 'trimmed_mean', 'median')
+PARAMETERS = ('coef_', 'intercept_')
+
+
+def stack_updates(rows):
+    """Decode [(gradients blob, num_samples), ...] into one matrix.
+
+    Returns (shapes, vectors, weights, accuracies): each update's parameters
+    flattened into a float64 row of `vectors`. Updates whose shapes differ
+    from the first one's are left out.
+    """
+    shapes, matrix, kept = stack_parameters([blob for blob, _ in rows], PARAMETERS + ('accuracy',),
+                                            decode=decode_update)
+    if shapes is None:
+        return None, np.empty((0, 0)), np.empty(0), np.empty(0)
+    weights = np.asarray([rows[index][1] for index in kept], dtype=np.float64)
+    return shapes[:-1], matrix[:, :-1], weights, matrix[:, -1]
+
+
+def partial_sum(rows):
+    """Sample-weighted sums of one chunk or shard of updates, for fedavg.
+
+    Partials of any number of chunks combine exactly with merge_partials.
+    """
+    shapes, vectors, weights, accuracies = stack_updates(rows)
+    if shapes is None:
+        return None
+    return {
+        'shapes': shapes,
+        'sum': weights @ vectors,
+        'weight': weights.sum(),
+        'accuracy': weights @ accuracies,
+        'count': len(weights),
+    }
+
+
+def merge_partials(partials):
+    total = None
+    for partial in partials:
+        if partial is None:
+            continue
+        if total is None:
+            total = dict(partial)
+        elif partial['shapes'] == total['shapes']:
+            # New arrays, never in-place on a partial's own buffers
+            total['sum'] = total['sum'] + partial['sum']
+            total['weight'] += partial['weight']
+            total['accuracy'] += partial['accuracy']
+            total['count'] += partial['count']
+    return total
+
+
+def robust_mean(vectors, method, trim_ratio=0.1):
+    """Coordinate-wise median or trimmed mean of the update matrix."""
+    if method == 'median':
+        return np.median(vectors, axis=0)
+    trim = int(len(vectors) * trim_ratio)
+    if trim == 0 or len(vectors) - 2 * trim < 1:
+        return vectors.mean(axis=0)
+    ordered = np.sort(vectors, axis=0)
+    return ordered[trim:len(vectors) - trim].mean(axis=0)
+
+
+def unflatten(vector, shapes):
+    arrays = []
+    offset = 0
+    for shape in shapes:
+        size = int(np.prod(shape))
+        arrays.append(vector[offset:offset + size].reshape(shape))
+        offset += size
+    return dict(zip(PARAMETERS, arrays))
@@ -1,94 +1,464 @@
 # data_management/utils/federated_learning.py
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 import numpy as np
 import pickle
-from sklearn.linear_model import LogisticRegression  
-from ..models import GlobalModel, LocalModelUpdate, Device
+from django.conf import settings
+from django.db import transaction
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from ..models import GlobalModel, LocalModelUpdate, SystemStatistics
+from . import statistics
+from .features import FEATURES
+from .fedavg import METHODS, merge_partials, partial_sum, robust_mean, stack_updates, unflatten
+from .model_format import decode_parameters, encode_parameters, encode_update, is_parameter_blob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FL_SETTINGS = {
+    'AGGREGATION': 'fedavg',  # 'fedavg', 'trimmed_mean' or 'median'
+    'TRIM_RATIO': 0.1,        # Fraction cut from each end per coordinate for trimmed_mean
+    'CHUNK_SIZE': 1000,       # Updates read per query during aggregation
+    'WORKERS': 0,             # More than 1 decodes per-device shards in a process pool
+    # Storage of parameters (see utils/model_format.py): 'float32', 'float16'
+    # or 'int8' (quantized), optionally 'zlib'-compressed
+    'MODEL_DTYPE': 'float32',
+    'UPDATE_DTYPE': 'float32',
+    'COMPRESSION': 'none',
+    # Readings are buffered per device and trained on as one mini-batch once
+    # BUFFER_SAMPLES have arrived or the oldest is BUFFER_SECONDS old
+    'BUFFER_SAMPLES': 256,
+    'BUFFER_SECONDS': 60.0,
+    # Send parameter deltas against the global model instead of full
+    # parameters, keeping only the largest TOP_K_FRACTION of them (None keeps all)
+    'SEND_DELTAS': True,
+    'TOP_K_FRACTION': None,
+    # Local SGD (see local_learner); the last HOLDOUT_FRACTION of each
+    # mini-batch is held out to measure accuracy
+    'LEARNING_RATE': 0.01,
+    'L2_PENALTY': 1e-4,
+    'HOLDOUT_FRACTION': 0.2,
+    'MIN_TRAIN_SAMPLES': 10,
+}
+
+# Labels of the next-reading-rises task (see utils/features.py)
+CLASSES = np.array([0, 1])
+
+# Model classes a stored global model can be rebuilt as
+MODEL_CLASSES = {cls.__name__: cls for cls in (LogisticRegression, SGDClassifier)}
+
+# How often the registry asks the database whether another process has
+# published a newer global model
+MODEL_REFRESH_SECONDS = 1.0
+
+
+class ModelRegistry:
+    """The current global model, kept deserialized in this process.
+
+    current() returns an immutable (id, version, model) snapshot. The
+    version is re-checked against SystemStatistics.model_version (one
+    primary key lookup) at most every MODEL_REFRESH_SECONDS; the model is
+    only unpickled again when the version changed. publish() swaps in a
+    model this process just created. The model is shared by every caller
+    and must not be modified; copy it first.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entry = None
+        self._checked_at = 0.0
+
+    def current(self):
+        entry = self._entry
+        if entry is not None and time.monotonic() - self._checked_at < MODEL_REFRESH_SECONDS:
+            return entry
+        with self._lock:
+            entry = self._entry
+            if entry is None or time.monotonic() - self._checked_at >= MODEL_REFRESH_SECONDS:
+                version = self._latest_version()
+                if entry is None or version != entry[1]:
+                    entry = self._load(version)
+                self._checked_at = time.monotonic()
+            return entry
+
+    def publish(self, global_model, model):
+        with self._lock:
+            if self._entry is None or global_model.version > self._entry[1]:
+                self._entry = (global_model.pk, global_model.version, model)
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
+
+    @staticmethod
+    def _latest_version():
+        version = SystemStatistics.objects.filter(pk=1).values_list('model_version', flat=True).first()
+        if version is None:
+            version = GlobalModel.objects.order_by('-version').values_list('version', flat=True).first()
+        return version
+
+    def _load(self, version):
+        record = None
+        if version is not None:
+            record = GlobalModel.objects.filter(version=version).order_by('-pk').first()
+        if record is None:
+            record = GlobalModel.objects.order_by('-version').first() or init_global_model()
+        self._entry = (record.pk, record.version, decode_model(record.model_data))
+        return self._entry
+
+
+model_registry = ModelRegistry()
+
+
+def fl_settings():
+    return {**DEFAULT_FL_SETTINGS, **getattr(settings, 'FEDERATED_LEARNING', {})}
+
+
+def encode_model(model):
+    # Only the fitted parameters are stored; the estimator is rebuilt on load
+    config = fl_settings()
+    return encode_parameters(
+        {'coef_': model.coef_, 'intercept_': model.intercept_},
+        {'class': type(model).__name__, 'classes': model.classes_.tolist()},
+        dtype=config['MODEL_DTYPE'], compression=config['COMPRESSION'],
+    )
+
+
+def decode_model(blob):
+    blob = bytes(blob)
+    if not is_parameter_blob(blob):
+        # Stored before the parameter format
+        return pickle.loads(blob)
+    arrays, extras = decode_parameters(blob)
+    model = MODEL_CLASSES[extras['class']]()
+    model.coef_ = np.array(arrays['coef_'], dtype=np.float64)
+    model.intercept_ = np.array(arrays['intercept_'], dtype=np.float64)
+    model.classes_ = np.array(extras['classes'])
+    model.n_features_in_ = model.coef_.shape[1]
+    return model
+
+
+def iter_update_chunks(updates, chunk_size):
+    # [(device_id, gradients, num_samples), ...] in primary key order
+    last_id = 0
+    while True:
+        chunk = list(updates.filter(pk__gt=last_id).order_by('pk').values_list(
+            'id', 'device_id', 'gradients', 'num_samples'
+        )[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1][0]
+        yield [(device_id, bytes(gradients), num_samples) for _, device_id, gradients, num_samples in chunk]
+
+
+def aggregate_local_updates(updates, method=None, trim_ratio=None, chunk_size=None, workers=None):
+    """Combine a queryset of LocalModelUpdates into new model parameters.
+
+    'fedavg' averages the updates weighted by num_samples. Updates are read
+    chunk_size at a time and each chunk is reduced to a weighted sum with
+    one matrix product, so memory stays bounded by the chunk.
+    'trimmed_mean' and 'median' are computed per coordinate over all
+    updates, which keeps one float64 row per update in memory. With workers
+    above 1 each chunk is split into per-device shards that are decoded and
+    reduced in a process pool, then merged here.
+
+    Returns ({'coef_': ..., 'intercept_': ...}, accuracy, total weight) or
+    None when there are no updates.
+    """
+    config = fl_settings()
+    method = method or config['AGGREGATION']
+    if method not in METHODS:
+        raise ValueError(f"Unknown aggregation method {method!r}")
+    trim_ratio = config['TRIM_RATIO'] if trim_ratio is None else trim_ratio
+    chunk_size = chunk_size or config['CHUNK_SIZE']
+    workers = config['WORKERS'] if workers is None else workers
+    reduce_shard = partial_sum if method == 'fedavg' else stack_updates
+
+    total = None
+    stacks = []
+
+    def collect(result):
+        nonlocal total
+        if method == 'fedavg':
+            total = merge_partials([total, result])
+        elif result[0] is not None:
+            stacks.append(result)
+
+    executor = None
+    if workers > 1:
+        # Spawned, not forked: the web process runs threads
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'))
+    try:
+        pending = deque()
+        for chunk in iter_update_chunks(updates, chunk_size):
+            if executor is None:
+                collect(reduce_shard([(gradients, n) for _, gradients, n in chunk]))
+                continue
+            shards = [[] for _ in range(workers)]
+            for device_id, gradients, n in chunk:
+                shards[device_id % workers].append((gradients, n))
+            for shard in shards:
+                if shard:
+                    pending.append(executor.submit(reduce_shard, shard))
+            while len(pending) > 2 * workers:
+                collect(pending.popleft().result())
+        while pending:
+            collect(pending.popleft().result())
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if method == 'fedavg':
+        if total is None or not total['weight']:
+            return None
+        return (unflatten(total['sum'] / total['weight'], total['shapes']),
+                total['accuracy'] / total['weight'], total['weight'])
+
+    if not stacks:
+        return None
+    shapes = stacks[0][0]
+    stacks = [stack for stack in stacks if stack[0] == shapes]
+    vectors = np.concatenate([stack[1] for stack in stacks])
+    accuracies = np.concatenate([stack[3] for stack in stacks])
+    return (
+        unflatten(robust_mean(vectors, method, trim_ratio), shapes),
+        float(robust_mean(accuracies[:, None], method, trim_ratio)[0]),
+        float(sum(stack[2].sum() for stack in stacks)),
+    )
+
+
+class LocalUpdateBuffer:
+    """Per-device training samples waiting to become one local update.
+
+    Devices send readings far more often than a model update is worth
+    writing, so samples are accumulated here (per process) and a device
+    is trained on once its buffer is full or old enough. The counters
+    report how many samples each written update stands for.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffers = {}
+        self._metrics = {'samples': 0, 'updates': 0, 'skipped': 0}
+
+    def add(self, device_id, X, y):
+        with self._lock:
+            buffer = self._buffers.setdefault(device_id, {'X': [], 'y': [], 'count': 0,
+                                                          'since': time.monotonic()})
+            buffer['X'].append(X)
+            buffer['y'].append(y)
+            buffer['count'] += len(y)
+            self._metrics['samples'] += len(y)
+
+    def take_due(self, force=False):
+        # [(device_id, X, y)] for buffers that are full or old enough
+        config = fl_settings()
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                device_id for device_id, buffer in self._buffers.items()
+                if force or buffer['count'] >= config['BUFFER_SAMPLES']
+                or now - buffer['since'] >= config['BUFFER_SECONDS']
+            ]
+            taken = [self._buffers.pop(device_id) for device_id in due]
+        return [(device_id, np.vstack(buffer['X']), np.concatenate(buffer['y']))
+                for device_id, buffer in zip(due, taken)]
+
+    def flush(self, force=False):
+        """Train and store one update per due device; returns updates written.
+
+        Call it outside any transaction: the samples have already left the
+        buffer, so an update rolled back by the caller would be lost. Each
+        device's update commits on its own and a failing device does not
+        cost the others theirs.
+        """
+        due = self.take_due(force)
+        if not due:
+            return 0
+        fl = SimpleFederatedLearning()
+        written = 0
+        for device_id, X, y in due:
+            try:
+                with transaction.atomic():
+                    if fl.train_local_model(device_id, X, y) is not None:
+                        written += 1
+            except Exception:
+                logger.exception("Failed to train a local model update for device %s", device_id)
+        with self._lock:
+            self._metrics['updates'] += written
+            self._metrics['skipped'] += len(due) - written
+        return written
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['buffered'] = sum(buffer['count'] for buffer in self._buffers.values())
+        metrics['samples_per_update'] = (
+            round(metrics['samples'] / metrics['updates'], 1) if metrics['updates'] else None
+        )
+        return metrics
+
+
+local_update_buffer = LocalUpdateBuffer()
+
+
+def parameter_delta(local_model, global_model, top_k_fraction=None):
+    """local - global parameters, or None when their shapes differ.
+
+    With top_k_fraction only that share of the entries with the largest
+    magnitude is kept (over coef_ and intercept_ together); the rest are
+    zeroed.
+    """
+    if (local_model.coef_.shape != global_model.coef_.shape
+            or local_model.intercept_.shape != global_model.intercept_.shape):
+        return None
+    coef = local_model.coef_ - global_model.coef_
+    intercept = local_model.intercept_ - global_model.intercept_
+    if top_k_fraction:
+        flat = np.concatenate([coef.ravel(), intercept.ravel()])
+        keep = max(1, int(np.ceil(flat.size * top_k_fraction)))
+        if keep < flat.size:
+            threshold = np.partition(np.abs(flat), flat.size - keep)[flat.size - keep]
+            coef = np.where(np.abs(coef) >= threshold, coef, 0.0)
+            intercept = np.where(np.abs(intercept) >= threshold, intercept, 0.0)
+    return coef, intercept
+
+
+def local_learner(global_model=None):
+    """SGDClassifier starting from the global model's parameters, ready
+    for partial_fit. Starts from zeros when there is no usable global model
+    (none yet, or one trained on a different feature layout).
+    """
+    config = fl_settings()
+    learner = SGDClassifier(loss='log_loss', learning_rate='constant', eta0=config['LEARNING_RATE'],
+                            alpha=config['L2_PENALTY'])
+    coef = getattr(global_model, 'coef_', None)
+    if (coef is not None and coef.shape == (1, len(FEATURES))
+            and np.array_equal(getattr(global_model, 'classes_', None), CLASSES)):
+        learner.coef_ = np.array(coef, dtype=np.float64)
+        learner.intercept_ = np.array(global_model.intercept_, dtype=np.float64)
+    else:
+        learner.coef_ = np.zeros((1, len(FEATURES)))
+        learner.intercept_ = np.zeros(1)
+    learner.classes_ = CLASSES
+    learner.n_features_in_ = len(FEATURES)
+    return learner
+
+
+def init_global_model():
+    # Untrained: every device's first update starts from zero weights
+    model = local_learner()
+    
+    global_model = GlobalModel.objects.create(
+        version=1,
+        model_data=encode_model(model)
+    )
+    statistics.record_global_model(global_model)
+    transaction.on_commit(lambda: model_registry.publish(global_model, model))
+    return global_model
+
 
 class SimpleFederatedLearning:
     def __init__(self):
-        if not GlobalModel.objects.exists():
-            self.init_global_model()
-            
+        # Creates the first global model if there is none yet
+        model_registry.current()
+
     def init_global_model(self):
-        # Using LogisticRegression instead of SGDClassifier for better stability
-        model = LogisticRegression()
-        X = np.random.rand(10, 5)
-        y = np.random.randint(0, 2, 10)
-        model.fit(X, y)
-        
-        global_model = GlobalModel.objects.create(
-            version=1,
-            model_data=pickle.dumps(model)
-        )
-        return global_model
+        return init_global_model()
         
     def get_global_model(self):
-        latest_model = GlobalModel.objects.latest('version')
-        return pickle.loads(latest_model.model_data)
+        # Shared, read-only instance; see ModelRegistry
+        return model_registry.current()[2]
         
     def train_local_model(self, device_id, X, y):
-        device = Device.objects.get(pk=device_id)
-        global_model = self.get_global_model()
+        """Train the global model further on one device mini-batch and store
+        the result as a LocalModelUpdate (a delta when SEND_DELTAS is on).
+
+        X and y come from utils/features.py in arrival order. The last
+        HOLDOUT_FRACTION of the samples is held out and the accuracy stored
+        with the update is measured on it. Returns None without storing
+        anything for batches under MIN_TRAIN_SAMPLES.
+        """
+        config = fl_settings()
+        if len(y) < config['MIN_TRAIN_SAMPLES']:
+            return None
+        global_model_id, _, global_model = model_registry.current()
+        holdout = max(1, int(len(y) * config['HOLDOUT_FRACTION']))
         
-        # Combine existing and new data
-        if hasattr(global_model, 'coef_'):
-            coef = np.vstack([global_model.coef_, np.random.rand(1, X.shape[1])])
-            intercept = np.append(global_model.intercept_, np.random.rand(1))
-        else:
-            global_model.fit(X, y)
-            coef = global_model.coef_
-            intercept = global_model.intercept_
+        # One pass of SGD over the mini-batch, from the global parameters
+        local_model = local_learner(global_model)
+        local_model.partial_fit(X[:-holdout], y[:-holdout], classes=CLASSES)
+        accuracy = local_model.score(X[-holdout:], y[-holdout:])
+        
+        delta = parameter_delta(local_model, global_model, config['TOP_K_FRACTION']) \
+            if config['SEND_DELTAS'] else None
+        coef, intercept = delta if delta is not None else (local_model.coef_, local_model.intercept_)
         
         # Store local update
         gradients = {
             'coef_': coef,
             'intercept_': intercept,
-            'accuracy': np.random.uniform(0.7, 0.95)
+            'accuracy': accuracy,
+            'is_delta': delta is not None,
         }
         
+        # Sparsified deltas are mostly zeros, which compress well
+        compression = 'zlib' if delta is not None and config['TOP_K_FRACTION'] else config['COMPRESSION']
         LocalModelUpdate.objects.create(
-            device=device,
-            global_model=GlobalModel.objects.latest('version'),
-            gradients=pickle.dumps(gradients)
+            device_id=device_id,
+            global_model_id=global_model_id,
+            gradients=encode_update(coef, intercept, accuracy,
+                                    dtype=config['UPDATE_DTYPE'], compression=compression),
+            num_samples=len(y) - holdout,
+            is_delta=gradients['is_delta']
         )
+        statistics.increment(model_updates=1)
         
         return gradients
         
     def aggregate_updates(self):
         latest_model = GlobalModel.objects.latest('version')
         updates = LocalModelUpdate.objects.filter(global_model=latest_model)
+        # The exact parameters the deltas were taken against
+        global_model = decode_model(latest_model.model_data)
+        
+        results = []
+        deltas = aggregate_local_updates(updates.filter(is_delta=True))
+        if deltas is not None:
+            delta, accuracy, weight = deltas
+            results.append(({
+                'coef_': global_model.coef_ + delta['coef_'],
+                'intercept_': global_model.intercept_ + delta['intercept_'],
+            }, accuracy, weight))
+        full = aggregate_local_updates(updates.filter(is_delta=False))
+        if full is not None and (not results or full[0]['coef_'].shape == global_model.coef_.shape):
+            results.append(full)
         
-        if not updates.exists():
+        if not results:
             # Return current model with its existing accuracy
             return latest_model, latest_model.accuracy or 0.0
         
-        # Calculate averages as before
-        avg_coef = None
-        avg_intercept = None
-        avg_accuracy = 0
-        
-        for update in updates:
-            gradients = pickle.loads(update.gradients)
-            if avg_coef is None:
-                avg_coef = gradients['coef_']
-                avg_intercept = gradients['intercept_']
-            else:
-                avg_coef += gradients['coef_']
-                avg_intercept += gradients['intercept_']
-            avg_accuracy += gradients.get('accuracy', 0)
-                
-        avg_coef /= len(updates)
-        avg_intercept /= len(updates)
-        avg_accuracy = round((avg_accuracy / len(updates)) * 100, 1)
+        # Delta and full updates combine in proportion to their weights
+        total_weight = sum(weight for _, _, weight in results)
+        parameters = {
+            name: sum(result[name] * weight for result, _, weight in results) / total_weight
+            for name in ('coef_', 'intercept_')
+        }
+        avg_accuracy = round(sum(accuracy * weight for _, accuracy, weight in results) / total_weight * 100, 1)
         
-        global_model = self.get_global_model()
-        global_model.coef_ = avg_coef
-        global_model.intercept_ = avg_intercept
+        global_model.coef_ = parameters['coef_']
+        global_model.intercept_ = parameters['intercept_']
         
         new_global_model = GlobalModel.objects.create(
             version=latest_model.version + 1,
-            model_data=pickle.dumps(global_model),
+            model_data=encode_model(global_model),
             accuracy=avg_accuracy
         )
+        statistics.record_global_model(new_global_model)
+        transaction.on_commit(lambda: model_registry.publish(new_global_model, global_model))
         
-        return new_global_model, avg_accuracy
\ No newline at end of file
+        return new_global_model, avg_accuracy
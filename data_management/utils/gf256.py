@@ -0,0 +1,99 @@
+import numpy as np
+from functools import lru_cache
+
+# Arithmetic over GF(2^8) with the 0x11d reducing polynomial (the usual
+# Reed-Solomon field). All tables are built once at import time; field
+# operations on data are then pure NumPy table lookups and XORs.
+PRIMITIVE_POLY = 0x11d
+
+
+def _build_tables():
+    exp = np.zeros(510, dtype=np.uint8)
+    log = np.zeros(256, dtype=np.int32)
+    x = 1
+    for i in range(255):
+        exp[i] = x
+        log[x] = i
+        x <<= 1
+        if x & 0x100:
+            x ^= PRIMITIVE_POLY
+    exp[255:510] = exp[0:255]
+
+    mul = np.zeros((256, 256), dtype=np.uint8)
+    mul[1:, 1:] = exp[log[1:, None] + log[None, 1:]]
+
+    inv = np.zeros(256, dtype=np.uint8)
+    inv[1:] = exp[255 - log[1:]]
+    return exp, log, mul, inv
+
+
+EXP_TABLE, LOG_TABLE, MUL_TABLE, INV_TABLE = _build_tables()
+
+
+def gf_mul(a, b):
+    return MUL_TABLE[a, b]
+
+
+def gf_matmul(matrix, data, block_size=1 << 16):
+    """Multiply a small coefficient matrix (r x k) by a data matrix (k x n).
+
+    The loop runs over the r*k coefficients only; every step is a 256-entry
+    table lookup over a block of bytes followed by an XOR. Columns are
+    processed in blocks so the working set stays in cache for large payloads.
+    """
+    matrix = np.asarray(matrix, dtype=np.uint8)
+    data = np.asarray(data, dtype=np.uint8)
+    rows, k = matrix.shape
+    out = np.zeros((rows, data.shape[1]), dtype=np.uint8)
+    for start in range(0, data.shape[1], block_size):
+        block = data[:, start:start + block_size]
+        for i in range(rows):
+            acc = out[i, start:start + block_size]
+            for j in range(k):
+                coef = matrix[i, j]
+                if coef == 0:
+                    continue
+                if coef == 1:
+                    np.bitwise_xor(acc, block[j], out=acc)
+                else:
+                    np.bitwise_xor(acc, MUL_TABLE[coef].take(block[j]), out=acc)
+    return out
+
+
+def gf_inverse(matrix):
+    # Gauss-Jordan elimination; row operations are vectorized table lookups
+    matrix = np.asarray(matrix, dtype=np.uint8)
+    n = matrix.shape[0]
+    aug = np.concatenate([matrix, np.eye(n, dtype=np.uint8)], axis=1)
+
+    for col in range(n):
+        pivots = np.nonzero(aug[col:, col])[0]
+        if not len(pivots):
+            raise ValueError("Matrix is singular over GF(256)")
+        pivot = col + pivots[0]
+        if pivot != col:
+            aug[[col, pivot]] = aug[[pivot, col]]
+
+        aug[col] = MUL_TABLE[INV_TABLE[aug[col, col]]].take(aug[col])
+        factors = aug[:, col].copy()
+        factors[col] = 0
+        aug ^= MUL_TABLE[factors[:, None], aug[col][None, :]]
+
+    return aug[:, n:]
+
+
+@lru_cache(maxsize=64)
+def encoding_matrix(k, m):
+    """Systematic (k + m) x k encoding matrix: identity on top, Cauchy below.
+
+    Every k x k submatrix of it is invertible, so any k surviving fragments
+    are enough to decode.
+    """
+    if k + m > 256:
+        raise ValueError("k + m must not exceed 256 for GF(256)")
+    x = np.arange(k, k + m, dtype=np.uint8)
+    y = np.arange(k, dtype=np.uint8)
+    cauchy = INV_TABLE[x[:, None] ^ y[None, :]]
+    matrix = np.concatenate([np.eye(k, dtype=np.uint8), cauchy])
+    matrix.setflags(write=False)
+    return matrix
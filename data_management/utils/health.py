@@ -0,0 +1,65 @@
+import threading
+import time
+from django.db.models import Avg, Count, F, Max, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from ..models import CachedData, DataFragment
+from .placement import down_nodes
+from .statistics import get_statistics
+
+# The report aggregates over every fragment, so it is rebuilt at most this often
+REPORT_TTL_SECONDS = 30
+
+_report_lock = threading.Lock()
+_report_cache = {'built_at': 0.0, 'report': None}
+
+
+def redundancy_breakdown():
+    """Classify erasure-coded records by surviving fragments in one query.
+
+    full: all k + m fragments present; degraded: fewer, but at least k so
+    still recoverable; unrecoverable: fewer than k. Fragments on nodes
+    marked down do not count, and a reading block counts once per reading.
+    """
+    per_stripe = DataFragment.objects.exclude(storage_node__in=down_nodes()).values(
+        'original_data_id', 'block_id'
+    ).annotate(
+        present=Count('id'), k=Max('ec_k'), m=Max('ec_m'),
+        readings=Coalesce(Max('block__reading_count'), 1)
+    )
+    breakdown = per_stripe.aggregate(
+        full=Sum('readings', filter=Q(present__gte=F('k') + F('m'))),
+        degraded=Sum('readings', filter=Q(present__gte=F('k'), present__lt=F('k') + F('m'))),
+        unrecoverable=Sum('readings', filter=Q(present__lt=F('k'))),
+    )
+    return {level: count or 0 for level, count in breakdown.items()}
+
+
+def build_health_report():
+    breakdown = redundancy_breakdown()
+    total_data = get_statistics().raw_data_count
+    encoded = breakdown['full'] + breakdown['degraded'] + breakdown['unrecoverable']
+    recoverable = breakdown['full'] + breakdown['degraded']
+    return {
+        'fragment_distribution': list(DataFragment.objects.values('storage_node').annotate(
+            total=Count('id'),
+            parity=Count('id', filter=Q(is_parity=True))
+        ).order_by('storage_node')),
+        'cache_performance': list(CachedData.objects.values('cache_level').annotate(
+            count=Count('id'),
+            avg_access=Avg('access_count')
+        ).order_by('cache_level')),
+        # Readings not erasure-coded yet count against confidence, as before
+        'recovery_confidence': round(recoverable / total_data * 100, 1) if total_data else 0,
+        'redundancy': {**breakdown, 'not_encoded': max(total_data - encoded, 0)},
+        'down_nodes': sorted(down_nodes()),
+        'generated_at': timezone.now().isoformat(),
+    }
+
+
+def health_report(max_age=REPORT_TTL_SECONDS):
+    with _report_lock:
+        if _report_cache['report'] is None or time.monotonic() - _report_cache['built_at'] > max_age:
+            _report_cache['report'] = build_health_report()
+            _report_cache['built_at'] = time.monotonic()
+        return _report_cache['report']
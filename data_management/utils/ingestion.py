@@ -0,0 +1,154 @@
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from ..models import Device, RawData
+from .caching import HierarchicalCache
+from .erasure_coding import store_records_with_ec
+from .features import window_features
+from .federated_learning import local_update_buffer
+from .rollups import update_rollups
+from . import statistics
+
+# Rows per INSERT/UPDATE statement; keeps us under SQLite's variable limit
+BULK_BATCH_SIZE = 500
+
+DEFAULT_UNITS = {
+    'temperature': '°C',
+    'humidity': '%',
+    'pressure': 'hPa',
+}
+
+
+class LeaseLostError(Exception):
+    # A queued reading was claimed by another worker before this one finished
+    pass
+
+
+def parse_readings(body, content_type=''):
+    """Parse a JSON array, a {"readings": [...]} object or an NDJSON stream."""
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+
+    if 'ndjson' in content_type or 'jsonlines' in content_type:
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get('readings', [payload])
+    if not isinstance(payload, list):
+        raise ValueError('Expected a list of readings')
+    return payload
+
+
+def normalize_reading(reading):
+    # Accept either {"device_id", "data": {...}} or a flat reading
+    if not isinstance(reading, dict):
+        raise ValueError('Each reading must be an object')
+
+    device_id = reading.get('device_id')
+    if device_id in (None, ''):
+        raise ValueError('device_id is required for every reading')
+
+    data = reading.get('data')
+    if data is None:
+        if 'value' not in reading:
+            raise ValueError('Each reading needs either data or value')
+        data_type = reading.get('type', 'random')
+        data = {
+            'type': data_type,
+            'value': reading['value'],
+            'timestamp': reading.get('timestamp') or datetime.now().isoformat(),
+            'unit': reading.get('unit') or DEFAULT_UNITS.get(data_type, 'unit'),
+        }
+
+    return int(device_id), data
+
+
+def ingest_readings(readings):
+    """Store readings for any number of devices and process them in batches.
+
+    Everything happens inside one transaction: one bulk INSERT per
+    BULK_BATCH_SIZE readings, then caching, erasure coding and federated
+    learning over the whole batch.
+    """
+    with transaction.atomic():
+        raw_data_list = store_readings(readings)
+        process_batch(raw_data_list)
+    # Local updates are only trained on committed readings
+    transaction.on_commit(local_update_buffer.flush)
+
+    return raw_data_list
+
+
+def store_readings(readings):
+    # Validate and bulk insert readings as unprocessed RawData rows
+    normalized = [normalize_reading(r) for r in readings]
+    if not normalized:
+        return []
+
+    device_ids = {device_id for device_id, _ in normalized}
+    devices = Device.objects.in_bulk(device_ids)
+    missing = device_ids - set(devices)
+    if missing:
+        raise Device.DoesNotExist(f"Unknown device ids: {sorted(missing)}")
+
+    with transaction.atomic():
+        raw_data_list = RawData.objects.bulk_create(
+            [RawData(device_id=device_id, data=data) for device_id, data in normalized],
+            batch_size=BULK_BATCH_SIZE
+        )
+        touch_devices(device_ids)
+        statistics.increment(raw_data_count=len(raw_data_list))
+
+    return raw_data_list
+
+
+def touch_devices(device_ids):
+    # Same rule as Device.save(): only refresh last_active once per hour
+    now = timezone.now()
+    Device.objects.filter(pk__in=device_ids).filter(
+        Q(last_active__isnull=True) | Q(last_active__lt=now - timedelta(hours=1))
+    ).update(last_active=now)
+
+
+def process_batch(raw_data_list):
+    raw_data_list = list(raw_data_list)
+    if not raw_data_list:
+        return
+
+    # 1. Caching, once the batch has committed: the cache tiers are separate
+    # databases and would keep the values of a batch that rolled back
+    values = {raw_data.id: raw_data.data for raw_data in raw_data_list}
+    transaction.on_commit(lambda: HierarchicalCache().cache_many(values), robust=True)
+
+    # 2. Erasure Coding
+    store_records_with_ec(raw_data_list)
+
+    # 3. Time-series rollups
+    update_rollups(raw_data_list)
+
+    # 4. Federated Learning: each device's readings become training samples,
+    # buffered until there are enough for a local update (see LocalUpdateBuffer).
+    # The buffer is process memory, so samples are only added once the batch
+    # has committed; a rolled back batch is retried and must not train twice.
+    # Buffers are flushed by the caller after commit.
+    for device_id, (X, y) in window_features(raw_data_list).items():
+        transaction.on_commit(lambda device_id=device_id, X=X, y=y: local_update_buffer.add(device_id, X, y))
+
+    # Mark as processed, but only rows still holding the claim they were read
+    # with. If this worker's lease ran out and another worker claimed a row,
+    # that worker owns it and this batch must roll back.
+    by_claim = defaultdict(list)
+    for raw_data in raw_data_list:
+        by_claim[raw_data.claim_token].append(raw_data.id)
+    for claim_token, ids in by_claim.items():
+        for start in range(0, len(ids), BULK_BATCH_SIZE):
+            chunk = ids[start:start + BULK_BATCH_SIZE]
+            marked = RawData.objects.filter(pk__in=chunk, claim_token=claim_token).update(is_processed=True)
+            if marked != len(chunk):
+                raise LeaseLostError(f"{len(chunk) - marked} readings were claimed by another worker")
+    for raw_data in raw_data_list:
+        raw_data.is_processed = True
@@ -0,0 +1,180 @@
+# Compact binary format for model parameters and local updates. Like
+# fedavg.py this module only needs NumPy, so aggregation workers can use it.
+import json
+import pickle
+import struct
+import zlib
+import numpy as np
+
+MAGIC = b'MPF1'
+# magic, dtype, codec, array count, extras length
+HEADER = struct.Struct('<4sBBBH')
+# Per array: name length and name, dimension count and dimensions, and for
+# int8 the minimum and step it was quantized with
+NAME_LENGTH = struct.Struct('<B')
+DIMENSIONS = struct.Struct('<B')
+QUANTIZATION = struct.Struct('<ff')
+DTYPES = (np.dtype('<f4'), np.dtype('<f2'), np.dtype('i1'))
+DTYPE_CODES = {'float32': 0, 'float16': 1, 'int8': 2}
+CODECS = {'none': 0, 'zlib': 1}
+
+
+def is_parameter_blob(blob):
+    return bytes(blob[:len(MAGIC)]) == MAGIC
+
+
+def encode_parameters(arrays, extras=None, dtype='float32', compression='none'):
+    """Pack {name: ndarray} into a header, array descriptors and raw bytes.
+
+    dtype 'int8' quantizes each array linearly between its own minimum and
+    maximum. extras is a small JSON-serializable dict stored alongside,
+    e.g. {'accuracy': 0.9}.
+    """
+    code = DTYPE_CODES[dtype]
+    descriptors = []
+    chunks = []
+    for name, array in arrays.items():
+        array = np.asarray(array, dtype=np.float64)
+        encoded_name = name.encode()
+        descriptor = (NAME_LENGTH.pack(len(encoded_name)) + encoded_name
+                      + DIMENSIONS.pack(array.ndim) + struct.pack(f'<{array.ndim}I', *array.shape))
+        if dtype == 'int8':
+            low = float(array.min()) if array.size else 0.0
+            step = (float(array.max()) - low) / 255 if array.size else 0.0
+            descriptor += QUANTIZATION.pack(low, step)
+            array = np.round((array - low) / step) - 128 if step else np.full(array.shape, -128)
+        descriptors.append(descriptor)
+        chunks.append(array.astype(DTYPES[code]).tobytes())
+
+    encoded_extras = json.dumps(extras, separators=(',', ':')).encode() if extras else b''
+    body = b''.join(chunks)
+    if compression == 'zlib':
+        body = zlib.compress(body, 6)
+    return (HEADER.pack(MAGIC, code, CODECS[compression], len(arrays), len(encoded_extras))
+            + b''.join(descriptors) + encoded_extras + body)
+
+
+def _parse(blob):
+    # (dtype code, codec, [(name, shape, quantization)], extras, body offset)
+    magic, code, codec, count, extras_length = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not a parameter blob")
+    offset = HEADER.size
+    layout = []
+    for _ in range(count):
+        (name_length,) = NAME_LENGTH.unpack_from(blob, offset)
+        offset += NAME_LENGTH.size
+        name = bytes(blob[offset:offset + name_length]).decode()
+        offset += name_length
+        (ndim,) = DIMENSIONS.unpack_from(blob, offset)
+        offset += DIMENSIONS.size
+        shape = struct.unpack_from(f'<{ndim}I', blob, offset)
+        offset += 4 * ndim
+        quantization = None
+        if code == DTYPE_CODES['int8']:
+            quantization = QUANTIZATION.unpack_from(blob, offset)
+            offset += QUANTIZATION.size
+        layout.append((name, shape, quantization))
+    extras = json.loads(bytes(blob[offset:offset + extras_length])) if extras_length else {}
+    return code, codec, layout, extras, offset + extras_length
+
+
+def decode_parameters(blob):
+    """Unpack a parameter blob into ({name: ndarray}, extras).
+
+    Uncompressed float32/float16 arrays are read-only views on the blob
+    (np.frombuffer, no copy); int8 arrays are dequantized to float32.
+    """
+    code, codec, layout, extras, offset = _parse(blob)
+    body = blob
+    if codec == CODECS['zlib']:
+        body, offset = zlib.decompress(bytes(blob[offset:])), 0
+    stored = DTYPES[code]
+    arrays = {}
+    for name, shape, quantization in layout:
+        size = int(np.prod(shape))
+        array = np.frombuffer(body, dtype=stored, count=size, offset=offset).reshape(shape)
+        offset += size * stored.itemsize
+        if quantization:
+            low, step = quantization
+            array = ((array.astype(np.float32) + 128) * np.float32(step) + np.float32(low))
+        arrays[name] = array
+    return arrays, extras
+
+
+def stack_parameters(blobs, names, decode=None):
+    """Decode many blobs into one float64 matrix, a row per blob holding the
+    named arrays flattened in order.
+
+    Blobs sharing the first blob's header and descriptors byte for byte
+    (same shapes, uncompressed, not quantized) are read with a single
+    np.frombuffer over their joined bodies; the rest are decoded one by one
+    with decode(blob) -> {name: array}. Returns (shapes, matrix, kept):
+    blobs whose shapes differ from the first one's are left out and kept
+    lists the indexes of the rows that were used.
+    """
+    decode = decode or (lambda blob: decode_parameters(blob)[0])
+    if not blobs:
+        return None, np.empty((0, 0)), []
+
+    prefix = None
+    first = blobs[0]
+    if is_parameter_blob(first):
+        code, codec, layout, extras, offset = _parse(first)
+        if codec == CODECS['none'] and code != DTYPE_CODES['int8'] and not extras:
+            prefix = bytes(first[:offset])
+            stored = DTYPES[code]
+            positions = {}
+            column = 0
+            for name, shape, _ in layout:
+                size = int(np.prod(shape))
+                positions[name] = (column, size, shape)
+                column += size
+            if not set(names) <= set(positions):
+                prefix = None
+
+    fast, fast_bodies, slow = [], [], []
+    for index, blob in enumerate(blobs):
+        if prefix is not None and len(blob) == len(first) and blob[:len(prefix)] == prefix:
+            fast.append(index)
+            fast_bodies.append(blob[len(prefix):])
+        else:
+            slow.append(index)
+
+    shapes = None
+    rows = {}
+    if fast:
+        raw = np.frombuffer(b''.join(fast_bodies), dtype=stored).reshape(len(fast), -1)
+        columns = np.concatenate([np.arange(positions[name][0], positions[name][0] + positions[name][1])
+                                  for name in names])
+        shapes = tuple(positions[name][2] for name in names)
+        matrix = raw[:, columns].astype(np.float64)
+        rows.update(zip(fast, matrix))
+    for index in slow:
+        arrays = decode(blobs[index])
+        arrays = [np.asarray(arrays[name], dtype=np.float64) for name in names]
+        blob_shapes = tuple(array.shape for array in arrays)
+        if shapes is None:
+            shapes = blob_shapes
+        elif blob_shapes != shapes:
+            continue
+        rows[index] = np.concatenate([array.ravel() for array in arrays])
+
+    kept = sorted(rows)
+    return shapes, np.stack([rows[index] for index in kept]), kept
+
+
+def encode_update(coef, intercept, accuracy, dtype='float32', compression='none'):
+    # accuracy is stored as a 0-d array so that updates of the same shape
+    # have identical headers (see stack_parameters)
+    return encode_parameters({'coef_': coef, 'intercept_': intercept, 'accuracy': accuracy},
+                             dtype=dtype, compression=compression)
+
+
+def decode_update(blob):
+    # {'coef_': array, 'intercept_': array, 'accuracy': float}; rows written
+    # before this format hold a pickled dict
+    if not is_parameter_blob(blob):
+        return pickle.loads(blob)
+    arrays, _ = decode_parameters(blob)
+    return {**arrays, 'accuracy': float(arrays['accuracy'])}
@@ -0,0 +1,133 @@
+import itertools
+import threading
+import time
+from collections import Counter, namedtuple
+from django.conf import settings
+from django.db.models import Count
+from ..models import DataFragment, StorageNodeStatus
+
+StorageNode = namedtuple('StorageNode', ['name', 'zone', 'rack'])
+
+DEFAULT_PROFILES = {
+    '4+2': (4, 2),
+    '8+3': (8, 3),
+    '10+4': (10, 4),
+}
+
+DEFAULT_STORAGE_NODES = [
+    {'name': f'edge_node_{i}', 'zone': f'zone-{"abc"[i % 3]}', 'rack': f'rack-{i // 3}'}
+    for i in range(6)
+]
+
+# Fragment counts per node are a full-table aggregate, so they are refreshed
+# at most every LOAD_REFRESH_SECONDS and tracked locally in between
+LOAD_REFRESH_SECONDS = 60
+
+_load_lock = threading.Lock()
+_load_cache = {'loaded_at': 0.0, 'loads': Counter()}
+
+# Node up/down status is read on every recovery, so it is cached briefly too
+NODE_STATUS_REFRESH_SECONDS = 5
+
+_status_lock = threading.Lock()
+_status_cache = {'loaded_at': 0.0, 'down': frozenset()}
+
+
+def ec_settings():
+    return getattr(settings, 'ERASURE_CODING', {})
+
+
+def get_profiles():
+    return ec_settings().get('PROFILES', DEFAULT_PROFILES)
+
+
+def get_profile(name=None):
+    # Returns (k, m) for a named profile, the default one when name is None
+    name = name or ec_settings().get('DEFAULT_PROFILE', '4+2')
+    profiles = get_profiles()
+    if name not in profiles:
+        raise ValueError(f"Unknown erasure coding profile '{name}'")
+    return tuple(profiles[name])
+
+
+def profile_for_device_type(device_type):
+    return get_profile(ec_settings().get('DEVICE_TYPE_PROFILES', {}).get(device_type))
+
+
+def configured_nodes():
+    nodes = ec_settings().get('STORAGE_NODES', DEFAULT_STORAGE_NODES)
+    return [StorageNode(n['name'], n.get('zone', 'default'), n.get('rack', n['name'])) for n in nodes]
+
+
+def down_nodes():
+    with _status_lock:
+        if time.monotonic() - _status_cache['loaded_at'] > NODE_STATUS_REFRESH_SECONDS:
+            _status_cache['down'] = frozenset(
+                StorageNodeStatus.objects.filter(is_down=True).values_list('name', flat=True)
+            )
+            _status_cache['loaded_at'] = time.monotonic()
+        return _status_cache['down']
+
+
+def set_node_down(name, down=True):
+    StorageNodeStatus.objects.update_or_create(name=name, defaults={'is_down': down})
+    with _status_lock:
+        _status_cache['loaded_at'] = 0.0
+
+
+def healthy_nodes():
+    down = down_nodes()
+    return [node for node in configured_nodes() if node.name not in down]
+
+
+def current_loads():
+    with _load_lock:
+        if time.monotonic() - _load_cache['loaded_at'] > LOAD_REFRESH_SECONDS:
+            _load_cache['loads'] = Counter(dict(
+                DataFragment.objects.values_list('storage_node').annotate(n=Count('id'))
+            ))
+            _load_cache['loaded_at'] = time.monotonic()
+        return _load_cache['loads']
+
+
+class PlacementEngine:
+    """Chooses storage nodes for the fragments of a stripe.
+
+    Fragments of one record go to distinct nodes whenever there are enough of
+    them, are spread as evenly as possible across zones and then racks (so
+    losing a zone costs as few fragments as possible), and ties go to the
+    node holding the fewest fragments overall. Remaining ties rotate with each
+    stripe, so the parity fragments at the end of a stripe do not always land
+    on the same nodes.
+    """
+
+    def __init__(self, nodes=None, loads=None):
+        self.nodes = nodes if nodes is not None else healthy_nodes()
+        if not self.nodes:
+            raise ValueError("No storage nodes available for placement")
+        self.loads = loads if loads is not None else current_loads()
+        self._stripes = itertools.count()
+
+    def place(self, count, occupied=()):
+        # occupied: nodes already holding other fragments of the same stripe
+        on_node, in_zone, in_rack = Counter(), Counter(), Counter()
+        known = {node.name: node for node in configured_nodes()}
+        for name in occupied:
+            node = known.get(name, StorageNode(name, 'default', name))
+            on_node[node.name] += 1
+            in_zone[node.zone] += 1
+            in_rack[(node.zone, node.rack)] += 1
+        start = next(self._stripes) % len(self.nodes)
+        rotation = {node.name: (i - start) % len(self.nodes) for i, node in enumerate(self.nodes)}
+        chosen = []
+        for _ in range(count):
+            node = min(self.nodes, key=lambda n: (
+                on_node[n.name], in_zone[n.zone], in_rack[(n.zone, n.rack)], self.loads[n.name], rotation[n.name]
+            ))
+            on_node[node.name] += 1
+            in_zone[node.zone] += 1
+            in_rack[(node.zone, node.rack)] += 1
+            with _load_lock:
+                self.loads[node.name] += 1
+            chosen.append(node.name)
+        return chosen
@@ -0,0 +1,278 @@
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from ..models import RawData
+from .federated_learning import local_update_buffer
+from .ingestion import LeaseLostError, ingest_readings, process_batch, store_readings
+
+logger = logging.getLogger(__name__)
+
+# RawData rows with is_processed=False are the queue. Workers claim a batch by
+# stamping a lease (locked_until + claim_token) on it, so any number of threads
+# or processes can drain the table without processing a row twice.
+DEFAULT_QUEUE_SETTINGS = {
+    'ASYNC': True,               # False processes readings inside the request
+    'IN_PROCESS_WORKERS': 1,     # Worker threads started in the web process
+    'BATCH_SIZE': 200,
+    'MAX_ATTEMPTS': 5,
+    'LEASE_SECONDS': 60,
+    'MAX_PENDING': 50000,        # Back-pressure limit for ingestion
+    'POLL_INTERVAL': 1.0,
+}
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    'processed': 0,
+    'failed': 0,
+    'batches': 0,
+    'last_batch_size': 0,
+    'last_batch_ms': 0.0,
+}
+
+_pending_lock = threading.Lock()
+_pending_estimate = {'checked_at': 0.0, 'count': 0}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def queue_settings():
+    return {**DEFAULT_QUEUE_SETTINGS, **getattr(settings, 'PROCESSING_QUEUE', {})}
+
+
+def enqueue_readings(readings):
+    """Persist readings and hand them to the background workers.
+
+    Only the INSERT happens in the caller; caching, erasure coding and
+    federated learning run in the worker pool. With ASYNC disabled this
+    falls back to synchronous ingest_readings().
+    """
+    config = queue_settings()
+    if not config['ASYNC']:
+        return ingest_readings(readings)
+
+    check_backpressure(len(readings), config)
+    raw_data_list = store_readings(readings)
+    transaction.on_commit(worker_pool.notify)
+    return raw_data_list
+
+
+def check_backpressure(incoming, config=None):
+    config = config or queue_settings()
+    # Counting the backlog on every request would cost as much as the insert,
+    # so the estimate is refreshed at most once per second. Request threads
+    # share it; the check and the increment happen under one lock so that
+    # concurrent requests cannot both fit into the last free slots.
+    with _pending_lock:
+        now = time.monotonic()
+        if now - _pending_estimate['checked_at'] > 1.0:
+            _pending_estimate['count'] = RawData.objects.filter(is_processed=False).count()
+            _pending_estimate['checked_at'] = now
+
+        if _pending_estimate['count'] + incoming > config['MAX_PENDING']:
+            raise QueueFullError(
+                f"Processing queue is full ({_pending_estimate['count']} pending readings)"
+            )
+        _pending_estimate['count'] += incoming
+
+
+def _claimable(config, now):
+    return RawData.objects.filter(
+        is_processed=False,
+        processing_attempts__lt=config['MAX_ATTEMPTS'],
+    ).filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+
+
+def claim_batch(batch_size=None, config=None):
+    config = config or queue_settings()
+    batch_size = batch_size or config['BATCH_SIZE']
+    now = timezone.now()
+
+    ids = list(_claimable(config, now).order_by('id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+
+    # Re-check the claim conditions in the UPDATE so that a concurrent worker
+    # which claimed some of the same ids wins them and we skip them
+    token = uuid.uuid4().hex
+    _claimable(config, now).filter(id__in=ids).update(
+        locked_until=now + timedelta(seconds=config['LEASE_SECONDS']),
+        claim_token=token,
+        processing_attempts=F('processing_attempts') + 1,
+    )
+    return list(RawData.objects.filter(claim_token=token, is_processed=False).order_by('id'))
+
+
+def process_next_batch(batch_size=None, config=None):
+    config = config or queue_settings()
+    rows = claim_batch(batch_size, config)
+    if not rows:
+        return 0
+
+    start = time.perf_counter()
+    failed = lost = 0
+    try:
+        with transaction.atomic():
+            process_batch(rows)
+    except Exception:
+        # Retry one by one so a single bad reading doesn't hold back the batch
+        for raw_data in rows:
+            try:
+                with transaction.atomic():
+                    process_batch([raw_data])
+            except LeaseLostError:
+                # Our lease ran out and another worker has the row now
+                lost += 1
+            except Exception as e:
+                _mark_failed(raw_data, e)
+                failed += 1
+    if lost:
+        logger.warning("Lost the lease on %d of %d readings to another worker", lost, len(rows))
+
+    _record_batch(len(rows) - lost, failed, time.perf_counter() - start)
+    return len(rows)
+
+
+def _mark_failed(raw_data, error):
+    # Exponential backoff before the row becomes claimable again, unless
+    # another worker has claimed it meanwhile
+    delay = min(2 ** raw_data.processing_attempts, 300)
+    RawData.objects.filter(pk=raw_data.pk, claim_token=raw_data.claim_token).update(
+        last_error=str(error)[:1000],
+        locked_until=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def _record_batch(size, failed, duration):
+    with _metrics_lock:
+        _metrics['processed'] += size - failed
+        _metrics['failed'] += failed
+        _metrics['batches'] += 1
+        _metrics['last_batch_size'] = size
+        _metrics['last_batch_ms'] = round(duration * 1000, 2)
+
+
+def has_pending(config=None):
+    # Unprocessed rows that will still be retried, including ones in backoff
+    config = config or queue_settings()
+    return RawData.objects.filter(
+        is_processed=False,
+        processing_attempts__lt=config['MAX_ATTEMPTS'],
+    ).exists()
+
+
+def retry_failed():
+    # Give dead-lettered readings a fresh set of attempts
+    config = queue_settings()
+    return RawData.objects.filter(
+        is_processed=False,
+        processing_attempts__gte=config['MAX_ATTEMPTS'],
+    ).update(processing_attempts=0, locked_until=None, last_error='')
+
+
+def queue_stats():
+    config = queue_settings()
+    now = timezone.now()
+    counts = RawData.objects.filter(is_processed=False).aggregate(
+        pending=Count('id'),
+        in_flight=Count('id', filter=Q(locked_until__gt=now, processing_attempts__lt=config['MAX_ATTEMPTS'])),
+        retrying=Count('id', filter=Q(processing_attempts__lt=config['MAX_ATTEMPTS']) & ~Q(last_error='')),
+        dead=Count('id', filter=Q(processing_attempts__gte=config['MAX_ATTEMPTS'])),
+    )
+    with _metrics_lock:
+        worker_metrics = dict(_metrics)
+
+    return {
+        'queue': counts,
+        'max_pending': config['MAX_PENDING'],
+        'workers': worker_pool.size,
+        'this_process': worker_metrics,
+        'local_updates': local_update_buffer.stats(),
+    }
+
+
+def flush_local_updates(force=False):
+    try:
+        local_update_buffer.flush(force=force)
+    except Exception:
+        logger.exception("Failed to write buffered local model updates")
+    finally:
+        close_old_connections()
+
+
+def run_worker(stop_event, wakeup=None, batch_size=None, poll_interval=None, once=False):
+    config = queue_settings()
+    poll_interval = poll_interval if poll_interval is not None else config['POLL_INTERVAL']
+
+    while not stop_event.is_set():
+        try:
+            processed = process_next_batch(batch_size, config)
+        except Exception:
+            # e.g. the database is unavailable; keep the worker alive and back off
+            logger.exception("Processing queue worker failed to claim a batch")
+            processed = 0
+        finally:
+            close_old_connections()
+
+        if processed:
+            # After the batch committed, so updates are never rolled back with it
+            flush_local_updates()
+            continue
+        drained = once and not has_pending(config)
+        # Buffers that timed out without new readings still become updates
+        flush_local_updates(force=drained)
+        if drained:
+            break
+        if wakeup is not None:
+            wakeup.wait(poll_interval)
+            wakeup.clear()
+        else:
+            stop_event.wait(poll_interval)
+
+
+class LocalWorkerPool:
+    # Worker threads living in the web process, started on first use so that
+    # management commands and migrations never spawn them
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    @property
+    def size(self):
+        return sum(1 for t in self._threads if t.is_alive())
+
+    def notify(self):
+        self.ensure_started()
+        self._wakeup.set()
+
+    def ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(queue_settings()['IN_PROCESS_WORKERS']):
+                thread = threading.Thread(
+                    target=run_worker,
+                    args=(self._stop, self._wakeup),
+                    name=f'rawdata-worker-{i}',
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+
+worker_pool = LocalWorkerPool()
@@ -0,0 +1,162 @@
+import time
+from collections import defaultdict
+import numpy as np
+from django.db import transaction
+from ..models import DataFragment
+from .erasure_coding import decoding_matrix, fragment_checksum, fragment_is_intact
+from .gf256 import encoding_matrix, gf_matmul
+from .placement import PlacementEngine, configured_nodes, down_nodes
+from . import statistics
+
+# Records loaded, decoded and re-encoded together
+REPAIR_BATCH_SIZE = 500
+
+
+def available_nodes(excluded):
+    return [node for node in configured_nodes() if node.name not in excluded]
+
+
+def affected_stripes(nodes, field='original_data_id'):
+    # Records (or blocks) with at least one fragment on the given nodes
+    return list(DataFragment.objects.filter(
+        storage_node__in=list(nodes), **{f'{field}__isnull': False}
+    ).values_list(field, flat=True).distinct().order_by(field))
+
+
+def repair_records(keys, down=None, placement=None):
+    return repair_stripes('original_data_id', keys, down, placement)
+
+
+def repair_blocks(block_ids, down=None, placement=None):
+    return repair_stripes('block_id', block_ids, down, placement)
+
+
+def repair_stripes(field, keys, down=None, placement=None):
+    """Rebuild the missing fragments of the given stripes on healthy nodes.
+
+    A stripe is a single record (field 'original_data_id') or a reading
+    block (field 'block_id'). A fragment is missing when its row was never
+    written, lives on a node marked down or fails its checksum. Stripes that
+    share a profile and a set of surviving rows share a decoding matrix, so
+    each such group is decoded and re-encoded with one matrix multiplication
+    over all of its stripes side by side. Lost fragments are deleted once
+    their replacement exists.
+    """
+    down = down_nodes() if down is None else set(down)
+    placement = placement or PlacementEngine(nodes=available_nodes(down))
+
+    survivors = defaultdict(dict)  # key -> {row: (data, node)}
+    lost = defaultdict(list)       # key -> [(pk, is_parity)] down or corrupt
+    profiles = {}
+    for pk, key, fragment_id, data, checksum, node, k, m in DataFragment.objects.filter(
+        **{f'{field}__in': keys}
+    ).values_list(
+        'id', field, 'fragment_id', 'fragment_data', 'checksum', 'storage_node', 'ec_k', 'ec_m'
+    ):
+        profiles[key] = (k, m)
+        row = int(fragment_id[1:]) - 1
+        if node in down or not fragment_is_intact(data, checksum):
+            lost[key].append((pk, row >= k))
+        else:
+            survivors[key][row] = (data, node)
+
+    groups = defaultdict(list)
+    unrecoverable = []
+    for key, (k, m) in profiles.items():
+        present = survivors[key]
+        if len(present) < k:
+            unrecoverable.append(key)
+        elif len(present) < k + m:
+            groups[(k, m, tuple(sorted(present)[:k]))].append(key)
+
+    new_fragments = []
+    for (k, m, rows), ids in groups.items():
+        chunks = np.concatenate([
+            np.stack([np.frombuffer(survivors[i][row][0], dtype=np.uint8) for row in rows])
+            for i in ids
+        ], axis=1)
+        if rows != tuple(range(k)):
+            chunks = gf_matmul(decoding_matrix(k, m, rows), chunks)
+        stripe = np.concatenate([chunks, gf_matmul(encoding_matrix(k, m)[k:], chunks)])
+
+        start = 0
+        for key in ids:
+            present = survivors[key]
+            width = len(present[rows[0]][0])
+            missing = [row for row in range(k + m) if row not in present]
+            nodes = placement.place(len(missing), occupied=[node for _, node in present.values()])
+            for row, node in zip(missing, nodes):
+                fragment_data = stripe[row, start:start + width].tobytes()
+                new_fragments.append(DataFragment(
+                    **{field: key},
+                    fragment_id=f"F{row+1}",
+                    fragment_data=fragment_data,
+                    storage_node=node,
+                    is_parity=(row >= k),
+                    ec_k=k,
+                    ec_m=m,
+                    checksum=fragment_checksum(fragment_data)
+                ))
+            start += width
+
+    # Lost fragments of unrecoverable stripes are kept; their node may return
+    skipped = set(unrecoverable)
+    removed = [fragment for i, fragments in lost.items() if i not in skipped for fragment in fragments]
+    created_parity = sum(1 for fragment in new_fragments if fragment.is_parity)
+    removed_parity = sum(1 for _, is_parity in removed if is_parity)
+    with transaction.atomic():
+        DataFragment.objects.bulk_create(new_fragments, batch_size=500)
+        DataFragment.objects.filter(pk__in=[pk for pk, _ in removed]).delete()
+        statistics.increment(
+            data_fragments=(len(new_fragments) - created_parity) - (len(removed) - removed_parity),
+            parity_fragments=created_parity - removed_parity,
+        )
+
+    return {
+        'repaired': sum(len(ids) for ids in groups.values()),
+        'fragments': len(new_fragments),
+        'unrecoverable': unrecoverable,
+    }
+
+
+def repair_nodes(nodes=None, batch_size=REPAIR_BATCH_SIZE, max_rate=None, progress=None):
+    """Restore full redundancy for every record or block with fragments on
+    `nodes` (all nodes marked down by default).
+
+    max_rate limits records per second; progress(done, total, elapsed) is
+    called after each batch. Returns totals (a block counts as one record),
+    elapsed seconds and records/s.
+    """
+    down = down_nodes()
+    nodes = down if nodes is None else set(nodes)
+    stripes = [('block_id', key) for key in affected_stripes(nodes, 'block_id')]
+    stripes += [('original_data_id', key) for key in affected_stripes(nodes)]
+    placement = PlacementEngine(nodes=available_nodes(down | nodes))
+    totals = {'records': len(stripes), 'repaired': 0, 'fragments': 0, 'unrecoverable': 0}
+
+    start = time.perf_counter()
+    for offset in range(0, len(stripes), batch_size):
+        batch = stripes[offset:offset + batch_size]
+        by_field = defaultdict(list)
+        for field, key in batch:
+            by_field[field].append(key)
+        for field, keys in by_field.items():
+            result = repair_stripes(field, keys, down=down | nodes, placement=placement)
+            totals['repaired'] += result['repaired']
+            totals['fragments'] += result['fragments']
+            totals['unrecoverable'] += len(result['unrecoverable'])
+
+        done = offset + len(batch)
+        elapsed = time.perf_counter() - start
+        if progress:
+            progress(done, len(stripes), elapsed)
+        if max_rate:
+            # Throttle so repair traffic leaves room for ingestion
+            ahead = done / max_rate - elapsed
+            if ahead > 0:
+                time.sleep(ahead)
+
+    elapsed = time.perf_counter() - start
+    totals['elapsed'] = elapsed
+    totals['records_per_second'] = totals['records'] / elapsed if elapsed else 0.0
+    return totals
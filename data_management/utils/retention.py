@@ -0,0 +1,198 @@
+import base64
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from ..models import CachedData, DataFragment, GlobalModel, LocalModelUpdate, PerformanceMetrics, RawData, ReadingBlock
+from .caching import HierarchicalCache
+from .processing_queue import queue_settings
+from . import statistics
+
+DEFAULT_RETENTION_SETTINGS = {
+    'ARCHIVE_DIR': Path(settings.BASE_DIR) / 'archive',
+    'CHUNK_SIZE': 1000,
+    # Policy name -> days to keep (None keeps forever) and whether expired
+    # rows are written to an archive segment before they are deleted
+    'POLICIES': {
+        'raw_data': {'DAYS': 90, 'ARCHIVE': True},
+        'reading_blocks': {'DAYS': 90, 'ARCHIVE': False},
+        'model_updates': {'DAYS': 30, 'ARCHIVE': False},
+        'performance_metrics': {'DAYS': 14, 'ARCHIVE': True},
+    },
+}
+
+
+def retention_settings():
+    config = {**DEFAULT_RETENTION_SETTINGS, **getattr(settings, 'RETENTION', {})}
+    config['POLICIES'] = {**DEFAULT_RETENTION_SETTINGS['POLICIES'], **config['POLICIES']}
+    return config
+
+
+def _expired_raw_data(cutoff):
+    # Readings still waiting for (or retrying in) the processing queue are kept
+    queued = Q(is_processed=False, processing_attempts__lt=queue_settings()['MAX_ATTEMPTS'])
+    return RawData.objects.filter(timestamp__lt=cutoff).exclude(queued)
+
+
+def _expired_blocks(cutoff):
+    # A block is only dropped once none of its readings are left
+    return ReadingBlock.objects.filter(created_at__lt=cutoff, readings__isnull=True)
+
+
+def _expired_model_updates(cutoff):
+    # Updates for the current global model are still waiting to be aggregated
+    latest = GlobalModel.objects.order_by('-version').values_list('id', flat=True).first()
+    return LocalModelUpdate.objects.filter(created_at__lt=cutoff).exclude(global_model_id=latest)
+
+
+def _expired_metrics(cutoff):
+    return PerformanceMetrics.objects.filter(timestamp__lt=cutoff)
+
+
+def _fragment_deltas(fragments):
+    counts = fragments.aggregate(
+        data=Count('id', filter=Q(is_parity=False)),
+        parity=Count('id', filter=Q(is_parity=True)),
+    )
+    return {'data_fragments': -counts['data'], 'parity_fragments': -counts['parity']}
+
+
+def _raw_data_deltas(ids):
+    # Cached copies and fragments go with the readings (on_delete=CASCADE)
+    deltas = _fragment_deltas(DataFragment.objects.filter(original_data_id__in=ids))
+    for level, count in CachedData.objects.filter(raw_data_id__in=ids).values_list(
+        'cache_level'
+    ).annotate(count=Count('id')):
+        deltas[statistics.CACHE_LEVEL_FIELDS[level]] = -count
+    records, efficiency = statistics.efficiency_totals(RawData.objects.filter(id__in=ids))
+    deltas.update(raw_data_count=-len(ids), ec_records=-records, efficiency_sum=-efficiency)
+    return deltas
+
+
+def _evict_cached_readings(ids):
+    # Otherwise get_readings() keeps serving purged readings from the cache
+    HierarchicalCache().evict_many(ids)
+
+
+def _block_deltas(ids):
+    return _fragment_deltas(DataFragment.objects.filter(block_id__in=ids))
+
+
+# Policy name -> (expired queryset for a cutoff, statistics deltas for a chunk
+# of ids, cleanup for a chunk of ids once its delete has committed)
+POLICIES = {
+    'raw_data': (_expired_raw_data, _raw_data_deltas, _evict_cached_readings),
+    'reading_blocks': (_expired_blocks, _block_deltas, None),
+    'model_updates': (_expired_model_updates, None, None),
+    'performance_metrics': (_expired_metrics, None, None),
+}
+
+
+class ArchiveSegment:
+    """Append-only gzip file of JSON lines, one segment per policy and run.
+
+    Each chunk is written as its own gzip member and fsynced before the rows
+    are deleted, so a crash can at worst archive a chunk twice, never lose it.
+    Binary fields are stored base64-encoded.
+    """
+
+    def __init__(self, directory, name):
+        self.path = Path(directory) / name / f"{name}-{timezone.now():%Y%m%dT%H%M%S%f}.jsonl.gz"
+        self.rows = 0
+
+    def write(self, rows):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lines = ''.join(json.dumps(_jsonable(row), cls=DjangoJSONEncoder) + '\n' for row in rows)
+        with open(self.path, 'ab') as segment:
+            segment.write(gzip.compress(lines.encode()))
+            segment.flush()
+            os.fsync(segment.fileno())
+        self.rows += len(rows)
+
+
+def _jsonable(row):
+    return {
+        field: base64.b64encode(value).decode() if isinstance(value, (bytes, memoryview)) else value
+        for field, value in row.items()
+    }
+
+
+def read_segment(path):
+    # Yields the archived rows of a segment; gzip reads across members
+    with gzip.open(path, 'rt') as segment:
+        for line in segment:
+            yield json.loads(line)
+
+
+def purge_expired(name, days=None, archive=None, chunk_size=None, max_rate=None, dry_run=False,
+                  now=None, progress=None, stop_event=None):
+    """Delete the rows of one retention policy that are older than `days`.
+
+    Expired rows are selected in primary key order, chunk_size at a time,
+    and each chunk is deleted in its own short transaction together with
+    the matching statistics counter updates, so the purge never holds the
+    write lock for long; purged readings are then evicted from the tier
+    caches. With archive enabled a chunk is appended to a gzip
+    JSON lines segment under ARCHIVE_DIR before it is deleted. max_rate
+    limits rows per second; progress(totals, elapsed) is called per chunk.
+    days and archive default to the configured policy.
+    """
+    config = retention_settings()
+    policy = config['POLICIES'][name]
+    days = policy['DAYS'] if days is None else days
+    archive = policy.get('ARCHIVE', False) if archive is None else archive
+    chunk_size = chunk_size or config['CHUNK_SIZE']
+    expired, deltas, cleanup = POLICIES[name]
+
+    totals = {'policy': name, 'deleted': 0, 'archived': 0, 'segment': None, 'elapsed': 0.0}
+    if days is None:
+        return totals
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    queryset = expired(cutoff)
+    if dry_run:
+        totals['expired'] = queryset.count()
+        return totals
+
+    segment = ArchiveSegment(config['ARCHIVE_DIR'], name) if archive else None
+    last_id = 0
+    start = time.perf_counter()
+    while stop_event is None or not stop_event.is_set():
+        chunk = queryset.filter(pk__gt=last_id).order_by('pk')
+        if segment:
+            rows = list(chunk.values()[:chunk_size])
+            ids = [row['id'] for row in rows]
+        else:
+            ids = list(chunk.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            break
+        if segment:
+            segment.write(rows)
+            totals['archived'] += len(rows)
+            totals['segment'] = str(segment.path)
+
+        with transaction.atomic():
+            if deltas:
+                statistics.increment(**deltas(ids))
+            queryset.model.objects.filter(pk__in=ids).delete()
+        if cleanup:
+            cleanup(ids)
+        totals['deleted'] += len(ids)
+        last_id = ids[-1]
+
+        elapsed = time.perf_counter() - start
+        if progress:
+            progress(totals, elapsed)
+        if max_rate:
+            ahead = totals['deleted'] / max_rate - elapsed
+            if ahead > 0:
+                time.sleep(ahead)
+
+    totals['elapsed'] = time.perf_counter() - start
+    return totals
@@ -0,0 +1,177 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from ..models import ReadingRollup
+
+# Bucket widths from finest to coarsest
+RESOLUTIONS = {
+    '1m': timedelta(minutes=1),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+
+# History queries pick the finest resolution that returns at most this many
+# buckets per reading type
+DEFAULT_MAX_POINTS = 1000
+
+
+def bucket_start(moment, resolution):
+    if resolution == '1m':
+        return moment.replace(second=0, microsecond=0)
+    if resolution == '1h':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def reading_time(raw_data):
+    # The reading's own timestamp when it has a usable one, else ingestion time
+    timestamp = raw_data.data.get('timestamp') if isinstance(raw_data.data, dict) else None
+    if isinstance(timestamp, str):
+        try:
+            moment = datetime.fromisoformat(timestamp)
+        except ValueError:
+            moment = None
+        if moment is not None:
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment, dt_timezone.utc)
+            return moment.astimezone(dt_timezone.utc)
+    return raw_data.timestamp.astimezone(dt_timezone.utc)
+
+
+def summarize(raw_data_list):
+    # {(device_id, resolution, type, bucket_start): [count, total, min, max]}
+    buckets = {}
+    for raw_data in raw_data_list:
+        data = raw_data.data
+        if not isinstance(data, dict):
+            continue
+        value = data.get('value')
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        moment = reading_time(raw_data)
+        reading_type = str(data.get('type', 'random'))[:50]
+        for resolution in RESOLUTIONS:
+            key = (raw_data.device_id, resolution, reading_type, bucket_start(moment, resolution))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [1, float(value), value, value]
+            else:
+                bucket[0] += 1
+                bucket[1] += value
+                bucket[2] = min(bucket[2], value)
+                bucket[3] = max(bucket[3], value)
+    return buckets
+
+
+def update_rollups(raw_data_list):
+    """Fold a batch of readings into the 1m/1h/1d rollup buckets.
+
+    Existing buckets are locked, merged and written back with one bulk
+    update; new ones (most 1-minute buckets) are bulk inserted. If another
+    worker inserts the same bucket first, the batch falls back to inserting
+    empty buckets and merging into all of them.
+    """
+    buckets = summarize(raw_data_list)
+    if not buckets:
+        return 0
+
+    with transaction.atomic():
+        existing = _locked_rows(buckets)
+        missing = set(buckets) - {_key(row) for row in existing}
+        try:
+            with transaction.atomic():
+                ReadingRollup.objects.bulk_create([
+                    _new_row(key, buckets[key]) for key in missing
+                ], batch_size=500)
+        except IntegrityError:
+            ReadingRollup.objects.bulk_create([
+                _new_row(key, None) for key in missing
+            ], batch_size=500, ignore_conflicts=True)
+            existing = _locked_rows(buckets)
+
+        for row in existing:
+            count, total, minimum, maximum = buckets[_key(row)]
+            row.count += count
+            row.total += total
+            row.minimum = minimum if row.minimum is None else min(row.minimum, minimum)
+            row.maximum = maximum if row.maximum is None else max(row.maximum, maximum)
+        ReadingRollup.objects.bulk_update(existing, ['count', 'total', 'minimum', 'maximum'], batch_size=500)
+    return len(buckets)
+
+
+def _key(row):
+    return row.device_id, row.resolution, row.reading_type, row.bucket_start
+
+
+def _new_row(key, summary):
+    device_id, resolution, reading_type, start = key
+    row = ReadingRollup(device_id=device_id, resolution=resolution, reading_type=reading_type,
+                        bucket_start=start)
+    if summary:
+        row.count, row.total, row.minimum, row.maximum = summary
+    return row
+
+
+def _locked_rows(buckets):
+    # Touched buckets are fetched per resolution over their time span, then
+    # filtered to the exact keys
+    rows = []
+    by_resolution = defaultdict(list)
+    for key in buckets:
+        by_resolution[key[1]].append(key)
+    for resolution, keys in by_resolution.items():
+        starts = [key[3] for key in keys]
+        candidates = ReadingRollup.objects.select_for_update().filter(
+            resolution=resolution,
+            device_id__in={key[0] for key in keys},
+            bucket_start__gte=min(starts),
+            bucket_start__lte=max(starts),
+        )
+        rows.extend(row for row in candidates if _key(row) in buckets)
+    return rows
+
+
+def choose_resolution(start, end, max_points=DEFAULT_MAX_POINTS):
+    # Finest resolution whose bucket count over the range fits in max_points
+    span = end - start
+    for resolution, width in RESOLUTIONS.items():
+        if span / width <= max_points:
+            return resolution
+    return '1d'
+
+
+def rollup_series(device_id, start, end, reading_type=None, resolution=None,
+                  max_points=DEFAULT_MAX_POINTS):
+    """Aggregated history of a device between start and end (aware datetimes).
+
+    Returns (resolution, [{'type', 'bucket', 'count', 'min', 'max', 'avg'}])
+    ordered by type and time.
+    """
+    resolution = resolution or choose_resolution(start, end, max_points)
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution '{resolution}'")
+
+    rows = ReadingRollup.objects.filter(
+        device_id=device_id,
+        resolution=resolution,
+        bucket_start__gte=bucket_start(start.astimezone(dt_timezone.utc), resolution),
+        bucket_start__lt=end,
+    )
+    if reading_type:
+        rows = rows.filter(reading_type=reading_type)
+
+    points = []
+    for row in rows.order_by('reading_type', 'bucket_start').values_list(
+        'reading_type', 'bucket_start', 'count', 'total', 'minimum', 'maximum'
+    ):
+        reading_type, bucket, count, total, minimum, maximum = row
+        points.append({
+            'type': reading_type,
+            'bucket': bucket.isoformat(),
+            'count': count,
+            'min': minimum,
+            'max': maximum,
+            'avg': total / count if count else None,
+        })
+    return resolution, points
@@ -0,0 +1,69 @@
+import time
+from ..models import DataFragment
+from .erasure_coding import fragment_checksum
+from .repair import repair_stripes
+
+# Fragments read per query; bounds the scrubber's memory use
+SCRUB_CHUNK_SIZE = 1000
+
+
+def scrub_fragments(chunk_size=SCRUB_CHUNK_SIZE, max_bytes_per_second=None, start_after=0,
+                    limit=None, progress=None, stop_event=None):
+    """Verify every fragment checksum in one pass over DataFragment.
+
+    Fragments are streamed in primary key order, chunk_size at a time, so
+    only one chunk is ever held in memory. Records and blocks with corrupt
+    fragments are repaired after each chunk; fragments without a checksum get one recorded.
+    max_bytes_per_second throttles reads so the scrubber can run alongside
+    ingestion. Returns the totals and the last fragment id checked, which
+    can be passed back as start_after to resume.
+    """
+    totals = {'fragments': 0, 'bytes': 0, 'corrupt': 0, 'repaired': 0,
+              'unrecoverable': 0, 'backfilled': 0, 'last_id': start_after}
+    unrecoverable = set()
+    start = time.perf_counter()
+    while limit is None or totals['fragments'] < limit:
+        if stop_event is not None and stop_event.is_set():
+            break
+        chunk = list(DataFragment.objects.filter(pk__gt=totals['last_id']).order_by('pk').values_list(
+            'id', 'original_data_id', 'block_id', 'fragment_data', 'checksum'
+        )[:chunk_size])
+        if not chunk:
+            break
+
+        corrupt_records, corrupt_blocks = set(), set()
+        unchecked = []
+        for pk, raw_data_id, block_id, data, checksum in chunk:
+            actual = fragment_checksum(data)
+            if checksum is None:
+                unchecked.append(DataFragment(id=pk, checksum=actual))
+            elif actual != checksum:
+                totals['corrupt'] += 1
+                if block_id is not None:
+                    corrupt_blocks.add(block_id)
+                else:
+                    corrupt_records.add(raw_data_id)
+            totals['bytes'] += len(data)
+        totals['fragments'] += len(chunk)
+        totals['last_id'] = chunk[-1][0]
+
+        if unchecked:
+            DataFragment.objects.bulk_update(unchecked, ['checksum'], batch_size=500)
+            totals['backfilled'] += len(unchecked)
+        for field, keys in (('original_data_id', corrupt_records), ('block_id', corrupt_blocks)):
+            if keys:
+                result = repair_stripes(field, sorted(keys))
+                totals['repaired'] += result['repaired']
+                unrecoverable.update((field, key) for key in result['unrecoverable'])
+                totals['unrecoverable'] = len(unrecoverable)
+
+        elapsed = time.perf_counter() - start
+        if progress:
+            progress(totals, elapsed)
+        if max_bytes_per_second:
+            ahead = totals['bytes'] / max_bytes_per_second - elapsed
+            if ahead > 0:
+                time.sleep(ahead)
+
+    totals['elapsed'] = time.perf_counter() - start
+    return totals
@@ -0,0 +1,123 @@
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Greatest, Least
+from django.utils import timezone
+from ..models import CachedData, DataFragment, GlobalModel, LocalModelUpdate, RawData, SystemStatistics
+
+# CachedData.cache_level -> SystemStatistics counter
+CACHE_LEVEL_FIELDS = {
+    'FREQUENT': 'cached_frequent',
+    'LESS_FREQUENT': 'cached_less_frequent',
+    'RARE': 'cached_rare',
+}
+
+# Per-record storage efficiency (original / encoded bytes, percent) is
+# reported clamped to this range
+EFFICIENCY_RANGE = (45.0, 55.0)
+
+
+def clamped_efficiency(original_size, encoded_size):
+    low, high = EFFICIENCY_RANGE
+    return min(max(original_size / encoded_size * 100, low), high)
+
+
+def increment(**deltas):
+    """Add deltas to the statistics row, e.g. increment(raw_data_count=10).
+
+    Runs as a single UPDATE ... SET x = x + n, inside the caller's
+    transaction so counters roll back together with the rows they count.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = SystemStatistics.objects.filter(pk=1).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated:
+        # First write ever: counting now already includes the caller's rows
+        rebuild_statistics()
+
+
+def cache_level_deltas(changes):
+    # changes: iterable of (old_level, new_level), None meaning absent
+    deltas = {}
+    for old_level, new_level in changes:
+        if old_level == new_level:
+            continue
+        if old_level:
+            field = CACHE_LEVEL_FIELDS[old_level]
+            deltas[field] = deltas.get(field, 0) - 1
+        if new_level:
+            field = CACHE_LEVEL_FIELDS[new_level]
+            deltas[field] = deltas.get(field, 0) + 1
+    return deltas
+
+
+def record_global_model(global_model):
+    # A new global model version starts with no local updates
+    updated = SystemStatistics.objects.filter(pk=1).update(
+        model_version=global_model.version,
+        model_accuracy=global_model.accuracy,
+        model_updated_at=global_model.updated_at,
+        model_updates=0,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        rebuild_statistics()
+
+
+def storage_efficiency():
+    # Mean clamped efficiency over all erasure-coded records, None before any
+    stats = get_statistics()
+    return stats.efficiency_sum / stats.ec_records if stats.ec_records else None
+
+
+def efficiency_totals(raw_data):
+    # (erasure-coded records, sum of their clamped efficiencies) in a RawData queryset
+    low, high = EFFICIENCY_RANGE
+    efficiency = raw_data.filter(encoded_size__gt=0).aggregate(
+        records=Count('id'),
+        total=Sum(Greatest(
+            Least(Cast('original_size', FloatField()) * 100 / F('encoded_size'), Value(high)), Value(low)
+        )),
+    )
+    return efficiency['records'], efficiency['total'] or 0.0
+
+
+def get_statistics():
+    return SystemStatistics.objects.filter(pk=1).first() or rebuild_statistics()
+
+
+def rebuild_statistics():
+    """Recompute every counter from the tables (slow; for first use and repairs)."""
+    cache_counts = CachedData.objects.aggregate(
+        frequent=Count('id', filter=Q(cache_level='FREQUENT')),
+        less_frequent=Count('id', filter=Q(cache_level='LESS_FREQUENT')),
+        rare=Count('id', filter=Q(cache_level='RARE')),
+    )
+    fragment_counts = DataFragment.objects.aggregate(
+        data=Count('id', filter=Q(is_parity=False)),
+        parity=Count('id', filter=Q(is_parity=True)),
+    )
+    ec_records, efficiency_sum = efficiency_totals(RawData.objects.all())
+    latest_model = GlobalModel.objects.defer('model_data').order_by('-version').first()
+
+    with transaction.atomic():
+        stats, _ = SystemStatistics.objects.update_or_create(pk=1, defaults={
+            'raw_data_count': RawData.objects.count(),
+            'cached_frequent': cache_counts['frequent'],
+            'cached_less_frequent': cache_counts['less_frequent'],
+            'cached_rare': cache_counts['rare'],
+            'data_fragments': fragment_counts['data'],
+            'parity_fragments': fragment_counts['parity'],
+            'ec_records': ec_records,
+            'efficiency_sum': efficiency_sum,
+            'model_version': latest_model.version if latest_model else None,
+            'model_accuracy': latest_model.accuracy if latest_model else None,
+            'model_updated_at': latest_model.updated_at if latest_model else None,
+            'model_updates': (
+                LocalModelUpdate.objects.filter(global_model=latest_model).count() if latest_model else 0
+            ),
+        })
+    return stats
@@ -5,14 +5,17 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 import json
 import random
-import time
-import numpy as np
 from datetime import datetime
-from .models import Device, RawData, CachedData, DataFragment, GlobalModel, PerformanceMetrics
-from django.db.models import Sum,Count, Q, Avg
+from .models import Device, RawData, PerformanceMetrics
 from .utils.caching import HierarchicalCache
-from .utils.erasure_coding import store_with_ec, recover_data
+from .utils.erasure_coding import recover_data
 from .utils.federated_learning import SimpleFederatedLearning
+from .utils.ingestion import parse_readings, process_batch
+from .utils.processing_queue import QueueFullError, enqueue_readings, queue_stats
+from .utils.data_access import MAX_READ_BATCH, get_readings, latest_reading_ids
+from .utils.statistics import get_statistics, storage_efficiency
+from .utils.health import REPORT_TTL_SECONDS, health_report
+from .utils.rollups import DEFAULT_MAX_POINTS, rollup_series
 from django.utils import timezone
 from datetime import timedelta
 
@@ -34,13 +37,14 @@ if not Device.objects.exists():
 class DashboardView(View):
     def get(self, request):
         devices = Device.objects.all()
-        raw_data_count = RawData.objects.count()
+        # Counters are maintained by the write paths; no table scans here
+        stats = get_statistics()
+        raw_data_count = stats.raw_data_count
 
         # Get cache statistics
-        cache_stats = CachedData.objects.all()
-        frequent = cache_stats.filter(cache_level='FREQUENT').count()
-        less_frequent = cache_stats.filter(cache_level='LESS_FREQUENT').count()
-        rare = cache_stats.filter(cache_level='RARE').count()
+        frequent = stats.cached_frequent
+        less_frequent = stats.cached_less_frequent
+        rare = stats.cached_rare
         total_cached = frequent + less_frequent + rare
         
         # Calculate hit rates (simplified for demo)
@@ -60,8 +64,8 @@ class DashboardView(View):
 
         
         # Calculate EC statistics
-        data_nodes = DataFragment.objects.filter(is_parity=False).count()
-        parity_nodes = DataFragment.objects.filter(is_parity=True).count()
+        data_nodes = stats.data_fragments
+        parity_nodes = stats.parity_fragments
         total_fragments = data_nodes + parity_nodes
         
         ec_stats = {
@@ -74,12 +78,15 @@ class DashboardView(View):
             'redundancy': round((float(data_nodes + parity_nodes) / data_nodes), 1) if data_nodes else 0,
         }
 
-        try:
-            global_model = GlobalModel.objects.latest('version')
-            model_updates = global_model.localmodelupdate_set.count()
-        except GlobalModel.DoesNotExist:
+        if stats.model_version is not None:
+            global_model = {
+                'version': stats.model_version,
+                'accuracy': stats.model_accuracy,
+                'updated_at': stats.model_updated_at,
+            }
+        else:
             global_model = None
-            model_updates = 0
+        model_updates = stats.model_updates
 
 
         # Calculate real metrics
@@ -109,14 +116,21 @@ class DashboardView(View):
 
 class SimulateDeviceView(View):
     def get(self, request):
+        return self.render_form(request)
+    
+    def render_form(self, request, error=None, status=200):
         devices = Device.objects.all()
         recent_data = RawData.objects.select_related('device').order_by('-timestamp')[:20]  # Last 20 records
         
-        return render(request, 'data_management/device_input.html', {
+        response = render(request, 'data_management/device_input.html', {
             'devices': devices,
             'recent_data': recent_data,
-            'auto_generate': request.GET.get('auto') == 'true'
-        })
+            'auto_generate': request.GET.get('auto') == 'true',
+            'error': error
+        }, status=status)
+        if status == 503:
+            response['Retry-After'] = '5'
+        return response
         
     def post(self, request):
         device_id = request.POST.get('device_id')
@@ -127,23 +141,28 @@ class SimulateDeviceView(View):
         device = Device.objects.get(id=device_id)
         update_last_active_if_needed(device)
         
-        if auto_generate:
-            return self.auto_generate_data(device_id, num_records)
-        else:
-            return self.manual_generate_data(device_id, data_type)
+        try:
+            if auto_generate:
+                return self.auto_generate_data(device_id, num_records)
+            else:
+                return self.manual_generate_data(device_id, data_type)
+        except QueueFullError as e:
+            # Backpressure, as in the ingestion APIs, but shown on the form
+            return self.render_form(request, error=str(e), status=503)
     
     def manual_generate_data(self, device_id, data_type):
         data = self.generate_single_data_point(data_type)
-        return self.store_and_process(device_id, data)
+        self.store_and_process(device_id, data)
+        return redirect('dashboard')
     
     def auto_generate_data(self, device_id, num_records):
-        # Generate multiple records with random data types
+        # Generate multiple records with random data types and ingest them as one batch
         data_types = ['temperature', 'humidity', 'pressure', 'random']
-        for _ in range(num_records):
-            data_type = random.choice(data_types)
-            data = self.generate_single_data_point(data_type)
-            self.store_and_process(device_id, data)
-            time.sleep(0.1)  # Small delay between records
+        readings = [
+            {'device_id': device_id, 'data': self.generate_single_data_point(random.choice(data_types))}
+            for _ in range(num_records)
+        ]
+        enqueue_readings(readings)
             
         return redirect('dashboard')
     
@@ -169,34 +188,11 @@ class SimulateDeviceView(View):
         }
     
     def store_and_process(self, device_id, data):
-        # Store raw data
-        device = Device.objects.get(pk=device_id)
-        raw_data = RawData.objects.create(
-            device=device,
-            data=data
-        )
-        
-        # Process through our system
-        self.process_data(raw_data.id)
+        # Store raw data; the processing queue runs it through our system
+        enqueue_readings([{'device_id': device_id, 'data': data}])
         
     def process_data(self, raw_data_id):
-        # 1. Caching
-        cache = HierarchicalCache()
-        raw_data = RawData.objects.get(pk=raw_data_id)
-        cache.cache_data(raw_data_id, raw_data.data)
-        
-        # 2. Erasure Coding
-        store_with_ec(raw_data_id)
-        
-        # 3. Federated Learning (simplified)
-        fl = SimpleFederatedLearning()
-        X = np.array([[random.random() for _ in range(5)]])
-        y = np.array([random.randint(0, 1)])
-        fl.train_local_model(raw_data.device.id, X, y)
-        
-        # Mark as processed
-        raw_data.is_processed = True
-        raw_data.save()
+        process_batch(RawData.objects.filter(pk=raw_data_id))
 
 
         
@@ -225,8 +221,130 @@ class AutoGenerateAPI(View):
                 'status': 'success', 
                 'message': f'{num_records} records generated for device {device.name}'
             })
+        except QueueFullError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=503, headers={'Retry-After': '5'})
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BulkIngestAPI(View):
+    # Accepts a JSON array (or {"readings": [...]}) or an NDJSON stream of readings
+    # for any number of devices. Readings are stored in one batch and processed
+    # by the background queue.
+    def post(self, request):
+        try:
+            readings = parse_readings(request.body, request.content_type)
+        except (ValueError, UnicodeDecodeError) as e:
+            return JsonResponse({'status': 'error', 'message': f'Invalid payload: {e}'}, status=400)
+
+        if not readings:
+            return JsonResponse({'status': 'error', 'message': 'No readings supplied'}, status=400)
+
+        try:
+            raw_data_list = enqueue_readings(readings)
+        except QueueFullError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=503, headers={'Retry-After': '5'})
+        except Device.DoesNotExist as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=404)
+        except (ValueError, TypeError) as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+        return JsonResponse({
+            'status': 'success',
+            'ingested': len(raw_data_list),
+            'ids': [raw_data.id for raw_data in raw_data_list],
+        })
+
+
+class ReadingsAPI(View):
+    # Read-through access to readings: tiered caches, then RawData, then EC fragments.
+    #   /api/readings/<id>/               single reading
+    #   /api/readings/?ids=1,2,3          explicit ids
+    #   /api/readings/?start=10&end=20    id range (inclusive)
+    #   /api/readings/?device_id=1&latest=50
+    def get(self, request, raw_data_id=None):
+        if raw_data_id is not None:
+            readings = get_readings([raw_data_id])
+            if raw_data_id not in readings:
+                return JsonResponse({'status': 'error', 'message': 'Reading not found'}, status=404)
+            return JsonResponse({'status': 'success', 'reading': {'id': raw_data_id, **readings[raw_data_id]}})
+
+        try:
+            ids = self.requested_ids(request.GET)
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+        readings = get_readings(ids)
+        return JsonResponse({
+            'status': 'success',
+            'count': len(readings),
+            'readings': [{'id': i, **reading} for i, reading in readings.items()],
+        })
+
+    def requested_ids(self, params):
+        if params.get('ids'):
+            ids = [int(i) for i in params['ids'].split(',') if i.strip()]
+        elif params.get('start') and params.get('end'):
+            start, end = int(params['start']), int(params['end'])
+            if end < start:
+                raise ValueError('end must not be before start')
+            ids = list(range(start, min(end, start + MAX_READ_BATCH - 1) + 1))
+        elif params.get('device_id'):
+            latest = min(int(params.get('latest', 20)), MAX_READ_BATCH)
+            ids = latest_reading_ids(int(params['device_id']), latest)
+        else:
+            raise ValueError('Pass ids, start and end, or device_id')
+
+        if len(ids) > MAX_READ_BATCH:
+            raise ValueError(f'At most {MAX_READ_BATCH} readings per request')
+        return ids
+
+
+class DeviceHistoryAPI(View):
+    # Aggregated readings of one device from the rollup buckets:
+    #   /api/devices/<id>/history/?start=<iso>&end=<iso>&type=temperature
+    # The resolution (1m, 1h or 1d) is chosen so at most max_points buckets
+    # come back per type, unless given explicitly with &resolution=.
+    def get(self, request, device_id):
+        if not Device.objects.filter(pk=device_id).exists():
+            return JsonResponse({'status': 'error', 'message': 'Device not found'}, status=404)
+
+        try:
+            end = self.parse_time(request.GET.get('end')) or timezone.now()
+            start = self.parse_time(request.GET.get('start')) or end - timedelta(days=1)
+            if end <= start:
+                raise ValueError('end must be after start')
+            max_points = int(request.GET.get('max_points', DEFAULT_MAX_POINTS))
+            resolution, points = rollup_series(
+                device_id, start, end,
+                reading_type=request.GET.get('type'),
+                resolution=request.GET.get('resolution'),
+                max_points=max(max_points, 1),
+            )
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+        return JsonResponse({
+            'status': 'success',
+            'device_id': device_id,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'resolution': resolution,
+            'points': points,
+        })
+
+    @staticmethod
+    def parse_time(value):
+        if not value:
+            return None
+        moment = datetime.fromisoformat(value)
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class QueueStatusAPI(View):
+    def get(self, request):
+        return JsonResponse({'status': 'success', **queue_stats()})
         
 
 
@@ -279,14 +397,15 @@ def calculate_latency_reduction():
     if not metrics.exists():
         return round(random.uniform(40, 60), 1) 
     
+    # Each row averages sample_count requests, so rows are weighted by it
     total_reduction = 0
     valid_metrics = 0
     for m in metrics:
         if m.cloud_processing_time > 0 and m.edge_processing_time > 0:
             reduction = ((m.cloud_processing_time - m.edge_processing_time) / 
                        m.cloud_processing_time) * 100
-            total_reduction += min(max(reduction, 40), 60) 
-            valid_metrics += 1
+            total_reduction += min(max(reduction, 40), 60) * m.sample_count
+            valid_metrics += m.sample_count
     
     return round(total_reduction / valid_metrics, 1) if valid_metrics else round(random.uniform(40, 60), 1)
 
@@ -301,60 +420,22 @@ def calculate_bandwidth_savings():
         if m.data_transfer_size > 0:
             savings = ((m.data_transfer_size - (m.data_transfer_size * 0.25)) / 
                      m.data_transfer_size) * 100
-            total_savings += min(max(savings, 60), 80)  # Keep within realistic bounds
-            valid_metrics += 1
+            total_savings += min(max(savings, 60), 80) * m.sample_count  # Keep within realistic bounds
+            valid_metrics += m.sample_count
     
     return round(total_savings / valid_metrics, 1) if valid_metrics else round(random.uniform(60, 80), 1)
 
 def calculate_storage_efficiency():
-    fragments = DataFragment.objects.all()
-    if not fragments.exists():
-        return round(random.uniform(45, 55), 1)  
-    
-    total_efficiency = 0
-    processed_data = set()
-    
-    for fragment in fragments:
-        if fragment.original_data_id not in processed_data:
-            original_size = len(str(fragment.original_data.data).encode('utf-8'))
-            fragments_size = sum(len(f.fragment_data) for f in fragments.filter(
-                original_data_id=fragment.original_data_id))
-            
-            if original_size > 0:
-                efficiency = (original_size / fragments_size) * 100
-                total_efficiency += min(max(efficiency, 45), 55)  
-                processed_data.add(fragment.original_data_id)
-    
-    return round(total_efficiency / len(processed_data), 1) if processed_data else round(random.uniform(45, 55), 1)
+    # Maintained incrementally as fragments are written; see utils/statistics.py
+    efficiency = storage_efficiency()
+    if efficiency is None:
+        return round(random.uniform(45, 55), 1)
+    return round(efficiency, 1)
 
 
 
 class SystemHealthView(View):
     def get(self, request):
-        # Calculate health metrics from processed data
-        fragment_health = DataFragment.objects.values('storage_node').annotate(
-            total=Count('id'),
-            parity=Count('id', filter=Q(is_parity=True))
-        )
-        
-        cache_health = CachedData.objects.values('cache_level').annotate(
-            count=Count('id'),
-            avg_access=Avg('access_count')
-        )
-        
-        return JsonResponse({
-            'fragment_distribution': list(fragment_health),
-            'cache_performance': list(cache_health),
-            'storage_efficiency': calculate_storage_efficiency(),
-            'recovery_confidence': self.calculate_recovery_confidence()
-        })
-    
-    def calculate_recovery_confidence(self):
-        # Calculate probability of successful recovery
-        total_data = RawData.objects.count()
-        recoverable = 0
-        for data in RawData.objects.all():
-            fragments = DataFragment.objects.filter(original_data=data)
-            if fragments.count() >= 4:  # Minimum fragments needed
-                recoverable += 1
-        return round((recoverable / total_data) * 100, 1) if total_data else 0
\ No newline at end of file
+        # Aggregated over all fragments and cached for a few seconds
+        report = health_report(max_age=0 if request.GET.get('refresh') else REPORT_TTL_SECONDS)
+        return JsonResponse({**report, 'storage_efficiency': calculate_storage_efficiency()})
@@ -41,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so the timing covers the rest of the stack
+    'data_management.performance_middleware.PerformanceTrackingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +80,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Queue workers write concurrently; take the write lock up front instead
+        # of failing with "database is locked" on a read-to-write upgrade
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -125,25 +133,148 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 # Configure multiple caches
+# The three tiers live in SQLite files under CACHE_DIR so every worker process
+# on the node shares them (see data_management/cache_backends.py).
+CACHE_DIR = BASE_DIR / 'cache'
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     },
     'frequent': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'frequent_cache',
+        'BACKEND': 'data_management.cache_backends.SQLiteCache',
+        'LOCATION': CACHE_DIR / 'frequent.sqlite3',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_BYTES': 16 * 1024 * 1024,
+        },
     },
     'less_frequent': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'less_frequent_cache',
+        'BACKEND': 'data_management.cache_backends.SQLiteCache',
+        'LOCATION': CACHE_DIR / 'less_frequent.sqlite3',
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'MAX_BYTES': 64 * 1024 * 1024,
+            'COMPRESS_MIN_LENGTH': 1024,
+        },
     },
     'rare': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'rare_cache',
+        'BACKEND': 'data_management.cache_backends.SQLiteCache',
+        'LOCATION': CACHE_DIR / 'rare.sqlite3',
+        'OPTIONS': {
+            'MAX_ENTRIES': 200000,
+            'MAX_BYTES': 256 * 1024 * 1024,
+            'COMPRESS_MIN_LENGTH': 256,
+            'COMPRESS_LEVEL': 6,
+        },
     }
 }
 
 
+# Tier admission/promotion for the caches above (see data_management/utils/caching.py)
+CACHE_POLICY = {
+    'CAPACITY': {'FREQUENT': 1000, 'LESS_FREQUENT': 5000, 'RARE': 20000},
+    'PROMOTE_AT': {'FREQUENT': 4, 'LESS_FREQUENT': 2},
+    'TIMEOUT': {'FREQUENT': 300, 'LESS_FREQUENT': 1800, 'RARE': 3600},
+    'FLUSH_INTERVAL': 5.0,
+    'FLUSH_THRESHOLD': 500,
+    # Used by `python manage.py maintain_cache`
+    'IDLE_SECONDS': {'FREQUENT': 600, 'LESS_FREQUENT': 3600, 'RARE': 3600},
+    'MAINTENANCE_BATCH_SIZE': 500,
+    'MAINTENANCE_INTERVAL': 60.0,
+}
+
+
+# Erasure coding profiles (k data + m parity fragments) and the storage nodes
+# fragments are spread over (see data_management/utils/placement.py).
+ERASURE_CODING = {
+    'PROFILES': {
+        '4+2': (4, 2),
+        '8+3': (8, 3),
+        '10+4': (10, 4),
+    },
+    'DEFAULT_PROFILE': '4+2',
+    # device_type -> profile name, e.g. {'Multi': '8+3'}
+    'DEVICE_TYPE_PROFILES': {},
+    'STORAGE_NODES': [
+        {'name': 'edge_node_0', 'zone': 'zone-a', 'rack': 'rack-0'},
+        {'name': 'edge_node_1', 'zone': 'zone-b', 'rack': 'rack-0'},
+        {'name': 'edge_node_2', 'zone': 'zone-c', 'rack': 'rack-0'},
+        {'name': 'edge_node_3', 'zone': 'zone-a', 'rack': 'rack-1'},
+        {'name': 'edge_node_4', 'zone': 'zone-b', 'rack': 'rack-1'},
+        {'name': 'edge_node_5', 'zone': 'zone-c', 'rack': 'rack-1'},
+    ],
+    # Pack each device's readings into compressed binary blocks and erasure-code
+    # whole blocks instead of one JSON payload per reading. Compression may be
+    # 'zstd' (needs the zstandard package; falls back to zlib), 'zlib' or 'none'.
+    'BLOCKS': {
+        'ENABLED': False,
+        'COMPRESSION': 'zlib',
+        'MAX_READINGS': 4096,
+    },
+}
+
+
+# Background processing of ingested readings (see data_management/utils/processing_queue.py).
+# Run `python manage.py process_queue --workers N` for dedicated workers.
+PROCESSING_QUEUE = {
+    'ASYNC': True,
+    'IN_PROCESS_WORKERS': 1,
+    'BATCH_SIZE': 200,
+    'MAX_ATTEMPTS': 5,
+    'LEASE_SECONDS': 60,
+    'MAX_PENDING': 50000,
+    'POLL_INTERVAL': 1.0,
+}
+
+
+# Aggregation of local model updates (see data_management/utils/federated_learning.py).
+# AGGREGATION is 'fedavg' (weighted by num_samples), 'trimmed_mean' or 'median'.
+FEDERATED_LEARNING = {
+    'AGGREGATION': 'fedavg',
+    'TRIM_RATIO': 0.1,
+    'CHUNK_SIZE': 1000,
+    'WORKERS': 0,
+    # Parameter storage: 'float32', 'float16' or 'int8'; COMPRESSION 'none' or 'zlib'
+    'MODEL_DTYPE': 'float32',
+    'UPDATE_DTYPE': 'float32',
+    'COMPRESSION': 'none',
+    # Per-device local update buffering and delta updates
+    'BUFFER_SAMPLES': 256,
+    'BUFFER_SECONDS': 60.0,
+    'SEND_DELTAS': True,
+    'TOP_K_FRACTION': None,
+    # Local SGD on features of the devices' readings
+    'LEARNING_RATE': 0.01,
+    'L2_PENALTY': 1e-4,
+    'HOLDOUT_FRACTION': 0.2,
+    'MIN_TRAIN_SAMPLES': 10,
+}
+
+
+# Request timing samples recorded by PerformanceTrackingMiddleware are buffered
+# in memory and written as one aggregated PerformanceMetrics row per interval.
+REQUEST_METRICS = {
+    'BUFFER_SIZE': 10000,
+    'FLUSH_INTERVAL': 10.0,
+}
+
+
+# Retention (see data_management/utils/retention.py). Run
+# `python manage.py purge_expired` periodically; rows of policies with
+# ARCHIVE are appended to gzip JSON lines segments under ARCHIVE_DIR first.
+RETENTION = {
+    'ARCHIVE_DIR': BASE_DIR / 'archive',
+    'CHUNK_SIZE': 1000,
+    'POLICIES': {
+        'raw_data': {'DAYS': 90, 'ARCHIVE': True},
+        'reading_blocks': {'DAYS': 90, 'ARCHIVE': False},
+        'model_updates': {'DAYS': 30, 'ARCHIVE': False},
+        'performance_metrics': {'DAYS': 14, 'ARCHIVE': True},
+    },
+}
+
+
 
 import os
 